@@ -0,0 +1,74 @@
+"""Replace B-tree full_name index with pg_trgm GIN indexes
+
+Revision ID: 4d2b7e9a1c3f
+Revises: 68c1211ab935
+Create Date: 2026-10-17 15:40:12.503817
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4d2b7e9a1c3f'
+down_revision: Union[str, Sequence[str], None] = '68c1211ab935'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # Built concurrently so a large user table stays writable meanwhile
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_user_full_name_trgm',
+            'user',
+            ['full_name'],
+            postgresql_using='gin',
+            postgresql_ops={'full_name': 'gin_trgm_ops'},
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            'ix_user_email_trgm',
+            'user',
+            ['email'],
+            postgresql_using='gin',
+            postgresql_ops={'email': 'gin_trgm_ops'},
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index(
+            'ix_user_full_name',
+            table_name='user',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_user_full_name',
+            'user',
+            ['full_name'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index(
+            'ix_user_email_trgm',
+            table_name='user',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.drop_index(
+            'ix_user_full_name_trgm',
+            table_name='user',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -0,0 +1,43 @@
+"""Add unique (provider, provider_id) index
+
+Revision ID: 68c1211ab935
+Revises: 99fc3711f5f0
+Create Date: 2026-10-17 11:02:54.771930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '68c1211ab935'
+down_revision: Union[str, Sequence[str], None] = '99fc3711f5f0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Built concurrently so the user table stays writable during the deploy.
+    # A failed build leaves an INVALID index behind; drop it and re-run.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_user_provider_provider_id',
+            'user',
+            ['provider', 'provider_id'],
+            unique=True,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_user_provider_provider_id',
+            table_name='user',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -0,0 +1,31 @@
+"""Add user version counter
+
+Revision ID: 99fc3711f5f0
+Revises: 88ad83b58cff
+Create Date: 2026-10-17 09:12:31.418207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '99fc3711f5f0'
+down_revision: Union[str, Sequence[str], None] = '88ad83b58cff'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'user',
+        sa.Column('version', sa.Integer(), server_default='1', nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('user', 'version')
@@ -0,0 +1,4 @@
+import time
+
+# Reference point for the cold-start report: first import of the package
+IMPORT_STARTED = time.perf_counter()
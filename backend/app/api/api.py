@@ -1,7 +1,22 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 
-from app.api.v1.endpoints import auth, oauth
+from app.api.v1.endpoints import admin, auth, code, feedback, oauth
+from app.core.rate_limit import limit_credential_attempts
 
 api_router = APIRouter()
+api_router.include_router(
+    auth.credentials_router,
+    prefix="/auth",
+    tags=["auth"],
+    dependencies=[Depends(limit_credential_attempts)],
+)
 api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
 api_router.include_router(oauth.router, prefix="/auth", tags=["oauth"])
+api_router.include_router(feedback.router, prefix="/feedback", tags=["feedback"])
+api_router.include_router(code.router, prefix="/code", tags=["code"])
+api_router.include_router(
+    admin.router,
+    prefix="/admin",
+    tags=["admin"],
+    dependencies=[Depends(auth.get_current_active_superuser)],
+)
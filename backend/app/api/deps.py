@@ -1,11 +1,16 @@
-from typing import Generator
+from typing import AsyncGenerator
 
-from app.db.session import SessionLocal
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.db.session import AsyncSessionLocal, read_session
 
-def get_db() -> Generator:
-    try:
-        db = SessionLocal()
+
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """Session for read-only endpoints; served by a replica when configured."""
+    async with read_session() as db:
         yield db
-    finally:
-        db.close()
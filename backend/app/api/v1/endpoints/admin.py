@@ -0,0 +1,151 @@
+from typing import Any, Literal
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+
+from app import crud, schemas
+from app.core import security
+from app.core.hashing import password_hasher
+from app.db.session import pool_stats, read_session
+from app.services import user_transfer
+from app.services.code_runner import code_runner
+from app.services.llm import llm_gateway
+from app.services.user_cache import user_cache
+
+router = APIRouter()
+
+MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+@router.get("/users", response_model=schemas.UserPage)
+async def list_users(
+    after_id: int | None = None,
+    limit: int = Query(100, ge=1, le=1000),
+    provider: str | None = None,
+    is_active: bool | None = None,
+    format: Literal["json", "ndjson"] = "json",
+) -> Any:
+    """
+    List users by id with keyset pagination, or stream every match as NDJSON
+    """
+    criteria = crud.user_filters(
+        provider=provider, is_active=is_active, after_id=after_id
+    )
+    if format == "ndjson":
+        # Unpaged: a server-side cursor keeps memory flat however many rows match
+        return StreamingResponse(
+            user_transfer.export_users("ndjson", criteria=criteria),
+            media_type=MEDIA_TYPES["ndjson"],
+        )
+
+    async with read_session() as db:
+        # One extra row tells us whether there is a next page
+        users = await crud.list_users(db, limit=limit + 1, criteria=criteria)
+    has_more = len(users) > limit
+    users = users[:limit]
+    return schemas.UserPage(
+        items=users, next_after_id=users[-1].id if has_more else None
+    )
+
+
+@router.get("/users/search", response_model=list[schemas.UserSearchHit])
+async def search_users(
+    q: str = Query(..., min_length=2, max_length=100),
+    limit: int = Query(20, ge=1, le=100),
+) -> Any:
+    """
+    Fuzzy search users by full name or email, ranked by trigram similarity
+    """
+    async with read_session() as db:
+        hits = await crud.search_users(db, q, limit)
+    return [schemas.UserSearchHit(user=user, score=score) for user, score in hits]
+
+
+@router.post("/users/import")
+async def import_users(
+    request: Request,
+    format: Literal["csv", "ndjson"] = "csv",
+    batch_size: int | None = None,
+) -> Any:
+    """
+    Bulk import users from a CSV/NDJSON request body, streamed into COPY batches
+    """
+    try:
+        report = await user_transfer.import_users(
+            user_transfer.iter_lines(request.stream()),
+            fmt=format,
+            batch_size=batch_size,
+        )
+    except user_transfer.UserTransferError as exc:
+        raise HTTPException(status_code=501, detail=str(exc))
+    except user_transfer.InvalidEncodingError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return report.to_dict()
+
+
+@router.get("/users/export")
+async def export_users(format: Literal["csv", "ndjson"] = "csv"):
+    """
+    Stream every user (without password hashes) as CSV or NDJSON
+    """
+    if format == "csv":
+        try:
+            user_transfer.require_postgres()
+        except user_transfer.UserTransferError as exc:
+            raise HTTPException(status_code=501, detail=str(exc))
+    return StreamingResponse(
+        user_transfer.export_users(format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="users.{format}"'},
+    )
+
+
+@router.get("/password-hashing")
+def password_hashing_status() -> Any:
+    """
+    Calibrated password hashing policy and hashing pool load, for capacity planning
+    """
+    return {
+        "calibration": security.hash_calibration(),
+        "pool": password_hasher.stats(),
+    }
+
+
+@router.get("/startup")
+def startup_report(request: Request) -> Any:
+    """
+    Import and warm-up timings of this worker (cold-start report)
+    """
+    return request.app.state.startup_report
+
+
+@router.get("/db-pool")
+def db_pool_status() -> Any:
+    """
+    Connection pool policy and usage of this worker, for sizing connections per worker
+    """
+    return pool_stats()
+
+
+@router.get("/llm-cache")
+def llm_cache_status() -> Any:
+    """
+    LLM gateway provider, cache sizes and hit rates of this worker
+    """
+    return llm_gateway.stats()
+
+
+@router.get("/user-cache")
+def user_cache_status() -> Any:
+    """
+    User cache size and hit counts of this worker, per tier
+    """
+    return user_cache.stats()
+
+
+@router.get("/code-runner")
+def code_runner_status() -> Any:
+    """
+    Sandbox worker pool, queue and limits of this worker, for sizing code runners
+    """
+    return code_runner.stats()
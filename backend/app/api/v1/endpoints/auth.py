@@ -1,27 +1,47 @@
 from datetime import timedelta
 from typing import Any
 
-from fastapi import APIRouter, Cookie, Depends, HTTPException, status
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, BackgroundTasks, Cookie, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from jose import JWTError, jwt
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import crud, schemas
 from app.api import deps
-from app.core import security
+from app.core import refresh_tokens, security
 from app.core.config import settings
-from app.core.cookies import clear_auth_cookie, set_auth_cookie
+from app.core.cookies import (
+    REFRESH_COOKIE_NAME,
+    clear_auth_cookie,
+    clear_refresh_cookie,
+    set_auth_cookie,
+    set_refresh_cookie,
+)
+from app.core.hashing import HashingQueueFull
+from app.core.responses import PydanticJSONResponse
+from app.db.session import AsyncSessionLocal, read_session
 from app.models.user import User
+from app.services.user_cache import user_cache
 
 router = APIRouter()
+# Credential endpoints (bcrypt-heavy); mounted with admission control in api.py
+credentials_router = APIRouter()
 
 # OAuth2 scheme for token authentication
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
 
-def get_current_user(
-    db: Session = Depends(deps.get_db),
+async def load_user(user_id: int) -> User | None:
+    """Load a user through the user cache, opening a session only on a miss."""
+    user = await user_cache.get(user_id)
+    if user is None:
+        async with read_session() as db:
+            user = await db.get(User, user_id)
+        if user is not None:
+            await user_cache.set(user)
+    return user
+
+
+async def get_current_user(
     access_token: str = Cookie(None, alias="access_token"),
 ):
     credentials_exception = HTTPException(
@@ -34,30 +54,56 @@ def get_current_user(
         raise credentials_exception
 
     try:
-        payload = jwt.decode(
-            access_token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
+        payload = security.decode_access_token(access_token)
         user_id: str = payload.get("sub")
         if user_id is None:
             raise credentials_exception
-    except JWTError:
+    except security.TokenError:
         raise credentials_exception
 
-    user = db.query(User).filter(User.id == int(user_id)).first()
+    # Stateless mode: the verified token already describes the user
+    principal = payload.get("usr")
+    if settings.AUTH_PRINCIPAL_MODE == "token" and principal is not None:
+        return schemas.Principal.model_validate(principal)
+
+    user = await load_user(int(user_id))
     if user is None:
         raise credentials_exception
     return user
 
 
-@router.post("/login", response_model=schemas.AuthResponse)
-def login(
-    db: Session = Depends(deps.get_db), form_data: OAuth2PasswordRequestForm = Depends()
+async def get_current_active_superuser(current_user=Depends(get_current_user)):
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="The user doesn't have enough privileges",
+        )
+    return current_user
+
+
+async def rehash_password(user_id: int, password: str, old_hash: str) -> None:
+    """Upgrade a stored hash to the current policy after a successful login."""
+    try:
+        new_hash = await security.hash_password(password)
+    except HashingQueueFull:
+        # Not urgent; the next login will try again
+        return
+    async with AsyncSessionLocal() as db:
+        await crud.user.update_password_hash(db, user_id, old_hash, new_hash)
+
+
+@credentials_router.post("/login", response_model=schemas.AuthResponse)
+async def login(
+    background_tasks: BackgroundTasks,
+    # Only looks the user up; writes (rehash) open their own primary session
+    db: AsyncSession = Depends(deps.get_read_db),
+    form_data: OAuth2PasswordRequestForm = Depends(),
 ) -> Any:
     """
     Login with email and password
     """
-    user = crud.user.get_user_by_email(db, email=form_data.username)
-    if not user or not security.verify_password(
+    user = await crud.user.get_user_by_email(db, email=form_data.username)
+    if not user or not await security.check_password(
         form_data.password, user.hashed_password
     ):
         raise HTTPException(
@@ -68,51 +114,57 @@ def login(
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user"
         )
+    if security.needs_rehash(user.hashed_password):
+        # Hashed under an older/weaker policy; upgrade after the response is sent
+        background_tasks.add_task(
+            rehash_password, user.id, form_data.password, user.hashed_password
+        )
 
     # Generate access token
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = security.create_access_token(
-        subject=user.id, expires_delta=access_token_expires
+    access_token = security.create_user_access_token(
+        user, expires_delta=access_token_expires
     )
 
     # Create response with user data using schema
     response_data = schemas.AuthResponse(user=user, message="Login successful")
 
-    response = JSONResponse(content=response_data.model_dump())
+    response = PydanticJSONResponse(response_data)
 
-    # Set HTTP-only cookie via shared helper
+    # Set HTTP-only cookies via shared helpers
     set_auth_cookie(
         response,
         token=access_token,
         max_age=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
     )
+    refresh_token = await refresh_tokens.issue_refresh_token(user.id)
+    if refresh_token is not None:
+        set_refresh_cookie(response, refresh_token)
 
     return response
 
 
-@router.post("/signup", response_model=schemas.AuthResponse)
-def create_user_signup(
+@credentials_router.post("/signup", response_model=schemas.AuthResponse)
+async def create_user_signup(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db),
     user_in: schemas.UserCreate,
 ) -> Any:
     """
     Create new user and automatically log them in.
     """
-    user = crud.user.get_user_by_email(db, email=user_in.email)
-    if user:
+    # Create the user; a taken email comes back as None from the same statement
+    user = await crud.user.create_user(db=db, user=user_in)
+    if user is None:
         raise HTTPException(
             status_code=400,
             detail="The user with this email already exists in the system.",
         )
 
-    # Create the user
-    user = crud.user.create_user(db=db, user=user_in)
-
     # Generate access token for automatic login
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = security.create_access_token(
-        subject=user.id, expires_delta=access_token_expires
+    access_token = security.create_user_access_token(
+        user, expires_delta=access_token_expires
     )
 
     # Create response with user data using schema
@@ -120,36 +172,96 @@ def create_user_signup(
         user=user, message="Account created successfully"
     )
 
-    # Create JSON response
-    response = JSONResponse(content=response_data.model_dump())
+    # Serialized straight to JSON bytes
+    response = PydanticJSONResponse(response_data)
 
-    # Set HTTP-only cookie
+    # Set HTTP-only cookies
     set_auth_cookie(
         response,
         token=access_token,
         max_age=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
     )
+    refresh_token = await refresh_tokens.issue_refresh_token(user.id)
+    if refresh_token is not None:
+        set_refresh_cookie(response, refresh_token)
 
     return response
 
 
 @router.get("/me", response_model=schemas.User)
-def read_users_me(current_user=Depends(get_current_user)):
+async def read_users_me(current_user=Depends(get_current_user)):
     """
     Get current user profile
     """
     return current_user
 
 
+@router.post("/refresh", response_model=schemas.AuthResponse)
+async def refresh_access_token(
+    refresh_token: str = Cookie(None, alias=REFRESH_COOKIE_NAME),
+) -> Any:
+    """
+    Rotate the refresh token and issue a new access token, without a password check
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid or expired refresh token",
+    )
+    if not refresh_token:
+        raise credentials_exception
+
+    try:
+        user_id, new_refresh_token = await refresh_tokens.rotate_refresh_token(
+            refresh_token
+        )
+    except refresh_tokens.RefreshTokenError:
+        raise credentials_exception
+    except refresh_tokens.RefreshTokenStoreUnavailable:
+        # Not the client's fault: keep its refresh token and let it retry
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Token refresh is temporarily unavailable, please try again.",
+            headers={"Retry-After": "5"},
+        )
+
+    user = await load_user(user_id)
+    if user is None or not user.is_active:
+        await refresh_tokens.revoke_refresh_token(new_refresh_token)
+        raise credentials_exception
+
+    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = security.create_user_access_token(
+        user, expires_delta=access_token_expires
+    )
+
+    response_data = schemas.AuthResponse(user=user, message="Token refreshed")
+    response = PydanticJSONResponse(response_data)
+
+    set_auth_cookie(
+        response,
+        token=access_token,
+        max_age=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    )
+    set_refresh_cookie(response, new_refresh_token)
+
+    return response
+
+
 @router.post("/logout", response_model=schemas.LogoutResponse)
-def logout():
+async def logout(
+    refresh_token: str = Cookie(None, alias=REFRESH_COOKIE_NAME),
+):
     """
-    Logout user by clearing the HTTP-only cookie
+    Logout user by revoking the refresh token and clearing the HTTP-only cookies
     """
+    if refresh_token:
+        await refresh_tokens.revoke_refresh_token(refresh_token)
+
     response_data = schemas.LogoutResponse(message="Successfully logged out")
-    response = JSONResponse(content=response_data.model_dump())
+    response = PydanticJSONResponse(response_data)
 
-    # Clear the access token cookie
+    # Clear the access and refresh token cookies
     clear_auth_cookie(response)
+    clear_refresh_cookie(response)
 
     return response
@@ -0,0 +1,62 @@
+import json
+import logging
+from contextlib import aclosing
+from typing import AsyncIterator
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+
+from app import schemas
+from app.api.v1.endpoints.auth import get_current_user
+from app.services.code_runner import (
+    CodeRunnerBusy,
+    CodeRunnerError,
+    TooManyCodeRuns,
+    code_runner,
+)
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+@router.post("/run")
+async def run_code(request: schemas.CodeRunRequest, current_user=Depends(get_current_user)):
+    """
+    Run a submission against its test cases. Streams NDJSON events: start,
+    one case result per test case as it finishes, then done
+    """
+    try:
+        run = await code_runner.submit(
+            current_user.id, request.code, [case.input for case in request.test_cases]
+        )
+    except TooManyCodeRuns:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many code runs in progress, please wait for one to finish.",
+        )
+    except CodeRunnerBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, please try again shortly.",
+            headers={"Retry-After": str(code_runner.retry_after())},
+        )
+    except CodeRunnerError as exc:
+        logger.error("Code runner disabled: %s", exc)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Code execution is unavailable.",
+        )
+    expected = [case.expected_output for case in request.test_cases]
+
+    async def body() -> AsyncIterator[str]:
+        # Closing early (client gone) cancels the run, queued or executing
+        async with aclosing(code_runner.judge(run, expected)) as events:
+            async for event in events:
+                yield json.dumps(event) + "\n"
+
+    return StreamingResponse(
+        body(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
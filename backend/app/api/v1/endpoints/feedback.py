@@ -0,0 +1,202 @@
+import asyncio
+import json
+import logging
+from contextlib import aclosing
+from typing import AsyncIterator
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    WebSocket,
+    WebSocketDisconnect,
+    status,
+)
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+
+from app import schemas
+from app.api.v1.endpoints.auth import get_current_user
+from app.core.config import settings
+from app.core.rate_limit import stream_limiter
+from app.services.feedback import stream_feedback
+from app.services.llm import LLMError
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+TOO_MANY_STREAMS = "Too many feedback streams in progress, please wait for one to finish."
+# Past FEEDBACK_STREAM_MAX_SECONDS, how long a send to a client that stopped
+# reading may block before the connection is dropped
+SEND_GRACE_SECONDS = 5.0
+
+
+async def _acquire_stream_slot(key: str) -> tuple[str | None, float]:
+    """Take a stream slot; returns its lease id and the loop time it ends at.
+
+    Transports must be done with the stream by then: the lease, and so the
+    per-user cap, only lasts that long.
+    """
+    lease_seconds = settings.FEEDBACK_STREAM_MAX_SECONDS + SEND_GRACE_SECONDS
+    ends_at = asyncio.get_running_loop().time() + lease_seconds
+    lease = await stream_limiter.acquire(
+        key, settings.FEEDBACK_MAX_STREAMS_PER_USER, lease_seconds
+    )
+    return lease, ends_at
+
+
+class LeasedStreamingResponse(StreamingResponse):
+    """A StreamingResponse that holds a limiter slot for its whole life.
+
+    The slot is released however the response ends, including when the
+    client is gone before the body starts, and a client that stops reading
+    is cut off when the lease ends.
+    """
+
+    def __init__(self, content, *, key: str, lease: str, ends_at: float, **kwargs):
+        super().__init__(content, **kwargs)
+        self.key = key
+        self.lease = lease
+        self.ends_at = ends_at
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            async with asyncio.timeout_at(self.ends_at):
+                await super().__call__(scope, receive, send)
+        except TimeoutError:
+            logger.warning("Feedback stream cut off: the client stopped reading")
+        finally:
+            await stream_limiter.release(self.key, self.lease)
+
+
+async def feedback_events(request: schemas.FeedbackRequest) -> AsyncIterator[dict]:
+    """Transport-neutral events: start, token..., then done or error.
+
+    ``start`` goes out before any model work, so the client sees the first
+    byte in milliseconds. Tokens are pulled from the model only as fast as
+    the caller sends them on, which is the per-connection backpressure;
+    closing this iterator cancels the upstream generation.
+
+    FEEDBACK_STREAM_MAX_SECONDS is checked on every wait on the model, so
+    a provider that stalls is cut off in time, and again each time the
+    caller resumes us, which counts the time it took to send. No timeout is
+    held across our own ``yield``: firing while we are suspended there would
+    cancel the caller mid-send instead of us. A send that never returns is
+    the transport's to cut off (see ``_acquire_stream_slot``).
+    """
+    yield {"type": "start"}
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.FEEDBACK_STREAM_MAX_SECONDS
+    try:
+        async with aclosing(stream_feedback(request)) as tokens:
+            while True:
+                try:
+                    async with asyncio.timeout_at(deadline):
+                        token = await anext(tokens)
+                except StopAsyncIteration:
+                    break
+                yield {"type": "token", "data": token}
+                if loop.time() >= deadline:
+                    raise TimeoutError
+    except TimeoutError:
+        yield {"type": "error", "detail": "Feedback took too long"}
+        return
+    except LLMError:
+        logger.warning("Feedback generation failed", exc_info=True)
+        yield {"type": "error", "detail": "Feedback is unavailable right now"}
+        return
+    yield {"type": "done"}
+
+
+async def _send_events(websocket: WebSocket, request: schemas.FeedbackRequest) -> None:
+    async with aclosing(feedback_events(request)) as events:
+        async for event in events:
+            # Waits for the transport, so a slow client slows the model read
+            await websocket.send_json(event)
+
+
+@router.websocket("/ws")
+async def feedback_websocket(
+    websocket: WebSocket, current_user=Depends(get_current_user)
+):
+    """
+    Stream feedback for one answer: send a FeedbackRequest as JSON, receive
+    start/token/done events. Sending {"type": "cancel"} or closing the
+    socket stops the generation.
+    """
+    await websocket.accept()
+    try:
+        request = schemas.FeedbackRequest.model_validate(await websocket.receive_json())
+    except (ValidationError, ValueError):
+        await websocket.send_json({"type": "error", "detail": "Invalid feedback request"})
+        await websocket.close(code=status.WS_1007_INVALID_FRAME_PAYLOAD_DATA)
+        return
+    except WebSocketDisconnect:
+        return
+
+    key = f"feedback:{current_user.id}"
+    lease, ends_at = await _acquire_stream_slot(key)
+    if lease is None:
+        await websocket.send_json({"type": "error", "detail": TOO_MANY_STREAMS})
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+        return
+
+    sender = asyncio.create_task(_send_events(websocket, request))
+    # Any client message (a cancel) or a disconnect ends the stream early
+    listener = asyncio.create_task(websocket.receive())
+    try:
+        done, _ = await asyncio.wait(
+            {sender, listener},
+            timeout=ends_at - asyncio.get_running_loop().time(),
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+        if not done:
+            # A send stuck on a client that stopped reading; drop it
+            logger.warning("Feedback stream cut off: the client stopped reading")
+            return
+        if sender in done:
+            sender.result()
+            await websocket.close()
+            return
+        sender.cancel()
+        if listener.result()["type"] != "websocket.disconnect":
+            await websocket.send_json({"type": "cancelled"})
+            await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for task in (sender, listener):
+            task.cancel()
+        await asyncio.gather(sender, listener, return_exceptions=True)
+        await stream_limiter.release(key, lease)
+
+
+@router.post("/stream")
+async def feedback_sse(
+    request: schemas.FeedbackRequest, current_user=Depends(get_current_user)
+):
+    """
+    Server-Sent Events fallback for clients that can't open a WebSocket
+    """
+    key = f"feedback:{current_user.id}"
+    lease, ends_at = await _acquire_stream_slot(key)
+    if lease is None:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=TOO_MANY_STREAMS
+        )
+
+    async def body() -> AsyncIterator[str]:
+        async with aclosing(feedback_events(request)) as events:
+            async for event in events:
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+    return LeasedStreamingResponse(
+        body(),
+        key=key,
+        lease=lease,
+        ends_at=ends_at,
+        media_type="text/event-stream",
+        # Proxies must pass tokens through as they come, not buffer them
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
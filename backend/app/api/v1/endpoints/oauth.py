@@ -1,32 +1,67 @@
+import asyncio
+import time
 from datetime import timedelta
 from typing import Any
 
-from fastapi import APIRouter, Depends, HTTPException, Request
+import httpx
+from fastapi import APIRouter, Cookie, Depends, HTTPException, Request
 from fastapi.responses import RedirectResponse
-from sqlalchemy.orm import Session
+from jose import JWTError
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import crud
 from app.api import deps
-from app.core import security
+from app.core import refresh_tokens, security
 from app.core.config import settings
-from app.core.cookies import set_auth_cookie
-from app.core.oauth import oauth
-from app.models.user import User
+from app.core.cookies import (
+    OAUTH_STATE_COOKIE_NAME,
+    clear_oauth_state_cookie,
+    set_auth_cookie,
+    set_oauth_state_cookie,
+    set_refresh_cookie,
+)
+from app.core.http import get_http_client, provider_timeout
+from app.core.oauth import OAUTH_PROVIDERS, get_oauth_client, google_jwks
 
 router = APIRouter()
 
 
+async def fetch_github_identity(token: dict) -> tuple[httpx.Response, httpx.Response]:
+    """Fetch the GitHub profile and email list concurrently over the shared pool.
+
+    Both calls use the same access token and don't depend on each other, so
+    running them together costs one provider round trip instead of two.
+    """
+    client = get_http_client()
+    headers = {
+        "Authorization": f"Bearer {token['access_token']}",
+        "Accept": "application/vnd.github+json",
+    }
+    timeout = provider_timeout("github")
+    return await asyncio.gather(
+        client.get(f"{settings.GITHUB_API_URL}/user", headers=headers, timeout=timeout),
+        client.get(
+            f"{settings.GITHUB_API_URL}/user/emails", headers=headers, timeout=timeout
+        ),
+    )
+
+
+def _state_marker(provider: str, state: str) -> str:
+    # Session key Authlib's Starlette integration uses for a flow's state
+    return f"_state_{provider}_{state}"
+
+
 @router.get("/login/{provider}")
 async def oauth_login(request: Request, provider: str):
     """
     Redirect to OAuth provider (google or github)
     """
     # Validate provider
-    if provider not in ["google", "github"]:
+    if provider not in OAUTH_PROVIDERS:
         raise HTTPException(status_code=400, detail="Unsupported OAuth provider")
 
     # Check if OAuth client is configured
-    client = oauth.create_client(provider)
+    client = get_oauth_client(provider)
     if client is None:
         raise HTTPException(
             status_code=500,
@@ -38,22 +73,54 @@ async def oauth_login(request: Request, provider: str):
         f"{settings.BACKEND_URL}{settings.API_V1_STR}/auth/login/{provider}/callback"
     )
 
+    # Authlib keeps the state data in the server-side store and records a
+    # marker for it in this flow-scoped session, which stands in for cookies
+    request.scope["session"] = {}
     try:
-        return await client.authorize_redirect(request, redirect_uri, prompt="consent")
+        response = await client.authorize_redirect(
+            request, redirect_uri, prompt="consent"
+        )
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Failed to initiate OAuth flow: {str(e)}"
         )
+    prefix = _state_marker(provider, "")
+    state = next(
+        key[len(prefix) :] for key in request.session if key.startswith(prefix)
+    )
+    set_oauth_state_cookie(response, state)
+    return response
 
 
 @router.get("/login/{provider}/callback")
 async def oauth_callback(
-    request: Request, provider: str, db: Session = Depends(deps.get_db)
+    request: Request,
+    provider: str,
+    db: AsyncSession = Depends(deps.get_db),
+    oauth_state: str | None = Cookie(None, alias=OAUTH_STATE_COOKIE_NAME),
 ) -> Any:
     """
     Handle OAuth callback, create/retrieve user, and redirect to frontend with token
     """
-    client = oauth.create_client(provider)
+    # Only the browser holding the state cookie from /login/{provider} gets
+    # the marker Authlib requires, so a callback URL can't be replayed elsewhere
+    session = {}
+    if oauth_state:
+        marker = {"exp": time.time() + settings.OAUTH_STATE_TTL_SECONDS}
+        session[_state_marker(provider, oauth_state)] = marker
+    request.scope["session"] = session
+
+    response = await _complete_oauth_login(request, provider, db)
+    clear_oauth_state_cookie(response)
+    return response
+
+
+async def _complete_oauth_login(request: Request, provider: str, db: AsyncSession):
+    client = get_oauth_client(provider)
+    if client is None:
+        return RedirectResponse(
+            url=f"{settings.FRONTEND_URL}/signin?error=oauth_failed&details=provider_not_configured"
+        )
     try:
         token = await client.authorize_access_token(request)
     except Exception as e:
@@ -72,7 +139,17 @@ async def oauth_callback(
         # Get user info from token
         user_info = token.get("userinfo")
         if not user_info:
-            user_info = await client.parse_id_token(request, token)
+            # Verified locally against the cached Google signing keys
+            try:
+                user_info = await google_jwks.verify_id_token(
+                    token.get("id_token", ""),
+                    audience=settings.GOOGLE_CLIENT_ID,
+                    access_token=token.get("access_token"),
+                )
+            except (JWTError, httpx.HTTPError):
+                return RedirectResponse(
+                    url=f"{settings.FRONTEND_URL}/signin?error=invalid_id_token"
+                )
 
         # Validate issuer for security
         iss = user_info.get("iss")
@@ -86,7 +163,12 @@ async def oauth_callback(
         provider_id = user_info.get("sub")
 
     elif provider == "github":
-        resp = await client.get("https://api.github.com/user", token=token)
+        try:
+            resp, emails_resp = await fetch_github_identity(token)
+        except httpx.HTTPError:
+            return RedirectResponse(
+                url=f"{settings.FRONTEND_URL}/signin?error=github_api_error"
+            )
         if resp.status_code != 200:
             return RedirectResponse(
                 url=f"{settings.FRONTEND_URL}/signin?error=github_api_error"
@@ -99,36 +181,18 @@ async def oauth_callback(
             profile.get("id")
         )  # Use durable ID as per GitHub best practices
 
-        # Revalidate user identity as recommended by GitHub
-        # This ensures we're getting the current user and not cached data
-        user_validation_resp = await client.get(
-            "https://api.github.com/user", token=token
-        )
-        if (
-            user_validation_resp.status_code == 200
-            and str(user_validation_resp.json().get("id")) != provider_id
-        ):
-            return RedirectResponse(
-                url=f"{settings.FRONTEND_URL}/signin?error=user_identity_mismatch"
-            )
-
-        # GitHub doesn't always provide email in the user profile
-        # Need to fetch from the user/emails endpoint
-        if not email:
-            emails_resp = await client.get(
-                "https://api.github.com/user/emails", token=token
-            )
-            if emails_resp.status_code == 200:
-                emails = emails_resp.json()
-                for e in emails:
-                    # Get primary and verified email as per GitHub recommendations
-                    if e.get("primary") and e.get("verified"):
-                        email = e.get("email")
-                        break
+        # GitHub doesn't always provide email in the user profile,
+        # so fall back to the user/emails list fetched alongside it
+        if not email and emails_resp.status_code == 200:
+            emails = emails_resp.json()
+            for e in emails:
+                # Get primary and verified email as per GitHub recommendations
+                if e.get("primary") and e.get("verified"):
+                    email = e.get("email")
+                    break
 
             # If still no email, try to get any verified email
-            if not email and emails_resp.status_code == 200:
-                emails = emails_resp.json()
+            if not email:
                 for e in emails:
                     if e.get("verified"):
                         email = e.get("email")
@@ -146,63 +210,34 @@ async def oauth_callback(
             url=f"{settings.FRONTEND_URL}/signin?error=missing_user_info"
         )
 
-    # Check if user exists by email
-    user = crud.user.get_user_by_email(db, email=email)
-    if not user:
-        # Check if user with this provider_id already exists (prevents duplicate accounts)
-        existing_user = (
-            db.query(User)
-            .filter(User.provider == provider, User.provider_id == provider_id)
-            .first()
+    # Create or update the user in a single round trip
+    try:
+        user = await crud.user.resolve_oauth_user(
+            db,
+            provider=provider,
+            provider_id=provider_id,
+            email=email,
+            full_name=full_name,
         )
-
-        if existing_user:
-            # User changed their email on GitHub/Google but same account
-            existing_user.email = email
-            existing_user.full_name = full_name or existing_user.full_name
-            db.commit()
-            user = existing_user
-        else:
-            # Create new user with OAuth info
-            user = User(
-                email=email,
-                full_name=full_name or email.split("@")[0],  # Fallback name
-                hashed_password="",  # OAuth users don't have passwords
-                provider=provider,
-                provider_id=provider_id,
-                is_active=True,
-            )
-            db.add(user)
-            db.commit()
-            db.refresh(user)
-    else:
-        # User exists - validate and update provider info if needed
-        if user.provider and user.provider != provider:
+    except crud.OAuthIdentityConflict as conflict:
+        if conflict.reason == "account_already_exists":
             # User is trying to login with different OAuth provider
             # This could be account linking or a security issue
             return RedirectResponse(
-                url=f"{settings.FRONTEND_URL}/signin?error=account_already_exists&provider={user.provider}"
+                url=f"{settings.FRONTEND_URL}/signin?error=account_already_exists&provider={conflict.provider}"
             )
-        elif not user.provider:
-            # Link OAuth account to existing email/password account
-            user.provider = provider
-            user.provider_id = provider_id
-            db.commit()
-        elif user.provider_id != provider_id:
-            # Same provider but different provider_id - suspicious
-            return RedirectResponse(
-                url=f"{settings.FRONTEND_URL}/signin?error=provider_id_mismatch"
-            )
-        else:
-            # Update user info in case it changed on the OAuth provider
-            user.full_name = full_name or user.full_name
-            user.is_active = True  # Reactivate if was deactivated
-            db.commit()
+        # Same provider but different provider_id - suspicious
+        return RedirectResponse(
+            url=f"{settings.FRONTEND_URL}/signin?error=provider_id_mismatch"
+        )
+    # Signing in through a provider doesn't undo a deactivation
+    if not user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
 
     # Generate JWT with proper expiration
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = security.create_access_token(
-        subject=user.id, expires_delta=access_token_expires
+    access_token = security.create_user_access_token(
+        user, expires_delta=access_token_expires
     )
 
     # Create response with secure cookie
@@ -210,11 +245,14 @@ async def oauth_callback(
         url=f"{settings.FRONTEND_URL}/auth/callback?token={access_token}"
     )
 
-    # Set secure HTTP-only cookie
+    # Set secure HTTP-only cookies
     set_auth_cookie(
         response,
         token=access_token,
         max_age=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
     )
+    refresh_token = await refresh_tokens.issue_refresh_token(user.id)
+    if refresh_token is not None:
+        set_refresh_cookie(response, refresh_token)
 
     return response
@@ -0,0 +1,76 @@
+"""Management commands.
+
+Usage (from the backend directory):
+
+    python -m app.cli import-users users.csv [--batch-size 5000]
+    python -m app.cli export-users users.ndjson
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+from typing import AsyncIterator
+
+from app.services import user_transfer
+
+
+def _format_for(path: Path, explicit: str | None) -> str:
+    if explicit:
+        return explicit
+    return "ndjson" if path.suffix in {".ndjson", ".jsonl"} else "csv"
+
+
+async def _read_lines(path: Path) -> AsyncIterator[str]:
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            yield line.rstrip("\r\n")
+
+
+async def import_users(args: argparse.Namespace) -> None:
+    path = Path(args.path)
+    report = await user_transfer.import_users(
+        _read_lines(path),
+        fmt=_format_for(path, args.format),
+        batch_size=args.batch_size,
+    )
+    user_transfer.shutdown_hash_pool()
+    print(json.dumps(report.to_dict(), indent=2))
+
+
+async def export_users(args: argparse.Namespace) -> None:
+    path = Path(args.path)
+    report = user_transfer.TransferReport()
+    with path.open("wb") as f:
+        async for chunk in user_transfer.export_users(
+            _format_for(path, args.format), report=report
+        ):
+            f.write(chunk)
+    print(json.dumps(report.to_dict(), indent=2))
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    importer = commands.add_parser("import-users", help="Bulk load users via COPY")
+    importer.add_argument("path")
+    importer.add_argument("--format", choices=["csv", "ndjson"])
+    importer.add_argument("--batch-size", type=int)
+    importer.set_defaults(handler=import_users)
+
+    exporter = commands.add_parser("export-users", help="Stream all users to a file")
+    exporter.add_argument("path")
+    exporter.add_argument("--format", choices=["csv", "ndjson"])
+    exporter.set_defaults(handler=export_users)
+
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(args.handler(args))
+    except user_transfer.UserTransferError as exc:
+        sys.exit(str(exc))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Literal
 
 from pydantic_settings import BaseSettings
 
@@ -13,12 +13,94 @@ class Settings(BaseSettings):
     POSTGRES_PASSWORD: str
     POSTGRES_DB: str
     DATABASE_URL: str | None = None
+    # Optional override for the async engine; derived from DATABASE_URL when unset
+    ASYNC_DATABASE_URL: str | None = None
+    # Optional read replicas for read-only request paths, used round-robin; a
+    # replica that fails to connect is skipped for DB_REPLICA_EJECT_SECONDS
+    DATABASE_REPLICA_URLS: List[str] = []
+    DB_REPLICA_EJECT_SECONDS: float = 30.0
+    # Connection pool policy, per engine and per worker process. "null" opens a
+    # connection per checkout, for when PgBouncer does the pooling.
+    DB_POOL_MODE: Literal["queue", "null"] = "queue"
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0
+    # Close connections older than this on checkout (-1 keeps them forever)
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    # "pre_ping" tests each checkout with a round trip; "on_error" skips it and
+    # relies on a disconnect error invalidating the pool (that request fails)
+    DB_POOL_LIVENESS: Literal["pre_ping", "on_error"] = "pre_ping"
+    # PgBouncer transaction mode: no cached server-side prepared statements
+    DB_PGBOUNCER: bool = False
 
     # Security
     SECRET_KEY: str
+    # Access-token signing: HS256 (SECRET_KEY), or EdDSA/ES256 with JWT_PRIVATE_KEY
     ALGORITHM: str = "HS256"
+    JWT_BACKEND: Literal["jose", "pyjwt"] = "jose"
+    # Written to the "kid" header; tokens naming another kid need JWT_VERIFY_KEYS
+    JWT_KEY_ID: str | None = None
+    # PEM text or path to a PEM file; verify-only services can leave it unset
+    JWT_PRIVATE_KEY: str | None = None
+    # Extra verification keys by kid (secret or public PEM) kept during rotation
+    JWT_VERIFY_KEYS: dict[str, str] = {}
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    # A just-rotated refresh token still yields the same successor this long,
+    # so concurrent refreshes (several tabs) aren't treated as token theft
+    REFRESH_TOKEN_REUSE_GRACE_SECONDS: int = 10
+    # "db" loads the user on each request; "token" trusts a user snapshot in the JWT
+    AUTH_PRINCIPAL_MODE: Literal["db", "token"] = "db"
+
+    # Password hashing pool of each app process (defaults to one worker per
+    # CPU); the queue bound is per process too
+    PASSWORD_HASH_WORKERS: int | None = None
+    PASSWORD_HASH_EXECUTOR: Literal["thread", "process"] = "thread"
+    PASSWORD_HASH_MAX_QUEUE: int = 64
+    # Work factor is calibrated at startup to about TARGET_MS per hash on this
+    # machine; PASSWORD_HASH_COST pins it (bcrypt rounds / argon2id time cost)
+    PASSWORD_HASH_SCHEME: Literal["bcrypt", "argon2id"] = "bcrypt"
+    PASSWORD_HASH_TARGET_MS: int = 250
+    PASSWORD_HASH_COST: int | None = None
+    PASSWORD_HASH_ARGON2_MEMORY_KIB: int = 65536
+    PASSWORD_HASH_ARGON2_PARALLELISM: int = 1
+
+    # Admission control for credential endpoints (login/signup)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_WINDOW_SECONDS: int = 60
+    RATE_LIMIT_CREDENTIALS_PER_IP: int = 30
+    RATE_LIMIT_CREDENTIALS_PER_EMAIL: int = 10
+    # Comma-separated IPs/CIDRs of reverse proxies trusted to report the client
+    # address in X-Forwarded-For ("*" trusts any peer). Same variable and format
+    # as uvicorn's --forwarded-allow-ips. Without it, per-IP limits see the
+    # proxy's address and every client behind it shares one bucket.
+    FORWARDED_ALLOW_IPS: str | None = None
+
+    # Metrics (/metrics); set a shared directory when running several workers
+    METRICS_ENABLED: bool = True
+    METRICS_MULTIPROC_DIR: str | None = None
+    METRICS_FLUSH_SECONDS: float = 5.0
+
+    # Startup warm-up: pre-open pooled DB connections, build OpenAPI, register
+    # OAuth clients; the token codec and hash calibration always run
+    STARTUP_WARMUP: bool = True
+    DB_WARM_CONNECTIONS: int = 2
+
+    # Development/staging: per-request SQL counts in a Server-Timing header
+    SQL_PROFILING_ENABLED: bool = False
+    SQL_PROFILING_QUERY_BUDGET: int = 10
+
+    # Redis (optional; enables shared cache tiers)
+    REDIS_URL: str | None = None
+
+    # Authenticated-user cache
+    USER_CACHE_MAX_SIZE: int = 10_000
+    USER_CACHE_TTL_SECONDS: int = 30
+    USER_CACHE_REDIS_TTL_SECONDS: int = 300
+
+    # Bulk user import/export
+    USER_IMPORT_BATCH_SIZE: int = 5_000
+    USER_IMPORT_HASH_WORKERS: int | None = None
 
     # CORS
     ALLOWED_ORIGINS: List[str] = ["http://localhost:3000"]
@@ -33,6 +115,56 @@ class Settings(BaseSettings):
 
     OAUTH_REDIRECT_URI: str | None = None
 
+    # Lifetime of server-side OAuth state (login redirect -> callback)
+    OAUTH_STATE_TTL_SECONDS: int = 600
+
+    # Outbound HTTP to OAuth provider APIs
+    GITHUB_API_URL: str = "https://api.github.com"
+    GITHUB_API_TIMEOUT_SECONDS: float = 5.0
+    GOOGLE_API_TIMEOUT_SECONDS: float = 5.0
+    OAUTH_HTTP_TIMEOUT_SECONDS: float = 10.0
+    OAUTH_HTTP_MAX_CONNECTIONS: int = 100
+    OAUTH_HTTP_MAX_KEEPALIVE: int = 20
+    OAUTH_HTTP_KEEPALIVE_SECONDS: float = 60.0
+
+    # LLM gateway (interview questions, code feedback); "stub" works offline
+    LLM_PROVIDER: Literal["stub", "openai"] = "stub"
+    OPENAI_API_KEY: str | None = None
+    LLM_API_URL: str = "https://api.openai.com/v1"
+    LLM_MODEL: str = "gpt-4o-mini"
+    LLM_EMBEDDING_MODEL: str = "text-embedding-3-small"
+    LLM_EMBEDDING_DIMENSIONS: int = 256
+    LLM_TIMEOUT_SECONDS: float = 60.0
+    # Response cache: exact match on the normalized prompt, then nearest
+    # neighbour over prompt embeddings at or above LLM_SEMANTIC_THRESHOLD
+    LLM_CACHE_MAX_ENTRIES: int = 5_000
+    LLM_CACHE_TTL_SECONDS: int = 86_400
+    LLM_SEMANTIC_CACHE_MAX_ENTRIES: int = 2_000
+    LLM_SEMANTIC_THRESHOLD: float = 0.92
+
+    # Streaming AI feedback (WebSocket, SSE fallback)
+    FEEDBACK_MAX_STREAMS_PER_USER: int = 2
+    # Longest a stream may run: it then ends with an error event. A client that
+    # stops reading is disconnected a few seconds later, when its limiter
+    # lease (this plus that grace) runs out.
+    FEEDBACK_STREAM_MAX_SECONDS: int = 120
+
+    # "Run code" sandbox: pre-forked workers per app process (defaults to one
+    # per CPU); the limits apply to each test case run
+    CODE_RUNNER_WORKERS: int | None = None
+    CODE_RUNNER_MAX_QUEUE: int = 64
+    # Runs one user may have queued or executing at once
+    CODE_RUNNER_MAX_RUNS_PER_USER: int = 2
+    CODE_RUNNER_CPU_SECONDS: int = 2
+    CODE_RUNNER_WALL_SECONDS: float = 5.0
+    CODE_RUNNER_MEMORY_MB: int = 256
+    CODE_RUNNER_OUTPUT_KB: int = 64
+    # Each sandbox worker runs cases as its own uid from this range, which
+    # must belong to nobody else and cover every worker of every app process
+    # on the host. Dropping to them needs root: otherwise code runs are refused.
+    CODE_RUNNER_UID_BASE: int = 40000
+    CODE_RUNNER_UID_COUNT: int = 256
+
     # Application URLs
     FRONTEND_URL: str = "http://localhost:3000"
     BACKEND_URL: str = "http://localhost:8000"
@@ -33,3 +33,66 @@ def clear_auth_cookie(response: Response) -> None:
         samesite="strict",
         max_age=0,
     )
+
+
+REFRESH_COOKIE_NAME = "refresh_token"
+# Only sent to the auth routes that consume it (/auth/refresh, /auth/logout)
+REFRESH_COOKIE_PATH = f"{settings.API_V1_STR}/auth"
+
+
+def set_refresh_cookie(response: Response, token: str) -> None:
+    """Set the refresh-token cookie on a response."""
+    response.set_cookie(
+        key=REFRESH_COOKIE_NAME,
+        value=token,
+        httponly=True,
+        secure=SECURE_AUTH_COOKIE,
+        samesite="strict",
+        max_age=settings.REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60,
+        path=REFRESH_COOKIE_PATH,
+    )
+
+
+def clear_refresh_cookie(response: Response) -> None:
+    """Clear the refresh-token cookie on a response."""
+    response.set_cookie(
+        key=REFRESH_COOKIE_NAME,
+        value="",
+        httponly=True,
+        secure=SECURE_AUTH_COOKIE,
+        samesite="strict",
+        max_age=0,
+        path=REFRESH_COOKIE_PATH,
+    )
+
+
+OAUTH_STATE_COOKIE_NAME = "oauth_state"
+# Binds an OAuth flow to the browser that started it; only the login routes see it
+OAUTH_STATE_COOKIE_PATH = f"{settings.API_V1_STR}/auth/login"
+
+
+def set_oauth_state_cookie(response: Response, state: str) -> None:
+    """Set the OAuth state-binding cookie on a response."""
+    response.set_cookie(
+        key=OAUTH_STATE_COOKIE_NAME,
+        value=state,
+        httponly=True,
+        secure=SECURE_AUTH_COOKIE,
+        # The provider redirects back cross-site, which "strict" would block
+        samesite="lax",
+        max_age=settings.OAUTH_STATE_TTL_SECONDS,
+        path=OAUTH_STATE_COOKIE_PATH,
+    )
+
+
+def clear_oauth_state_cookie(response: Response) -> None:
+    """Clear the OAuth state-binding cookie on a response."""
+    response.set_cookie(
+        key=OAUTH_STATE_COOKIE_NAME,
+        value="",
+        httponly=True,
+        secure=SECURE_AUTH_COOKIE,
+        samesite="lax",
+        max_age=0,
+        path=OAUTH_STATE_COOKIE_PATH,
+    )
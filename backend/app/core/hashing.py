@@ -0,0 +1,143 @@
+import asyncio
+import math
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from app.core import metrics
+from app.core.config import settings
+
+T = TypeVar("T")
+
+
+class HashingQueueFull(Exception):
+    """Raised when the password hashing queue is at capacity."""
+
+
+def _run_timed(
+    fn: Callable[..., T], submitted_at: float, *args: Any
+) -> tuple[T, float, float]:
+    # time.monotonic is system-wide on Linux, so this works across processes too
+    started = time.monotonic()
+    result = fn(*args)
+    return result, started - submitted_at, time.monotonic() - started
+
+
+class PasswordHasher:
+    """Bounded executor dedicated to slow password hashing work.
+
+    bcrypt takes ~100-300 ms of CPU per call, so it gets its own small pool
+    instead of sharing Starlette's threadpool with cheap requests. Callers are
+    rejected with HashingQueueFull once ``max_queue`` jobs are already waiting
+    for a worker.
+
+    Every app process has its own pool, so the queue bound and all counters
+    are per process: with N uvicorn workers up to N * max_queue jobs wait in
+    total. That is the right signal for shedding load, since a process can
+    only ever run its own queued jobs.
+    """
+
+    def __init__(self, workers: int, max_queue: int, use_processes: bool = False):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.use_processes = use_processes
+        self._executor: Executor | None = None
+        self._in_flight = 0
+        self.jobs = 0
+        self.rejected = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.run_seconds_total = 0.0
+
+    @property
+    def queued(self) -> int:
+        return max(0, self._in_flight - self.workers)
+
+    @property
+    def saturated(self) -> bool:
+        """Whether this process's pool is busy and its queue full."""
+        return self._in_flight >= self.workers + self.max_queue
+
+    def retry_after(self) -> int:
+        """Seconds until the current backlog should have drained."""
+        if not self.jobs:
+            return 1
+        per_job = self.run_seconds_total / self.jobs
+        return max(1, math.ceil(per_job * (self.queued + 1) / self.workers))
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.use_processes:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="password-hash"
+                )
+        return self._executor
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """Run ``fn(*args)`` on the hashing pool, or fail fast if it is saturated."""
+        if self.saturated:
+            self.rejected += 1
+            metrics.PASSWORD_HASH_REJECTED.inc()
+            raise HashingQueueFull("Password hashing queue is full")
+
+        loop = asyncio.get_running_loop()
+        job = self._get_executor().submit(_run_timed, fn, time.monotonic(), *args)
+        self._in_flight += 1
+        # Released when the job ends, not when the caller stops waiting: a
+        # cancelled request leaves its hash running and still holding a worker
+        job.add_done_callback(lambda _: self._release(loop))
+        result, waited, ran = await asyncio.wrap_future(job)
+
+        self.jobs += 1
+        self.wait_seconds_total += waited
+        self.wait_seconds_max = max(self.wait_seconds_max, waited)
+        self.run_seconds_total += ran
+        metrics.PASSWORD_HASH_QUEUE_WAIT.observe(waited)
+        metrics.PASSWORD_HASH_SECONDS.observe(ran, op=fn.__name__)
+        return result
+
+    def _release(self, loop: asyncio.AbstractEventLoop) -> None:
+        # Runs on a pool thread; the counters belong to the event loop thread
+        try:
+            loop.call_soon_threadsafe(self._done)
+        except RuntimeError:  # the loop is already closed
+            self._in_flight -= 1
+
+    def _done(self) -> None:
+        self._in_flight -= 1
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "workers": self.workers,
+            "in_flight": self._in_flight,
+            "queued": self.queued,
+            "max_queue": self.max_queue,
+            "jobs": self.jobs,
+            "rejected": self.rejected,
+            "wait_seconds_total": self.wait_seconds_total,
+            "wait_seconds_max": self.wait_seconds_max,
+            "wait_seconds_avg": self.wait_seconds_total / self.jobs if self.jobs else 0.0,
+            "run_seconds_total": self.run_seconds_total,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS or os.cpu_count() or 1,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+    use_processes=settings.PASSWORD_HASH_EXECUTOR == "process",
+)
+
+
+def _collect_hashing_metrics() -> None:
+    metrics.PASSWORD_HASH_QUEUED.set(password_hasher.queued)
+
+
+metrics.register_collector(_collect_hashing_metrics)
@@ -0,0 +1,62 @@
+import importlib.util
+import time
+
+import httpx
+
+from app.core import metrics
+from app.core.config import settings
+
+# HTTP/2 needs the optional "h2" package (httpx[http2])
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+_client: httpx.AsyncClient | None = None
+
+
+async def _start_timer(request: httpx.Request) -> None:
+    request.extensions["started_at"] = time.perf_counter()
+
+
+async def _record_latency(response: httpx.Response) -> None:
+    started = response.request.extensions.get("started_at")
+    if started is not None:
+        metrics.OAUTH_REQUEST_LATENCY.observe(
+            time.perf_counter() - started,
+            host=response.request.url.host,
+            status=str(response.status_code),
+        )
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared, pooled client used for OAuth provider API calls.
+
+    One long-lived client keeps TLS connections alive between sign-ins instead
+    of paying a new handshake per call.
+    """
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=settings.OAUTH_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.OAUTH_HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=settings.OAUTH_HTTP_KEEPALIVE_SECONDS,
+            ),
+            event_hooks={"request": [_start_timer], "response": [_record_latency]},
+        )
+    return _client
+
+
+def provider_timeout(provider: str) -> httpx.Timeout:
+    """Per-provider request timeout, with a shorter connect phase."""
+    seconds = {
+        "github": settings.GITHUB_API_TIMEOUT_SECONDS,
+        "google": settings.GOOGLE_API_TIMEOUT_SECONDS,
+    }.get(provider, settings.OAUTH_HTTP_TIMEOUT_SECONDS)
+    return httpx.Timeout(seconds, connect=min(seconds, 3.0))
+
+
+async def close_http_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import re
+import time
+from typing import Any, Callable
+
+from jose import jwt
+
+from app.core.http import get_http_client, provider_timeout
+
+logger = logging.getLogger(__name__)
+
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+def _max_age(cache_control: str | None, default: int) -> int:
+    match = _MAX_AGE_RE.search(cache_control or "")
+    return int(match.group(1)) if match else default
+
+
+class JWKSCache:
+    """Locally cached OIDC discovery metadata and signing keys.
+
+    Keys are loaded at startup and refreshed in the background when the
+    provider's Cache-Control max-age runs out, so ID-token verification on
+    the sign-in path is purely local. A token signed with an unknown ``kid``
+    triggers at most one refetch per ``unknown_kid_cooldown`` seconds.
+    """
+
+    def __init__(
+        self,
+        discovery_url: str,
+        provider: str,
+        issuers: tuple[str, ...] | None = None,
+        on_update: Callable[[dict], None] | None = None,
+        default_max_age: int = 3600,
+        min_refresh_interval: int = 60,
+        unknown_kid_cooldown: int = 30,
+    ):
+        self.discovery_url = discovery_url
+        self.provider = provider
+        self.issuers = issuers
+        self.on_update = on_update
+        self.default_max_age = default_max_age
+        self.min_refresh_interval = min_refresh_interval
+        self.unknown_kid_cooldown = unknown_kid_cooldown
+        self.metadata: dict[str, Any] = {}
+        self.jwks: dict[str, Any] = {}
+        self.expires_at = 0.0
+        self._last_fetch = 0.0
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def kids(self) -> set[str]:
+        return {key.get("kid") for key in self.jwks.get("keys", [])}
+
+    async def _get(self, url: str):
+        response = await get_http_client().get(
+            url, timeout=provider_timeout(self.provider)
+        )
+        response.raise_for_status()
+        return response
+
+    async def _fetch(self) -> None:
+        # Callers hold self._lock
+        now = time.monotonic()
+        if not self.metadata or now >= self.expires_at:
+            self.metadata = (await self._get(self.discovery_url)).json()
+
+        response = await self._get(self.metadata["jwks_uri"])
+        self.jwks = response.json()
+        max_age = _max_age(response.headers.get("cache-control"), self.default_max_age)
+        self._last_fetch = now
+        self.expires_at = now + max(max_age, self.min_refresh_interval)
+
+        if self.on_update is not None:
+            self.on_update(self.jwks)
+
+    async def refresh(self) -> None:
+        """Refetch metadata (if stale) and the key set."""
+        async with self._lock:
+            await self._fetch()
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(
+                max(self.expires_at - time.monotonic(), self.min_refresh_interval)
+            )
+            try:
+                await self.refresh()
+            except Exception:
+                logger.warning("Failed to refresh %s JWKS", self.provider, exc_info=True)
+
+    async def start(self) -> None:
+        """Load keys once and keep them fresh in the background."""
+        try:
+            await self.refresh()
+        except Exception:
+            # Sign-in can still fetch on demand; keep retrying in the background
+            logger.warning("Initial %s JWKS load failed", self.provider, exc_info=True)
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def _kid_settled(self, kid: str | None) -> bool:
+        """Whether the keys can't usefully be refetched for ``kid`` right now."""
+        if not self.jwks:
+            return False
+        if kid in self.kids:
+            return True
+        return time.monotonic() - self._last_fetch < self.unknown_kid_cooldown
+
+    async def _ensure_kid(self, kid: str | None) -> None:
+        if self._kid_settled(kid):
+            return
+        async with self._lock:
+            # Checked again: a burst of tokens with a new kid queues here, and
+            # only the first of them should fetch
+            if not self._kid_settled(kid):
+                await self._fetch()
+
+    async def verify_id_token(
+        self, id_token: str, audience: str | None, access_token: str | None = None
+    ) -> dict[str, Any]:
+        """Verify an ID token's signature and standard claims against cached keys.
+
+        Raises ``jose.JWTError`` when the token is invalid.
+        """
+        header = jwt.get_unverified_header(id_token)
+        await self._ensure_kid(header.get("kid"))
+        return jwt.decode(
+            id_token,
+            self.jwks,
+            algorithms=self.metadata.get(
+                "id_token_signing_alg_values_supported", ["RS256"]
+            ),
+            audience=audience,
+            issuer=self.issuers or self.metadata.get("issuer"),
+            access_token=access_token,
+        )
@@ -0,0 +1,334 @@
+"""Low-overhead, Prometheus-compatible metrics.
+
+Metrics are plain dicts updated from the event loop thread, so recording is
+lock-free. Each uvicorn worker aggregates its own values; when
+METRICS_MULTIPROC_DIR is set, workers periodically write a snapshot there and
+``/metrics`` merges every worker's snapshot. Clear that directory on deploy.
+"""
+
+import asyncio
+import bisect
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Callable
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+_registry: dict[str, "_Metric"] = {}
+_collectors: list[Callable[[], None]] = []
+
+
+def _label_key(labelnames: tuple[str, ...], labels: dict[str, str]) -> tuple[str, ...]:
+    return tuple(str(labels.get(name, "")) for name in labelnames)
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.values: dict[tuple[str, ...], float | list[float]] = {}
+        _registry[name] = self
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = _label_key(self.labelnames, labels)
+        self.values[key] = self.values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        self.values[_label_key(self.labelnames, labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = _label_key(self.labelnames, labels)
+        self.values[key] = self.values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = _label_key(self.labelnames, labels)
+        # Per-bucket (non-cumulative) counts, then +Inf, sum and count
+        series = self.values.get(key)
+        if series is None:
+            series = self.values[key] = [0.0] * (len(self.buckets) + 3)
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+
+
+def register_collector(collector: Callable[[], None]) -> None:
+    """Register a callback that refreshes gauges right before they are read."""
+    _collectors.append(collector)
+
+
+def _collect() -> None:
+    for collector in _collectors:
+        try:
+            collector()
+        except Exception:
+            logger.warning("Metrics collector failed", exc_info=True)
+
+
+# --- Shared application metrics --------------------------------------------
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests handled", ("method", "route", "status")
+)
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route")
+)
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests being served")
+
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled DB connection"
+)
+DB_POOL_SIZE = Gauge("db_pool_size", "Configured DB pool size")
+DB_POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "DB connections in use")
+DB_POOL_OVERFLOW = Gauge("db_pool_overflow", "DB connections open beyond pool size")
+DB_REPLICA_HEALTHY = Gauge(
+    "db_replica_healthy", "1 while a read replica is in rotation", ("replica",)
+)
+
+PASSWORD_HASH_SECONDS = Histogram(
+    "password_hash_seconds", "CPU time of password hashing work", ("op",)
+)
+PASSWORD_HASH_QUEUE_WAIT = Histogram(
+    "password_hash_queue_wait_seconds", "Time hashing jobs wait for a worker"
+)
+PASSWORD_HASH_REJECTED = Counter(
+    "password_hash_rejected_total", "Hashing jobs rejected because the queue was full"
+)
+PASSWORD_HASH_QUEUED = Gauge("password_hash_queued", "Hashing jobs waiting for a worker")
+PASSWORD_HASH_COST = Gauge(
+    "password_hash_cost", "Calibrated work factor for new password hashes", ("scheme",)
+)
+PASSWORD_HASH_CALIBRATED_SECONDS = Gauge(
+    "password_hash_calibrated_seconds",
+    "Measured time of one hash at the calibrated work factor",
+    ("scheme",),
+)
+
+OAUTH_REQUEST_LATENCY = Histogram(
+    "oauth_provider_request_duration_seconds",
+    "Latency of outbound OAuth provider calls",
+    ("host", "status"),
+)
+
+USER_CACHE_LOOKUPS = Counter(
+    "user_cache_lookups_total",
+    "User cache lookups by outcome (local_hit, redis_hit, miss)",
+    ("result",),
+)
+USER_CACHE_ENTRIES = Gauge("user_cache_entries", "Users in this worker's local cache")
+
+LLM_CACHE_LOOKUPS = Counter(
+    "llm_cache_lookups_total",
+    "LLM gateway lookups by outcome (exact_hit, semantic_hit, coalesced, miss)",
+    ("kind", "result"),
+)
+LLM_CACHE_ENTRIES = Gauge("llm_cache_entries", "Cached LLM responses", ("tier",))
+LLM_REQUEST_LATENCY = Histogram(
+    "llm_request_duration_seconds",
+    "Latency of LLM provider calls",
+    ("provider", "op"),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+
+CODE_RUN_QUEUE_WAIT = Histogram(
+    "code_run_queue_wait_seconds", "Time code runs wait for a sandbox worker"
+)
+CODE_RUN_CASE_SECONDS = Histogram(
+    "code_run_case_seconds", "Wall time of one test case run", ("status",)
+)
+CODE_RUN_REJECTED = Counter(
+    "code_run_rejected_total", "Code runs rejected at admission", ("reason",)
+)
+CODE_RUN_QUEUED = Gauge("code_run_queued", "Code runs waiting for a sandbox worker")
+CODE_RUNNER_BUSY = Gauge("code_runner_workers_busy", "Sandbox workers executing a run")
+
+
+# --- Snapshots and exposition ---------------------------------------------
+
+
+def snapshot() -> dict:
+    _collect()
+    return {
+        name: {
+            "type": metric.type,
+            "help": metric.documentation,
+            "labelnames": list(metric.labelnames),
+            "buckets": list(getattr(metric, "buckets", ())),
+            "values": [[list(key), value] for key, value in metric.values.items()],
+        }
+        for name, metric in _registry.items()
+    }
+
+
+def _merge(snapshots: list[tuple[dict, bool]]) -> dict:
+    """Sum counters/histograms over all workers; gauges only from live ones."""
+    merged: dict = {}
+    for snap, live in snapshots:
+        for name, metric in snap.items():
+            target = merged.setdefault(name, {**metric, "values": {}})
+            if metric["type"] == "gauge" and not live:
+                continue
+            for key, value in metric["values"]:
+                key = tuple(key)
+                current = target["values"].get(key)
+                if current is None:
+                    target["values"][key] = list(value) if isinstance(value, list) else value
+                elif isinstance(value, list):
+                    target["values"][key] = [a + b for a, b in zip(current, value)]
+                else:
+                    target["values"][key] = current + value
+    return merged
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def render(merged: dict) -> str:
+    lines: list[str] = []
+    for name, metric in merged.items():
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        names = metric["labelnames"]
+        for key, value in metric["values"].items():
+            if metric["type"] != "histogram":
+                lines.append(f"{name}{_labels(names, key)} {value}")
+                continue
+            cumulative = 0.0
+            for bound, count in zip(metric["buckets"] + ["+Inf"], value[:-2]):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{name}_bucket{_labels(names, key, le)} {cumulative}")
+            lines.append(f"{name}_sum{_labels(names, key)} {value[-2]}")
+            lines.append(f"{name}_count{_labels(names, key)} {value[-1]}")
+    return "\n".join(lines) + "\n"
+
+
+def _multiproc_dir() -> Path | None:
+    if not settings.METRICS_MULTIPROC_DIR:
+        return None
+    path = Path(settings.METRICS_MULTIPROC_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def write_snapshot() -> None:
+    """Publish this worker's snapshot for the other workers' /metrics."""
+    directory = _multiproc_dir()
+    if directory is None:
+        return
+    target = directory / f"{os.getpid()}.json"
+    tmp = target.with_suffix(".tmp")
+    tmp.write_text(json.dumps(snapshot()))
+    tmp.replace(target)
+
+
+def generate_latest() -> str:
+    """Render metrics for this worker, merged with peers in multiprocess mode."""
+    directory = _multiproc_dir()
+    if directory is None:
+        return render(_merge([(snapshot(), True)]))
+
+    write_snapshot()
+    stale_before = time.time() - 3 * settings.METRICS_FLUSH_SECONDS
+    snapshots = []
+    for path in directory.glob("*.json"):
+        try:
+            snapshots.append(
+                (json.loads(path.read_text()), path.stat().st_mtime >= stale_before)
+            )
+        except (OSError, ValueError):
+            continue
+    return render(_merge(snapshots))
+
+
+async def flush_periodically() -> None:
+    while True:
+        await asyncio.sleep(settings.METRICS_FLUSH_SECONDS)
+        try:
+            write_snapshot()
+        except OSError:
+            logger.warning("Failed to write metrics snapshot", exc_info=True)
+
+
+def route_template(scope) -> str:
+    """Return the matched route's full path template, e.g. ``/api/v1/users/{id}``.
+
+    Templates rather than raw paths keep label cardinality bounded. Newer
+    FastAPI releases resolve included routers without copying routes, so the
+    prefixed template lives on the effective route context.
+    """
+    context = scope.get("fastapi", {}).get("effective_route_context")
+    path = getattr(context, "path", None)
+    if path is None:
+        path = getattr(scope.get("route"), "path", None)
+    return path or "unmatched"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording per-route latency and in-flight requests."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            HTTP_IN_FLIGHT.dec()
+            path = route_template(scope)
+            method = scope["method"]
+            HTTP_LATENCY.observe(elapsed, method=method, route=path)
+            HTTP_REQUESTS.inc(method=method, route=path, status=str(status_code))
@@ -1,31 +1,73 @@
 from authlib.integrations.starlette_client import OAuth
 
 from app.core.config import settings
+from app.core.jwks import JWKSCache
+from app.core.oauth_state import oauth_state_store
+
+# State data is kept server-side; the session only carries a per-flow marker
+oauth = OAuth(cache=oauth_state_store)
+
+OAUTH_PROVIDERS = ("google", "github")
+
+
+def _provider_config(provider: str) -> dict | None:
+    """Authlib registration kwargs for a provider, or None if it isn't configured."""
+    if provider == "google" and settings.GOOGLE_CLIENT_ID:
+        return dict(
+            client_id=settings.GOOGLE_CLIENT_ID,
+            client_secret=settings.GOOGLE_CLIENT_SECRET,
+            authorize_url="https://accounts.google.com/o/oauth2/auth",
+            authorize_params=None,
+            access_token_url="https://accounts.google.com/o/oauth2/token",
+            access_token_params=None,
+            refresh_token_url=None,
+            authorize_state=settings.SECRET_KEY,
+            redirect_uri=settings.OAUTH_REDIRECT_URI,
+            jwks_uri="https://www.googleapis.com/oauth2/v3/certs",
+            client_kwargs={"scope": "openid profile email"},
+        )
+    if provider == "github" and settings.GITHUB_CLIENT_ID:
+        return dict(
+            client_id=settings.GITHUB_CLIENT_ID,
+            client_secret=settings.GITHUB_CLIENT_SECRET,
+            authorize_url="https://github.com/login/oauth/authorize",
+            access_token_url="https://github.com/login/oauth/access_token",
+            client_kwargs={"scope": "user:email"},
+        )
+    return None
+
+
+def get_oauth_client(provider: str):
+    """Return the Authlib client for a configured provider, registering it on first use.
+
+    Unconfigured or unknown providers return None, so nothing is registered
+    for providers a deployment doesn't use.
+    """
+    client = oauth.create_client(provider)
+    if client is None:
+        config = _provider_config(provider)
+        if config is None:
+            return None
+        oauth.register(name=provider, **config)
+        client = oauth.create_client(provider)
+    return client
+
+
+def warm_oauth_clients() -> list[str]:
+    """Register every configured provider up front; returns their names."""
+    return [name for name in OAUTH_PROVIDERS if get_oauth_client(name) is not None]
+
+
+def _share_google_jwks(jwks: dict) -> None:
+    # Let Authlib's own ID-token parsing reuse the cached keys instead of fetching
+    client = get_oauth_client("google")
+    if client is not None:
+        client.server_metadata["jwks"] = jwks
 
-oauth = OAuth()
-
-# Google OAuth
-oauth.register(
-    name="google",
-    client_id=settings.GOOGLE_CLIENT_ID,
-    client_secret=settings.GOOGLE_CLIENT_SECRET,
-    authorize_url="https://accounts.google.com/o/oauth2/auth",
-    authorize_params=None,
-    access_token_url="https://accounts.google.com/o/oauth2/token",
-    access_token_params=None,
-    refresh_token_url=None,
-    authorize_state=settings.SECRET_KEY,
-    redirect_uri=settings.OAUTH_REDIRECT_URI,
-    jwks_uri="https://www.googleapis.com/oauth2/v3/certs",
-    client_kwargs={"scope": "openid profile email"},
-)
 
-# GitHub OAuth
-oauth.register(
-    name="github",
-    client_id=settings.GITHUB_CLIENT_ID,
-    client_secret=settings.GITHUB_CLIENT_SECRET,
-    authorize_url="https://github.com/login/oauth/authorize",
-    access_token_url="https://github.com/login/oauth/access_token",
-    client_kwargs={"scope": "user:email"},
+google_jwks = JWKSCache(
+    "https://accounts.google.com/.well-known/openid-configuration",
+    provider="google",
+    issuers=("https://accounts.google.com", "accounts.google.com"),
+    on_update=_share_google_jwks,
 )
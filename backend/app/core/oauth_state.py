@@ -0,0 +1,50 @@
+from redis.asyncio import Redis
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.redis import get_redis
+
+
+class OAuthStateStore:
+    """Short-lived server-side storage for in-flight OAuth authorize requests.
+
+    Implements the async ``get``/``set``/``delete`` cache interface Authlib's
+    Starlette integration uses for state data (redirect URI, nonce, PKCE
+    verifier), keyed by the opaque state id. Entries live in Redis when
+    REDIS_URL is set, so the callback may land on any worker; otherwise in a
+    process-local TTL cache for single-worker development. Entries never
+    outlive OAUTH_STATE_TTL_SECONDS, whatever expiry Authlib asks for.
+    """
+
+    PREFIX = "oauth:"
+
+    def __init__(self, ttl: int, max_size: int = 10_000):
+        self.ttl = ttl
+        self.local = TTLCache(max_size=max_size, ttl=ttl)
+
+    def _redis(self) -> Redis | None:
+        return get_redis()
+
+    async def get(self, key: str) -> str | None:
+        redis = self._redis()
+        if redis is None:
+            return self.local.get(key)
+        return await redis.get(self.PREFIX + key)
+
+    async def set(self, key: str, value: str, expires_in: int | None = None) -> None:
+        ttl = min(expires_in or self.ttl, self.ttl)
+        redis = self._redis()
+        if redis is None:
+            self.local.set(key, value)
+        else:
+            await redis.set(self.PREFIX + key, value, ex=ttl)
+
+    async def delete(self, key: str) -> None:
+        redis = self._redis()
+        if redis is None:
+            self.local.delete(key)
+        else:
+            await redis.delete(self.PREFIX + key)
+
+
+oauth_state_store = OAuthStateStore(ttl=settings.OAUTH_STATE_TTL_SECONDS)
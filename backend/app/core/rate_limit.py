@@ -0,0 +1,217 @@
+import logging
+import math
+import time
+import uuid
+from collections import defaultdict, deque
+
+from fastapi import HTTPException, Request, status
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.hashing import password_hasher
+from app.core.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Sliding-window log: prune, count, and record the hit in one atomic step
+_SLIDING_WINDOW_SCRIPT = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], 0, now - window)
+if redis.call('ZCARD', KEYS[1]) < limit then
+    redis.call('ZADD', KEYS[1], now, ARGV[4])
+    redis.call('PEXPIRE', KEYS[1], window)
+    return 0
+end
+local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+return tonumber(oldest[2]) + window - now
+"""
+
+
+class SlidingWindowLimiter:
+    """Sliding-window request counter, shared through Redis when available.
+
+    Falls back to a per-process window if Redis is unset or unreachable.
+    """
+
+    # Drop idle local windows every this many local hits
+    SWEEP_EVERY = 1024
+
+    def __init__(self):
+        self._local: dict[str, deque[float]] = defaultdict(deque)
+        self._local_hits = 0
+        self._script = None
+
+    def _sweep(self, now: float, window: float) -> None:
+        idle = [key for key, hits in self._local.items() if not hits or hits[-1] <= now - window]
+        for key in idle:
+            del self._local[key]
+
+    def _hit_local(self, key: str, limit: int, window: float) -> float:
+        now = time.monotonic()
+        self._local_hits += 1
+        if self._local_hits % self.SWEEP_EVERY == 0:
+            self._sweep(now, window)
+        hits = self._local[key]
+        while hits and hits[0] <= now - window:
+            hits.popleft()
+        if len(hits) < limit:
+            hits.append(now)
+            return 0.0
+        return hits[0] + window - now
+
+    async def hit(self, key: str, limit: int, window: float) -> float:
+        """Record a hit; returns 0 if allowed, else seconds until a slot frees."""
+        redis = get_redis()
+        if redis is not None:
+            if self._script is None:
+                self._script = redis.register_script(_SLIDING_WINDOW_SCRIPT)
+            now_ms = int(time.time() * 1000)
+            try:
+                retry_ms = await self._script(
+                    keys=[f"rl:{key}"],
+                    args=[now_ms, int(window * 1000), limit, uuid.uuid4().hex],
+                )
+                return int(retry_ms) / 1000
+            except RedisError:
+                logger.warning("Rate limiter: Redis unavailable", exc_info=True)
+        return self._hit_local(key, limit, window)
+
+
+limiter = SlidingWindowLimiter()
+
+
+# Lease-based semaphore: drop expired leases, then take one if under the limit
+_ACQUIRE_LEASE_SCRIPT = """
+local now = tonumber(ARGV[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], 0, now)
+if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[2]) then
+    redis.call('ZADD', KEYS[1], now + tonumber(ARGV[3]), ARGV[4])
+    redis.call('PEXPIRE', KEYS[1], ARGV[3])
+    return 1
+end
+return 0
+"""
+
+
+class ConcurrencyLimiter:
+    """Caps concurrent holders per key, shared through Redis when available.
+
+    Each holder takes a lease that expires after ``lease`` seconds, so a
+    worker that dies mid-stream can't leak a slot forever; callers must not
+    hold a slot longer than the lease. Falls back to per-process counting if
+    Redis is unset or unreachable.
+    """
+
+    def __init__(self):
+        # key -> lease id -> expiry (monotonic)
+        self._local: dict[str, dict[str, float]] = defaultdict(dict)
+        self._script = None
+
+    def _acquire_local(self, key: str, lease_id: str, limit: int, lease: float) -> bool:
+        now = time.monotonic()
+        leases = self._local[key]
+        for expired in [k for k, expires in leases.items() if expires <= now]:
+            del leases[expired]
+        if len(leases) >= limit:
+            return False
+        leases[lease_id] = now + lease
+        return True
+
+    async def acquire(self, key: str, limit: int, lease: float) -> str | None:
+        """Take a slot; returns a lease id for ``release``, or None when full."""
+        lease_id = uuid.uuid4().hex
+        redis = get_redis()
+        if redis is not None:
+            if self._script is None:
+                self._script = redis.register_script(_ACQUIRE_LEASE_SCRIPT)
+            try:
+                acquired = await self._script(
+                    keys=[f"cl:{key}"],
+                    args=[int(time.time() * 1000), limit, int(lease * 1000), lease_id],
+                )
+                return lease_id if acquired else None
+            except RedisError:
+                logger.warning("Concurrency limiter: Redis unavailable", exc_info=True)
+        return lease_id if self._acquire_local(key, lease_id, limit, lease) else None
+
+    async def release(self, key: str, lease_id: str) -> None:
+        leases = self._local.get(key)
+        if leases is not None and leases.pop(lease_id, None) is not None:
+            if not leases:
+                del self._local[key]
+            return
+        redis = get_redis()
+        if redis is not None:
+            try:
+                await redis.zrem(f"cl:{key}", lease_id)
+            except RedisError:
+                # The lease expires on its own
+                logger.warning("Concurrency limiter: Redis release failed", exc_info=True)
+
+
+stream_limiter = ConcurrencyLimiter()
+
+
+def _too_many_requests(retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many attempts, please try again later.",
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+async def _submitted_email(request: Request) -> str | None:
+    # Starlette caches the parsed body, so the endpoint can still read it
+    content_type = request.headers.get("content-type", "")
+    try:
+        if content_type.startswith("application/json"):
+            body = await request.json()
+            email = body.get("email") if isinstance(body, dict) else None
+        elif content_type.startswith(
+            ("application/x-www-form-urlencoded", "multipart/form-data")
+        ):
+            email = (await request.form()).get("username")
+        else:
+            return None
+    except ValueError:
+        return None
+    return email.strip().lower() if isinstance(email, str) else None
+
+
+async def limit_credential_attempts(request: Request) -> None:
+    """Router dependency for credential endpoints.
+
+    Limits attempts per client IP and per submitted email within a sliding
+    window (429), and sheds load before any DB or bcrypt work when this
+    process's hashing pool is already saturated (503). Both carry Retry-After.
+
+    The per-IP key is the client address as seen by the app; behind a reverse
+    proxy set FORWARDED_ALLOW_IPS so it comes from X-Forwarded-For instead of
+    being the proxy's address for every client.
+    """
+    if password_hasher.saturated:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, please try again shortly.",
+            headers={"Retry-After": str(password_hasher.retry_after())},
+        )
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+
+    window = settings.RATE_LIMIT_WINDOW_SECONDS
+    client_ip = request.client.host if request.client else "unknown"
+    retry_after = await limiter.hit(
+        f"ip:{client_ip}", settings.RATE_LIMIT_CREDENTIALS_PER_IP, window
+    )
+    if retry_after:
+        raise _too_many_requests(retry_after)
+
+    email = await _submitted_email(request)
+    if email:
+        retry_after = await limiter.hit(
+            f"email:{email}", settings.RATE_LIMIT_CREDENTIALS_PER_EMAIL, window
+        )
+        if retry_after:
+            raise _too_many_requests(retry_after)
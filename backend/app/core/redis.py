@@ -0,0 +1,20 @@
+from redis.asyncio import Redis
+
+from app.core.config import settings
+
+_client: Redis | None = None
+
+
+def get_redis() -> Redis | None:
+    """Return the shared Redis client, or None when REDIS_URL isn't configured."""
+    global _client
+    if _client is None and settings.REDIS_URL:
+        _client = Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    return _client
+
+
+async def close_redis() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,303 @@
+import base64
+import hashlib
+import hmac
+import logging
+import secrets
+import time
+from collections import defaultdict
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+class RefreshTokenError(Exception):
+    """Raised when a refresh token is unknown, expired or revoked."""
+
+
+class RefreshTokenReused(RefreshTokenError):
+    """Raised when an already-rotated refresh token is presented again."""
+
+
+class RefreshTokenStoreUnavailable(Exception):
+    """Raised when the refresh-token store can't be reached."""
+
+
+def _hash(secret: str) -> str:
+    return hashlib.sha256(secret.encode("utf-8")).hexdigest()
+
+
+class RefreshTokenStore:
+    """Storage for rotating refresh-token families.
+
+    Each login starts a family; only the latest token of a family is valid,
+    except that the token it replaced is still accepted for ``grace`` seconds
+    after the rotation, so two tabs refreshing at once aren't taken for a
+    replay. A token looks like ``<family_id>.<secret>`` so lookups are O(1)
+    on the family id, and only a hash of the secret is ever stored.
+    """
+
+    async def create_family(
+        self, family_id: str, user_id: int, token_hash: str, ttl: int
+    ) -> None:
+        raise NotImplementedError
+
+    async def rotate(
+        self, family_id: str, token_hash: str, new_hash: str, ttl: int, grace: int
+    ) -> tuple[str, int | None]:
+        """Swap the family's current hash from ``token_hash`` to ``new_hash``.
+
+        Presenting the previous token again while ``new_hash`` is still
+        current and the rotation is under ``grace`` seconds old also
+        succeeds, without changing anything. Returns ``(status, user_id)``
+        where status is ``"ok"``, ``"reused"`` or ``"missing"``.
+        """
+        raise NotImplementedError
+
+    async def revoke_family(self, family_id: str) -> None:
+        raise NotImplementedError
+
+    async def revoke_user(self, user_id: int) -> None:
+        raise NotImplementedError
+
+
+class InMemoryRefreshTokenStore(RefreshTokenStore):
+    """Process-local store for tests and single-worker development."""
+
+    def __init__(self):
+        self._families: dict[str, dict] = {}
+        self._user_families: dict[int, set[str]] = defaultdict(set)
+
+    def _get(self, family_id: str) -> dict | None:
+        family = self._families.get(family_id)
+        if family is not None and family["expires_at"] <= time.monotonic():
+            self._drop(family_id)
+            return None
+        return family
+
+    def _drop(self, family_id: str) -> None:
+        family = self._families.pop(family_id, None)
+        if family is not None:
+            self._user_families[family["user_id"]].discard(family_id)
+
+    async def create_family(self, family_id, user_id, token_hash, ttl):
+        self._families[family_id] = {
+            "user_id": user_id,
+            "current": token_hash,
+            "rotated_at": float("-inf"),
+            "expires_at": time.monotonic() + ttl,
+        }
+        self._user_families[user_id].add(family_id)
+
+    async def rotate(self, family_id, token_hash, new_hash, ttl, grace):
+        family = self._get(family_id)
+        if family is None:
+            return "missing", None
+        now = time.monotonic()
+        if secrets.compare_digest(family["current"], token_hash):
+            family["current"] = new_hash
+            family["rotated_at"] = now
+            family["expires_at"] = now + ttl
+            return "ok", family["user_id"]
+        if (
+            secrets.compare_digest(family["current"], new_hash)
+            and now - family["rotated_at"] <= grace
+        ):
+            return "ok", family["user_id"]
+        return "reused", family["user_id"]
+
+    async def revoke_family(self, family_id):
+        self._drop(family_id)
+
+    async def revoke_user(self, user_id):
+        for family_id in list(self._user_families.pop(user_id, ())):
+            self._families.pop(family_id, None)
+
+
+# Compare-and-swap of the family's current hash, atomic on the Redis server.
+# ARGV: presented hash, successor hash, ttl, now, grace seconds
+_ROTATE_SCRIPT = """
+local current = redis.call('HGET', KEYS[1], 'current')
+if not current then
+    return {'missing', false}
+end
+local user_id = redis.call('HGET', KEYS[1], 'user_id')
+if current == ARGV[1] then
+    redis.call('HSET', KEYS[1], 'current', ARGV[2], 'rotated_at', ARGV[4])
+    redis.call('EXPIRE', KEYS[1], ARGV[3])
+    return {'ok', user_id}
+end
+local rotated_at = tonumber(redis.call('HGET', KEYS[1], 'rotated_at') or '0')
+if current == ARGV[2] and tonumber(ARGV[4]) - rotated_at <= tonumber(ARGV[5]) then
+    return {'ok', user_id}
+end
+return {'reused', user_id}
+"""
+
+
+class RedisRefreshTokenStore(RefreshTokenStore):
+    """Families as hashes with a TTL, indexed by user in a set.
+
+    The per-user set has no TTL of its own: rotations keep families alive
+    well past any expiry set at login, and an index that expired first would
+    hide them from ``revoke_user``. Families that expired are pruned from it
+    at the user's next login instead.
+    """
+
+    def __init__(self, redis: Redis):
+        self.redis = redis
+        self._rotate = redis.register_script(_ROTATE_SCRIPT)
+
+    @staticmethod
+    def _family_key(family_id: str) -> str:
+        return f"rt:family:{family_id}"
+
+    @staticmethod
+    def _user_key(user_id: int) -> str:
+        return f"rt:user:{user_id}"
+
+    async def create_family(self, family_id, user_id, token_hash, ttl):
+        user_key = self._user_key(user_id)
+        known = list(await self.redis.smembers(user_key))
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for known_id in known:
+                pipe.exists(self._family_key(known_id))
+            alive = await pipe.execute()
+        expired = [known_id for known_id, exists in zip(known, alive) if not exists]
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(
+                self._family_key(family_id),
+                mapping={"user_id": user_id, "current": token_hash},
+            )
+            pipe.expire(self._family_key(family_id), ttl)
+            pipe.sadd(user_key, family_id)
+            if expired:
+                pipe.srem(user_key, *expired)
+            await pipe.execute()
+
+    async def rotate(self, family_id, token_hash, new_hash, ttl, grace):
+        status, user_id = await self._rotate(
+            keys=[self._family_key(family_id)],
+            args=[token_hash, new_hash, ttl, time.time(), grace],
+        )
+        return status, int(user_id) if user_id else None
+
+    async def revoke_family(self, family_id):
+        user_id = await self.redis.hget(self._family_key(family_id), "user_id")
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(self._family_key(family_id))
+            if user_id is not None:
+                pipe.srem(self._user_key(int(user_id)), family_id)
+            await pipe.execute()
+
+    async def revoke_user(self, user_id):
+        family_ids = await self.redis.smembers(self._user_key(user_id))
+        keys = [self._family_key(family_id) for family_id in family_ids]
+        await self.redis.delete(self._user_key(user_id), *keys)
+
+
+_memory_store = InMemoryRefreshTokenStore()
+_redis_store: RedisRefreshTokenStore | None = None
+
+
+def get_refresh_token_store() -> RefreshTokenStore:
+    """Redis-backed store when REDIS_URL is set, otherwise the in-memory one."""
+    global _redis_store
+    redis = get_redis()
+    if redis is None:
+        return _memory_store
+    # One per client, so the rotate script is registered once
+    if _redis_store is None or _redis_store.redis is not redis:
+        _redis_store = RedisRefreshTokenStore(redis)
+    return _redis_store
+
+
+def _ttl() -> int:
+    return settings.REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60
+
+
+def _successor(secret: str) -> str:
+    # Deterministic, so a token presented twice within the grace window gets
+    # the same successor back without the store keeping any plaintext
+    digest = hmac.new(
+        settings.SECRET_KEY.encode("utf-8"), secret.encode("utf-8"), hashlib.sha256
+    ).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
+
+
+def _split(token: str) -> tuple[str, str]:
+    family_id, sep, secret = token.partition(".")
+    if not sep or not family_id or not secret:
+        raise RefreshTokenError("Malformed refresh token")
+    return family_id, secret
+
+
+async def issue_refresh_token(user_id: int) -> str | None:
+    """Start a new token family for ``user_id`` and return its first token.
+
+    Returns None when the store is unreachable: the login still succeeds,
+    just without a refresh token, instead of failing on a Redis outage.
+    """
+    family_id = secrets.token_urlsafe(16)
+    secret = secrets.token_urlsafe(32)
+    try:
+        await get_refresh_token_store().create_family(
+            family_id, user_id, _hash(secret), _ttl()
+        )
+    except RedisError:
+        logger.warning("Refresh tokens: Redis write failed", exc_info=True)
+        return None
+    return f"{family_id}.{secret}"
+
+
+async def rotate_refresh_token(token: str) -> tuple[int, str]:
+    """Exchange a refresh token for a new one in the same family.
+
+    Returns ``(user_id, new_token)``. Presenting a token that was already
+    rotated means it leaked, so every family of that user is revoked; within
+    REFRESH_TOKEN_REUSE_GRACE_SECONDS of its rotation it instead returns the
+    same new token again (concurrent refreshes from several tabs). Raises
+    RefreshTokenStoreUnavailable if the store can't be reached.
+    """
+    family_id, secret = _split(token)
+    new_secret = _successor(secret)
+    store = get_refresh_token_store()
+    try:
+        status, user_id = await store.rotate(
+            family_id,
+            _hash(secret),
+            _hash(new_secret),
+            _ttl(),
+            settings.REFRESH_TOKEN_REUSE_GRACE_SECONDS,
+        )
+        if status == "reused":
+            await store.revoke_user(user_id)
+    except RedisError as exc:
+        raise RefreshTokenStoreUnavailable("Refresh token store unavailable") from exc
+    if status == "reused":
+        raise RefreshTokenReused("Refresh token reuse detected")
+    if status != "ok":
+        raise RefreshTokenError("Unknown or expired refresh token")
+    return user_id, f"{family_id}.{new_secret}"
+
+
+async def revoke_refresh_token(token: str) -> None:
+    """Revoke the family a refresh token belongs to (logout)."""
+    try:
+        family_id, _ = _split(token)
+    except RefreshTokenError:
+        return
+    try:
+        await get_refresh_token_store().revoke_family(family_id)
+    except RedisError:
+        # The cookie is cleared regardless; the family expires on its own
+        logger.warning("Refresh tokens: Redis revocation failed", exc_info=True)
+
+
+async def revoke_user_refresh_tokens(user_id: int) -> None:
+    """Revoke every refresh-token family of a user."""
+    await get_refresh_token_store().revoke_user(user_id)
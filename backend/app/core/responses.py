@@ -0,0 +1,21 @@
+from typing import Any
+
+import pydantic_core
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+class PydanticJSONResponse(JSONResponse):
+    """JSON response rendered to bytes by pydantic-core's Rust serializer.
+
+    Endpoints can hand a schema instance straight over
+    (``PydanticJSONResponse(schemas.AuthResponse(...))``) instead of
+    ``model_dump()``-ing it to a dict that ``json.dumps`` then walks again.
+    Plain dicts and lists still work, so this is the app's default response
+    class. The output matches Starlette's compact, non-ASCII-escaped JSON.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.__pydantic_serializer__.to_json(content)
+        return pydantic_core.to_json(content)
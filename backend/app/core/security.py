@@ -1,34 +1,429 @@
+import base64
+import json
+import math
+import os
+import time
+from dataclasses import dataclass, replace
 from datetime import datetime, timedelta, timezone
-from typing import Any, Union
+from functools import lru_cache
+from typing import Any, Literal, Union
 
+import argon2
 import bcrypt
-from jose import jwt
+import jwt as pyjwt
+from jose import JWTError, jwk
+from jose import jwt as jose_jwt
 
+from app import schemas
+from app.core import metrics
 from app.core.config import settings
+from app.core.hashing import password_hasher
 
 
-def get_password_hash(password: str) -> str:
-    """Hash a password using bcrypt with proper 72-byte limit handling."""
+BCRYPT_DEFAULT_ROUNDS = 12
+BCRYPT_MIN_ROUNDS = 10
+BCRYPT_MAX_ROUNDS = 31
+ARGON2_DEFAULT_TIME_COST = 3
+ARGON2_MIN_TIME_COST = 2
+ARGON2_MAX_TIME_COST = 64
+_CALIBRATION_PASSWORD = "calibration-password-1234"
+
+
+@dataclass(frozen=True)
+class HashPolicy:
+    """Scheme and work factor new password hashes are created with.
+
+    ``cost`` is the bcrypt log2 rounds or the argon2id time cost. Instances
+    are passed to the hashing functions explicitly so process-pool workers
+    use the parent's calibrated policy.
+    """
+
+    scheme: Literal["bcrypt", "argon2id"]
+    cost: int
+    memory_kib: int = 0
+    parallelism: int = 1
+
+
+def default_hash_policy(cost: int | None = None) -> HashPolicy:
+    """The configured scheme at a pinned (or the library default) cost."""
+    cost = cost or settings.PASSWORD_HASH_COST
+    if settings.PASSWORD_HASH_SCHEME == "argon2id":
+        return HashPolicy(
+            scheme="argon2id",
+            cost=cost or ARGON2_DEFAULT_TIME_COST,
+            memory_kib=settings.PASSWORD_HASH_ARGON2_MEMORY_KIB,
+            parallelism=settings.PASSWORD_HASH_ARGON2_PARALLELISM,
+        )
+    return HashPolicy(scheme="bcrypt", cost=cost or BCRYPT_DEFAULT_ROUNDS)
+
+
+_hash_policy: HashPolicy | None = None
+_calibration: dict[str, Any] = {}
+
+
+def get_hash_policy() -> HashPolicy:
+    """The policy chosen at startup, or the default one before calibration."""
+    return _hash_policy or default_hash_policy()
+
+
+def get_password_hash(password: str, policy: HashPolicy | None = None) -> str:
+    """Hash a password under ``policy`` (the current policy by default)."""
+    policy = policy or get_hash_policy()
+    if policy.scheme == "argon2id":
+        return _argon2_hasher(policy).hash(password)
+
     password_bytes = password.encode("utf-8")
 
     # Generate salt and hash the password
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=policy.cost)
     return bcrypt.hashpw(password_bytes, salt).decode("utf-8")
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against its hash."""
-    password_bytes = plain_password.encode("utf-8")
+    """Verify a password against a bcrypt or argon2id hash."""
+    if isinstance(hashed_password, bytes):
+        hashed_password = hashed_password.decode("utf-8")
+
+    if hashed_password.startswith("$argon2"):
+        try:
+            return argon2.PasswordHasher().verify(hashed_password, plain_password)
+        except (
+            argon2.exceptions.VerificationError,
+            argon2.exceptions.InvalidHashError,
+        ):
+            return False
+
+    return bcrypt.checkpw(plain_password.encode("utf-8"), hashed_password.encode("utf-8"))
+
+
+def needs_rehash(hashed_password: str, policy: HashPolicy | None = None) -> bool:
+    """Whether a stored hash is weaker than, or in another scheme than, ``policy``.
+
+    Only parses the hash, so it is cheap enough to call on every login. Hashes
+    stronger than the policy are left alone, so nodes calibrated slightly
+    differently don't keep rewriting each other's hashes.
+    """
+    policy = policy or get_hash_policy()
+    if hashed_password.startswith("$argon2"):
+        if policy.scheme != "argon2id":
+            return True
+        try:
+            params = argon2.extract_parameters(hashed_password)
+        except argon2.exceptions.InvalidHashError:
+            return True
+        return (
+            params.type is not argon2.Type.ID
+            or params.time_cost < policy.cost
+            or params.memory_cost < policy.memory_kib
+        )
+
+    if policy.scheme != "bcrypt":
+        return True
+    try:
+        rounds = int(hashed_password.split("$")[2])
+    except (IndexError, ValueError):
+        return True
+    return rounds < policy.cost
+
+
+def _argon2_hasher(policy: HashPolicy) -> argon2.PasswordHasher:
+    return argon2.PasswordHasher(
+        time_cost=policy.cost,
+        memory_cost=policy.memory_kib,
+        parallelism=policy.parallelism,
+        type=argon2.Type.ID,
+    )
+
+
+def _time_hash(policy: HashPolicy, samples: int) -> float:
+    # Fastest of a few runs; slower ones mostly measure noisy neighbours
+    best = math.inf
+    for _ in range(samples):
+        started = time.perf_counter()
+        get_password_hash(_CALIBRATION_PASSWORD, policy)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def calibrate_hash_policy() -> dict[str, Any]:
+    """Pick the work factor that takes about PASSWORD_HASH_TARGET_MS per hash here.
+
+    bcrypt time doubles per round and argon2 time grows linearly with its time
+    cost, so one cheap probe predicts the cost, which is then measured once
+    and stepped down if it overshoots by more than half. The cost never drops
+    below the scheme's floor, and PASSWORD_HASH_COST pins it instead. Blocks
+    for roughly a second; call it once at startup.
+    """
+    global _hash_policy, _calibration
+
+    started = time.perf_counter()
+    target = settings.PASSWORD_HASH_TARGET_MS / 1000
+    base = default_hash_policy()
+    calibrated = settings.PASSWORD_HASH_COST is None
+    probe_seconds = None
+
+    if not calibrated:
+        policy = base
+    elif base.scheme == "bcrypt":
+        probe = replace(base, cost=8)
+        probe_seconds = _time_hash(probe, samples=3)
+        cost = probe.cost + round(math.log2(target / probe_seconds))
+        policy = replace(base, cost=min(max(cost, BCRYPT_MIN_ROUNDS), BCRYPT_MAX_ROUNDS))
+    else:
+        probe = replace(base, cost=1)
+        probe_seconds = _time_hash(probe, samples=3)
+        cost = round(target / probe_seconds)
+        policy = replace(
+            base, cost=min(max(cost, ARGON2_MIN_TIME_COST), ARGON2_MAX_TIME_COST)
+        )
+
+    measured = _time_hash(policy, samples=1)
+    floor = BCRYPT_MIN_ROUNDS if policy.scheme == "bcrypt" else ARGON2_MIN_TIME_COST
+    if calibrated and measured > target * 1.5 and policy.cost > floor:
+        policy = replace(policy, cost=policy.cost - 1)
+        measured = _time_hash(policy, samples=1)
+
+    _hash_policy = policy
+    _calibration = {
+        "scheme": policy.scheme,
+        "cost": policy.cost,
+        "memory_kib": policy.memory_kib or None,
+        "parallelism": policy.parallelism,
+        "calibrated": calibrated,
+        "target_ms": settings.PASSWORD_HASH_TARGET_MS,
+        "measured_ms": round(measured * 1000, 2),
+        "probe_ms": round(probe_seconds * 1000, 2) if probe_seconds else None,
+        "hashes_per_second_per_worker": round(1 / measured, 2),
+        "workers": password_hasher.workers,
+        "hashes_per_second": round(password_hasher.workers / measured, 2),
+        "cpu_count": os.cpu_count(),
+        "calibrated_at": datetime.now(timezone.utc).isoformat(),
+        "calibration_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+    metrics.PASSWORD_HASH_COST.set(policy.cost, scheme=policy.scheme)
+    metrics.PASSWORD_HASH_CALIBRATED_SECONDS.set(measured, scheme=policy.scheme)
+    return _calibration
+
+
+def hash_calibration() -> dict[str, Any]:
+    """The last calibration report (empty until calibrate_hash_policy runs)."""
+    return dict(_calibration)
+
+
+async def hash_password(password: str) -> str:
+    """Hash a password on the dedicated hashing pool under the current policy."""
+    return await password_hasher.run(get_password_hash, password, get_hash_policy())
+
+
+async def check_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on the dedicated hashing pool."""
+    return await password_hasher.run(verify_password, plain_password, hashed_password)
+
+
+class TokenError(Exception):
+    """Raised when an access token is malformed, expired or fails verification."""
+
+
+HMAC_ALGORITHMS = frozenset({"HS256", "HS384", "HS512"})
+
+
+def _read_pem(value: str) -> str:
+    """Accept PEM text or a path to a PEM file."""
+    if not value.lstrip().startswith("-----") and os.path.isfile(value):
+        with open(value) as f:
+            return f.read()
+    return value
 
-    # Convert hash back to bytes if it's a string
-    if isinstance(hashed_password, str):
-        hashed_password = hashed_password.encode("utf-8")
 
-    return bcrypt.checkpw(password_bytes, hashed_password)
+def _unverified_kid(token: str) -> str | None:
+    try:
+        segment = token.split(".", 1)[0]
+        header = json.loads(base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4)))
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise TokenError("Malformed token header") from exc
+    if not isinstance(header, dict):
+        raise TokenError("Malformed token header")
+    return header.get("kid")
+
+
+class TokenCodec:
+    """Access-token encoder/verifier whose keys are parsed once, up front.
+
+    ``signing_key`` is the HMAC secret or the private key PEM; it may be
+    omitted on services that only verify. ``verify_keys`` maps additional
+    key ids to secrets or public key PEMs that are still accepted, so keys
+    can be rotated without logging everyone out.
+    """
+
+    name = ""
+    algorithms: frozenset[str] = frozenset()
+
+    def __init__(
+        self,
+        algorithm: str,
+        signing_key: str | None = None,
+        kid: str | None = None,
+        verify_keys: dict[str, str] | None = None,
+    ):
+        if algorithm not in self.algorithms:
+            raise ValueError(
+                f"The {self.name} token backend doesn't support {algorithm}; "
+                f"choose one of {', '.join(sorted(self.algorithms))}"
+            )
+        self.algorithm = algorithm
+        self.kid = kid
+        self._headers = {"kid": kid} if kid else None
+        self._signing_key = None
+        # Keyed by kid; None covers tokens issued without a kid header
+        self._verify_keys: dict[str | None, Any] = {}
+        if signing_key is not None:
+            self._signing_key = self._prepare_signing_key(signing_key)
+            verifier = self._verifier_for(self._signing_key)
+            self._verify_keys[kid] = verifier
+            self._verify_keys.setdefault(None, verifier)
+        for key_id, key in (verify_keys or {}).items():
+            self._verify_keys[key_id] = self._prepare_verify_key(key)
+        if not self._verify_keys:
+            raise ValueError("A token codec needs a signing key or verification keys")
+        self._single_key = (
+            next(iter(self._verify_keys.values()))
+            if len({id(key) for key in self._verify_keys.values()}) == 1
+            else None
+        )
+
+    def encode(self, claims: dict[str, Any]) -> str:
+        if self._signing_key is None:
+            raise TokenError("This codec has no signing key and can only verify tokens")
+        return self._encode(claims)
+
+    def decode(self, token: str) -> dict[str, Any]:
+        key = self._single_key
+        if key is None:
+            key = self._verify_keys.get(_unverified_kid(token))
+            if key is None:
+                raise TokenError("Unknown token key id")
+        return self._decode(token, key)
+
+    def _material(self, key: str) -> str:
+        return key if self.algorithm in HMAC_ALGORITHMS else _read_pem(key)
+
+    def _prepare_signing_key(self, key: str) -> Any:
+        raise NotImplementedError
+
+    def _prepare_verify_key(self, key: str) -> Any:
+        raise NotImplementedError
+
+    def _verifier_for(self, signing_key: Any) -> Any:
+        raise NotImplementedError
+
+    def _encode(self, claims: dict[str, Any]) -> str:
+        raise NotImplementedError
+
+    def _decode(self, token: str, key: Any) -> dict[str, Any]:
+        raise NotImplementedError
+
+
+class JoseTokenCodec(TokenCodec):
+    """python-jose backend using pre-built ``jwk`` key objects."""
+
+    name = "jose"
+    algorithms = HMAC_ALGORITHMS | {"ES256"}
+
+    def _prepare_signing_key(self, key):
+        return jwk.construct(self._material(key), self.algorithm)
+
+    _prepare_verify_key = _prepare_signing_key
+
+    def _verifier_for(self, signing_key):
+        if self.algorithm in HMAC_ALGORITHMS:
+            return signing_key
+        return signing_key.public_key()
+
+    def _encode(self, claims):
+        return jose_jwt.encode(
+            claims, self._signing_key, algorithm=self.algorithm, headers=self._headers
+        )
+
+    def _decode(self, token, key):
+        try:
+            return jose_jwt.decode(token, key, algorithms=[self.algorithm])
+        except JWTError as exc:
+            raise TokenError(str(exc)) from exc
+
+
+class PyJWTTokenCodec(TokenCodec):
+    """PyJWT backend using keys prepared by its algorithm objects."""
+
+    name = "pyjwt"
+    algorithms = HMAC_ALGORITHMS | {"ES256", "EdDSA"}
+
+    def __init__(self, algorithm: str, *args, **kwargs):
+        try:
+            self._algorithm = pyjwt.get_algorithm_by_name(algorithm)
+        except NotImplementedError:
+            self._algorithm = None
+        super().__init__(algorithm, *args, **kwargs)
+
+    def _prepare_signing_key(self, key):
+        return self._algorithm.prepare_key(self._material(key))
+
+    _prepare_verify_key = _prepare_signing_key
+
+    def _verifier_for(self, signing_key):
+        if self.algorithm in HMAC_ALGORITHMS:
+            return signing_key
+        return signing_key.public_key()
+
+    def _encode(self, claims):
+        return pyjwt.encode(
+            claims, self._signing_key, algorithm=self.algorithm, headers=self._headers
+        )
+
+    def _decode(self, token, key):
+        try:
+            return pyjwt.decode(token, key, algorithms=[self.algorithm])
+        except pyjwt.PyJWTError as exc:
+            raise TokenError(str(exc)) from exc
+
+
+TOKEN_BACKENDS: dict[str, type[TokenCodec]] = {
+    "jose": JoseTokenCodec,
+    "pyjwt": PyJWTTokenCodec,
+}
+
+
+def build_token_codec(
+    backend: str | None = None, algorithm: str | None = None
+) -> TokenCodec:
+    """Build a codec from settings; arguments override the configured choice."""
+    algorithm = algorithm or settings.ALGORITHM
+    if algorithm in HMAC_ALGORITHMS:
+        signing_key = settings.SECRET_KEY
+    else:
+        signing_key = settings.JWT_PRIVATE_KEY
+    return TOKEN_BACKENDS[backend or settings.JWT_BACKEND](
+        algorithm,
+        signing_key=signing_key,
+        kid=settings.JWT_KEY_ID,
+        verify_keys=settings.JWT_VERIFY_KEYS,
+    )
+
+
+@lru_cache
+def get_token_codec() -> TokenCodec:
+    """The process-wide codec; called at startup so bad key config fails fast."""
+    return build_token_codec()
+
+
+def decode_access_token(token: str) -> dict[str, Any]:
+    """Verify an access token and return its claims, raising ``TokenError``."""
+    return get_token_codec().decode(token)
 
 
 def create_access_token(
-    subject: Union[str, Any], expires_delta: timedelta = None
+    subject: Union[str, Any],
+    expires_delta: timedelta = None,
+    principal: dict[str, Any] | None = None,
 ) -> str:
     """Create a JWT access token."""
     if expires_delta:
@@ -39,7 +434,20 @@ def create_access_token(
         )
 
     to_encode = {"sub": str(subject), "exp": expire}
-    encoded_jwt = jwt.encode(
-        to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM
+    if principal is not None:
+        to_encode["usr"] = principal
+    return get_token_codec().encode(to_encode)
+
+
+def create_user_access_token(user: Any, expires_delta: timedelta = None) -> str:
+    """Create an access token for a user, honouring AUTH_PRINCIPAL_MODE.
+
+    In "token" mode the JWT also carries a compact principal snapshot so
+    get_current_user can answer without touching the database.
+    """
+    principal = None
+    if settings.AUTH_PRINCIPAL_MODE == "token":
+        principal = schemas.Principal.model_validate(user).model_dump(by_alias=True)
+    return create_access_token(
+        subject=user.id, expires_delta=expires_delta, principal=principal
     )
-    return encoded_jwt
@@ -1,3 +1,23 @@
-from .user import create_user, get_user_by_email
+from .user import (
+    OAuthIdentityConflict,
+    create_user,
+    get_user_by_email,
+    list_users,
+    resolve_oauth_user,
+    search_users,
+    search_users_stmt,
+    update_password_hash,
+    user_filters,
+)
 
-__all__ = [create_user, get_user_by_email]
+__all__ = [
+    OAuthIdentityConflict,
+    create_user,
+    get_user_by_email,
+    list_users,
+    resolve_oauth_user,
+    search_users,
+    search_users_stmt,
+    update_password_hash,
+    user_filters,
+]
@@ -1,24 +1,239 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import Float, Select, String, func, literal, null, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.expression import ColumnElement
 
 from app import schemas
-from app.core.security import get_password_hash
+from app.core.security import hash_password
 from app.models.user import User
+from app.services.user_cache import user_cache
 
 
-def get_user_by_email(db: Session, email: str):
-    return db.query(User).filter(User.email == email).first()
+class OAuthIdentityConflict(Exception):
+    """An OAuth identity can't be attached to the account that owns its email.
 
+    ``reason`` is ``"account_already_exists"`` (the email belongs to an
+    account of another provider, named in ``provider``, or the identity is
+    already linked to an account other than the one owning the email) or
+    ``"provider_id_mismatch"`` (same provider, different provider id).
+    """
 
-def create_user(db: Session, user: schemas.UserCreate):
-    hashed_password = get_password_hash(user.password)
-    db_user = User(
-        email=user.email,
-        hashed_password=hashed_password,
-        full_name=user.full_name,
+    def __init__(self, reason: str, provider: str | None = None):
+        super().__init__(reason)
+        self.reason = reason
+        self.provider = provider
+
+
+def _insert(db: AsyncSession):
+    # INSERT ... ON CONFLICT is dialect specific; SQLite backs local benchmarks
+    if db.get_bind().dialect.name == "sqlite":
+        return sqlite.insert(User)
+    return postgresql.insert(User)
+
+
+async def get_user_by_email(db: AsyncSession, email: str):
+    result = await db.execute(select(User).where(User.email == email))
+    return result.scalars().first()
+
+
+def user_filters(
+    *,
+    provider: str | None = None,
+    is_active: bool | None = None,
+    after_id: int | None = None,
+) -> list[ColumnElement[bool]]:
+    """WHERE criteria for the admin user listing and its NDJSON stream.
+
+    ``after_id`` is the keyset cursor: rows are ordered by id, so the next
+    page seeks past the last id seen on the primary key index instead of
+    counting through skipped rows like OFFSET.
+    """
+    criteria = []
+    if after_id is not None:
+        criteria.append(User.id > after_id)
+    if provider is not None:
+        criteria.append(User.provider == provider)
+    if is_active is not None:
+        criteria.append(User.is_active.is_(is_active))
+    return criteria
+
+
+async def list_users(
+    db: AsyncSession, *, limit: int, criteria: list[ColumnElement[bool]]
+) -> list[User]:
+    stmt = select(User).where(*criteria).order_by(User.id).limit(limit)
+    return list((await db.scalars(stmt)).all())
+
+
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def search_users_stmt(dialect: str, term: str, limit: int) -> Select:
+    """Fuzzy user search on full name and email, best match first.
+
+    On PostgreSQL, rows match on a substring (``ILIKE '%term%'``) or on
+    trigram similarity above ``pg_trgm.similarity_threshold`` (typos), and
+    both are served by the ``*_trgm`` GIN indexes. Rows are ranked by the
+    better of the two columns' similarity. Other dialects have no pg_trgm and
+    fall back to an unranked substring match.
+    """
+    pattern = f"%{_escape_like(term)}%"
+    substring = or_(
+        User.full_name.ilike(pattern, escape="\\"),
+        User.email.ilike(pattern, escape="\\"),
+    )
+    if dialect != "postgresql":
+        return (
+            select(User, null().cast(Float).label("score"))
+            .where(substring)
+            .order_by(User.id)
+            .limit(limit)
+        )
+
+    # GREATEST skips the NULL similarity of a missing full name
+    score = func.greatest(
+        func.similarity(User.full_name, term), func.similarity(User.email, term)
+    )
+    return (
+        select(User, score.label("score"))
+        .where(
+            or_(substring, User.full_name.op("%")(term), User.email.op("%")(term))
+        )
+        .order_by(score.desc(), User.id)
+        .limit(limit)
+    )
+
+
+async def search_users(
+    db: AsyncSession, term: str, limit: int
+) -> list[tuple[User, float | None]]:
+    stmt = search_users_stmt(db.get_bind().dialect.name, term, limit)
+    return [tuple(row) for row in await db.execute(stmt)]
+
+
+async def create_user(db: AsyncSession, user: schemas.UserCreate):
+    """Insert a password user in one statement.
+
+    Returns None, without raising, when the email is already taken.
+    """
+    hashed_password = await hash_password(user.password)
+    stmt = (
+        _insert(db)
+        .values(
+            email=user.email,
+            hashed_password=hashed_password,
+            full_name=user.full_name,
+            is_active=True,
+            is_superuser=False,
+            version=1,
+        )
+        .on_conflict_do_nothing(index_elements=[User.email])
+        .returning(User)
+    )
+    db_user = (await db.scalars(stmt)).first()
+    await db.commit()
+    if db_user is not None:
+        # Seed the cache with the primary's row so the follow-up /auth/me
+        # doesn't depend on a read replica having caught up
+        await user_cache.set(db_user)
+    return db_user
+
+
+async def resolve_oauth_user(
+    db: AsyncSession,
+    *,
+    provider: str,
+    provider_id: str,
+    email: str,
+    full_name: str | None,
+):
+    """Create or update the user for an OAuth identity in a single statement.
+
+    The common cases, a returning user (even one whose email changed at the
+    provider) and a brand new user, are one ``INSERT ... ON CONFLICT
+    (provider, provider_id) DO UPDATE ... RETURNING``. Only when the email
+    already belongs to a different account do we fall back to inspecting that
+    account, raising OAuthIdentityConflict or linking a provider-less account.
+    """
+    stmt = _insert(db).values(
+        email=email,
+        full_name=full_name or email.split("@")[0],  # Fallback name
+        hashed_password="",  # OAuth users don't have passwords
+        provider=provider,
+        provider_id=provider_id,
         is_active=True,
         is_superuser=False,
+        version=1,
     )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    return db_user
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[User.provider, User.provider_id],
+        set_={
+            "email": stmt.excluded.email,
+            "full_name": func.coalesce(literal(full_name, String), User.full_name),
+            "version": User.version + 1,
+        },
+    ).returning(User)
+
+    try:
+        user = (
+            await db.scalars(stmt, execution_options={"populate_existing": True})
+        ).one()
+        await db.commit()
+    except IntegrityError:
+        # The email is owned by another account
+        await db.rollback()
+        user = await get_user_by_email(db, email=email)
+        if user is None:
+            raise
+        if user.provider and user.provider != provider:
+            raise OAuthIdentityConflict("account_already_exists", user.provider)
+        if user.provider and user.provider_id != provider_id:
+            raise OAuthIdentityConflict("provider_id_mismatch", user.provider)
+
+        # Link OAuth account to existing email/password account
+        link = (
+            update(User)
+            .where(User.id == user.id)
+            .values(
+                provider=provider,
+                provider_id=provider_id,
+                version=User.version + 1,
+            )
+            .returning(User)
+        )
+        try:
+            user = (
+                await db.scalars(link, execution_options={"populate_existing": True})
+            ).one()
+            await db.commit()
+        except IntegrityError:
+            # The identity is already linked to another account
+            await db.rollback()
+            raise OAuthIdentityConflict("account_already_exists", provider) from None
+
+    # Fresh from the primary; see create_user
+    await user_cache.set(user)
+    return user
+
+
+async def update_password_hash(
+    db: AsyncSession, user_id: int, old_hash: str, new_hash: str
+) -> bool:
+    """Swap a user's password hash if it is still ``old_hash``.
+
+    Used to upgrade hashes after login; the compare-and-set keeps a password
+    change that raced with the rehash from being overwritten.
+    """
+    stmt = (
+        update(User)
+        .where(User.id == user_id, User.hashed_password == old_hash)
+        .values(hashed_password=new_hash, version=User.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    updated = (await db.execute(stmt)).rowcount == 1
+    await db.commit()
+    if updated:
+        await user_cache.invalidate(user_id)
+    return updated
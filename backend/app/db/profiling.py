@@ -0,0 +1,128 @@
+"""Per-request SQL profiling for development and staging.
+
+When ``SQL_PROFILING_ENABLED`` is set, engine events count every statement
+and sum its time into the current request's ``QueryStats``. The middleware
+reports the totals in a ``Server-Timing`` header and logs a warning when a
+request exceeds the query budget or repeats a statement with different
+parameters (the usual N+1 shape). Nothing is hooked when the switch is off.
+"""
+
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.core.metrics import route_template
+
+logger = logging.getLogger(__name__)
+
+# Distinct parameter sets remembered per statement; enough to spot N+1
+# without growing unbounded on a bulk loop.
+MAX_TRACKED_PARAMS = 50
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    total_seconds: float = 0.0
+    # statement -> distinct parameter reprs seen for it
+    statements: dict[str, set[str]] = field(default_factory=dict)
+
+    def record(self, statement: str, parameters, elapsed: float) -> None:
+        self.count += 1
+        self.total_seconds += elapsed
+        seen = self.statements.setdefault(statement, set())
+        if len(seen) < MAX_TRACKED_PARAMS:
+            seen.add(repr(parameters))
+
+    def repeated(self) -> dict[str, int]:
+        """Statements executed with more than one distinct parameter set."""
+        return {sql: len(params) for sql, params in self.statements.items() if len(params) > 1}
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.total_seconds * 1000:.2f};desc="{self.count} queries"'
+
+
+_current: ContextVar[QueryStats | None] = ContextVar("sql_query_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, parameters, time.perf_counter() - started)
+
+
+def install(*engines: Engine) -> None:
+    """Attach the timing hooks to the given (sync) engines."""
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class SQLProfilingMiddleware:
+    """Pure ASGI middleware collecting ``QueryStats`` for each HTTP request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current.set(stats)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                # Statements issued after the headers go out (streaming bodies,
+                # background tasks) still count towards the logged totals.
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", stats.server_timing().encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            _report(scope, stats)
+
+
+def _report(scope, stats: QueryStats) -> None:
+    route = route_template(scope)
+    endpoint = getattr(scope.get("endpoint"), "__name__", route)
+    budget = settings.SQL_PROFILING_QUERY_BUDGET
+    if stats.count > budget:
+        logger.warning(
+            "%s %s issued %d SQL statements (budget %d) in %.1f ms",
+            scope["method"],
+            endpoint,
+            stats.count,
+            budget,
+            stats.total_seconds * 1000,
+        )
+    for statement, distinct in stats.repeated().items():
+        logger.warning(
+            "Possible N+1 in %s %s: statement ran with %d different parameter sets: %s",
+            scope["method"],
+            endpoint,
+            distinct,
+            " ".join(statement.split())[:200],
+        )
+    logger.debug(
+        "%s %s: %d SQL statements in %.1f ms",
+        scope["method"],
+        route,
+        stats.count,
+        stats.total_seconds * 1000,
+    )
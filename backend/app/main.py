@@ -1,27 +1,165 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager, contextmanager, suppress
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.middleware.sessions import SessionMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
 
+from app import IMPORT_STARTED
 from app.api.api import api_router
+from app.core import metrics, security
 from app.core.config import settings
+from app.core.hashing import HashingQueueFull, password_hasher
+from app.core.http import close_http_client
+from app.core.oauth import google_jwks, warm_oauth_clients
+from app.core.redis import close_redis
+from app.core.responses import PydanticJSONResponse
+from app.db.profiling import SQLProfilingMiddleware
+from app.db.session import warm_pool
+from app.models.user import User
+from app.services.code_runner import CodeRunnerError, code_runner
+from app.services.user_transfer import shutdown_hash_pool
+
+logger = logging.getLogger(__name__)
+
+IMPORT_SECONDS = time.perf_counter() - IMPORT_STARTED
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 2)
+
+
+@contextmanager
+def _phase(report: dict, name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        report[f"{name}_ms"] = _ms(time.perf_counter() - started)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    warmup: dict = {}
+    report = {"import_ms": _ms(IMPORT_SECONDS), "warmup": warmup}
+
+    # Parse signing/verification keys once, and fail fast on bad key config
+    with _phase(warmup, "token_codec"):
+        security.get_token_codec()
+    # Size the password work factor for this machine before taking traffic
+    with _phase(warmup, "hash_calibration"):
+        await asyncio.to_thread(security.calibrate_hash_policy)
+    if settings.GOOGLE_CLIENT_ID:
+        with _phase(warmup, "jwks"):
+            await google_jwks.start()
+    if settings.STARTUP_WARMUP:
+        with _phase(warmup, "db_pool"):
+            report["db_connections"] = await warm_pool(
+                settings.DB_WARM_CONNECTIONS, prime_models=(User,)
+            )
+        with _phase(warmup, "openapi"):
+            app.openapi()
+        # The first sync endpoint/dependency otherwise pays for anyio's
+        # lazily imported backend and worker thread start-up
+        with _phase(warmup, "threadpool"):
+            await run_in_threadpool(lambda: None)
+        with _phase(warmup, "oauth_clients"):
+            report["oauth_providers"] = warm_oauth_clients()
+        # Fork the sandbox interpreters now, not on the first "run code"
+        with _phase(warmup, "code_runner"):
+            try:
+                report["code_runner_workers"] = await code_runner.start()
+            except CodeRunnerError as exc:
+                # The rest of the app works without it; runs get a 503
+                logger.error("Code runner disabled: %s", exc)
+                report["code_runner_workers"] = 0
+
+    flush_task = None
+    if settings.METRICS_ENABLED and settings.METRICS_MULTIPROC_DIR:
+        flush_task = asyncio.create_task(metrics.flush_periodically())
+
+    report["startup_ms"] = _ms(time.perf_counter() - started)
+    report["ready_ms"] = _ms(time.perf_counter() - IMPORT_STARTED)
+    app.state.startup_report = report
+    logger.info("Startup complete: %s", report)
 
-app = FastAPI(
-    title=settings.PROJECT_NAME, openapi_url=f"{settings.API_V1_STR}/openapi.json"
-)
-
-# Set all CORS enabled origins
-if settings.ALLOWED_ORIGINS:
-    app.add_middleware(
-        CORSMiddleware,
-        allow_origins=[str(origin) for origin in settings.ALLOWED_ORIGINS],
-        allow_credentials=True,
-        allow_methods=["*"],
-        allow_headers=["*"],
+    yield
+    if flush_task is not None:
+        flush_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await flush_task
+    await google_jwks.stop()
+    await code_runner.stop()
+    password_hasher.shutdown()
+    shutdown_hash_pool()
+    await close_redis()
+    await close_http_client()
+
+
+async def hashing_queue_full_handler(request: Request, exc: HashingQueueFull):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server is busy, please try again shortly."},
+        headers={"Retry-After": str(password_hasher.retry_after())},
     )
-app.add_middleware(SessionMiddleware, secret_key=settings.SECRET_KEY)
-app.include_router(api_router, prefix=settings.API_V1_STR)
 
 
-@app.get("/")
 def root():
     return {"message": "Welcome to AI Interview Coach API"}
+
+
+def prometheus_metrics():
+    return PlainTextResponse(
+        metrics.generate_latest(), media_type="text/plain; version=0.0.4"
+    )
+
+
+def create_app() -> FastAPI:
+    """Build the application; heavy initialisation happens in the lifespan."""
+    app = FastAPI(
+        title=settings.PROJECT_NAME,
+        openapi_url=f"{settings.API_V1_STR}/openapi.json",
+        lifespan=lifespan,
+        # Routes with a response_model already serialize to bytes in
+        # FastAPI; this covers everything returning plain content
+        default_response_class=PydanticJSONResponse,
+    )
+    app.state.startup_report = {}
+
+    # Set all CORS enabled origins
+    if settings.ALLOWED_ORIGINS:
+        app.add_middleware(
+            CORSMiddleware,
+            allow_origins=[str(origin) for origin in settings.ALLOWED_ORIGINS],
+            allow_credentials=True,
+            allow_methods=["*"],
+            allow_headers=["*"],
+        )
+    if settings.SQL_PROFILING_ENABLED:
+        app.add_middleware(SQLProfilingMiddleware)
+    if settings.METRICS_ENABLED:
+        # Added after the app's middleware so it times the full request
+        app.add_middleware(metrics.MetricsMiddleware)
+    if settings.FORWARDED_ALLOW_IPS:
+        # Outermost: everything below, rate limits included, sees the real
+        # client address instead of the proxy's
+        app.add_middleware(
+            ProxyHeadersMiddleware, trusted_hosts=settings.FORWARDED_ALLOW_IPS
+        )
+    app.include_router(api_router, prefix=settings.API_V1_STR)
+
+    app.add_exception_handler(HashingQueueFull, hashing_queue_full_handler)
+    app.add_api_route("/", root, methods=["GET"])
+    if settings.METRICS_ENABLED:
+        app.add_api_route(
+            "/metrics", prometheus_metrics, methods=["GET"], include_in_schema=False
+        )
+    return app
+
+
+app = create_app()
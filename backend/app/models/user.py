@@ -1,11 +1,11 @@
-from sqlalchemy import Boolean, Column, Integer, String
+from sqlalchemy import DDL, Boolean, Column, Index, Integer, String, event
 
 from app.db.base import Base
 
 
 class User(Base):
     id = Column(Integer, primary_key=True, index=True)
-    full_name = Column(String, index=True)
+    full_name = Column(String)
     email = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=True)
     is_active = Column(Boolean(), default=True)
@@ -14,3 +14,35 @@ class User(Base):
     # OAuth provider info (optional)
     provider = Column(String, default="email")  # email, google, github
     provider_id = Column(String, nullable=True)
+
+    # Bumped on every UPDATE; lets stateless tokens carry a comparable snapshot
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+
+    __mapper_args__ = {"version_id_col": version}
+    __table_args__ = (
+        # One account per OAuth identity; also the ON CONFLICT target for upserts
+        Index("ix_user_provider_provider_id", "provider", "provider_id", unique=True),
+        # pg_trgm indexes behind the admin fuzzy search (ILIKE '%term%' and
+        # similarity); other dialects get a plain index
+        Index(
+            "ix_user_full_name_trgm",
+            "full_name",
+            postgresql_using="gin",
+            postgresql_ops={"full_name": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_user_email_trgm",
+            "email",
+            postgresql_using="gin",
+            postgresql_ops={"email": "gin_trgm_ops"},
+        ),
+    )
+
+
+# The trigram indexes need the extension; covers metadata.create_all (migrations
+# create it themselves)
+event.listen(
+    User.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
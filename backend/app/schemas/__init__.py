@@ -1,21 +1,34 @@
+from .code import CodeRunRequest, CodeTestCase
+from .feedback import FeedbackRequest
 from .user import (
     AuthResponse,
     LogoutResponse,
+    Principal,
     Token,
     TokenData,
     User,
+    UserAdminView,
     UserCreate,
     UserInDB,
+    UserPage,
+    UserSearchHit,
     UserUpdate,
 )
 
 __all__ = [
+    "CodeRunRequest",
+    "CodeTestCase",
+    "FeedbackRequest",
     "Token",
     "TokenData",
     "User",
+    "UserAdminView",
+    "UserPage",
+    "UserSearchHit",
     "UserCreate",
     "UserInDB",
     "UserUpdate",
     "AuthResponse",
     "LogoutResponse",
+    "Principal",
 ]
@@ -0,0 +1,15 @@
+from typing import Literal
+
+from pydantic import BaseModel, Field
+
+
+class CodeTestCase(BaseModel):
+    input: str = Field(default="", max_length=100_000)
+    expected_output: str = Field(max_length=100_000)
+
+
+# A submission to run against a batch of test cases (stdin -> stdout)
+class CodeRunRequest(BaseModel):
+    language: Literal["python"] = "python"
+    code: str = Field(min_length=1, max_length=64_000)
+    test_cases: list[CodeTestCase] = Field(min_length=1, max_length=50)
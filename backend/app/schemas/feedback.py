@@ -0,0 +1,9 @@
+from pydantic import BaseModel, Field
+
+
+# Request for streamed AI feedback on an interview answer
+class FeedbackRequest(BaseModel):
+    question: str = Field(min_length=1, max_length=5_000)
+    answer: str = Field(min_length=1, max_length=20_000)
+    # Programming language of a code answer; None for a spoken/written answer
+    language: str | None = Field(default=None, max_length=32)
@@ -1,6 +1,6 @@
 from typing import Optional
 
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
 
 
 # Shared properties
@@ -32,11 +32,44 @@ class User(UserInDBBase):
     pass
 
 
+# Admin listing/export view; never includes the password hash
+class UserAdminView(User):
+    is_superuser: Optional[bool] = False
+    provider: Optional[str] = None
+    provider_id: Optional[str] = None
+
+
+class UserPage(BaseModel):
+    items: list[UserAdminView]
+    # Pass as after_id to fetch the next page; null on the last page
+    next_after_id: Optional[int] = None
+
+
+class UserSearchHit(BaseModel):
+    user: UserAdminView
+    # Trigram similarity (0-1); null where the database can't rank
+    score: Optional[float] = None
+
+
 # Additional properties stored in DB
 class UserInDB(UserInDBBase):
     hashed_password: str
 
 
+# Compact user snapshot embedded in access tokens (stateless principal mode).
+# Aliases are the short claim names used inside the JWT.
+class Principal(BaseModel):
+    model_config = ConfigDict(from_attributes=True, populate_by_name=True)
+
+    id: int
+    email: str = Field(alias="em")
+    full_name: Optional[str] = Field(default=None, alias="nm")
+    is_active: Optional[bool] = Field(default=True, alias="act")
+    is_superuser: Optional[bool] = Field(default=False, alias="su")
+    provider: Optional[str] = Field(default=None, alias="prv")
+    version: int = Field(default=1, alias="ver")
+
+
 # Login schema
 class Token(BaseModel):
     access_token: str
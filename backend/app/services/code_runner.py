@@ -0,0 +1,459 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import sys
+import time
+from collections import OrderedDict, deque
+from contextlib import aclosing
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import AsyncIterator, Hashable
+
+from app.core import metrics
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+SANDBOX_SCRIPT = Path(__file__).with_name("sandbox.py")
+APP_ROOT = Path(__file__).resolve().parents[2]
+# One result line carries up to CODE_RUNNER_OUTPUT_KB of JSON-escaped output
+_READ_LIMIT = 4 * 1024 * 1024
+# On top of the sandbox's own wall-clock kill, before a worker counts as hung
+_HANG_GRACE_SECONDS = 5.0
+_START_TIMEOUT_SECONDS = 30.0
+
+
+class CodeRunnerBusy(Exception):
+    """Raised when the code runner queue is at capacity."""
+
+
+class TooManyCodeRuns(Exception):
+    """Raised when a user already has the maximum number of runs in progress."""
+
+
+class CodeRunnerError(Exception):
+    """Raised when a sandbox worker dies, hangs, misbehaves or can't isolate runs."""
+
+
+@dataclass(frozen=True)
+class RunLimits:
+    cpu_seconds: int
+    wall_seconds: float
+    memory_mb: int
+    output_kb: int
+
+    def to_job(self) -> dict:
+        return {
+            "cpu_seconds": self.cpu_seconds,
+            "wall_seconds": self.wall_seconds,
+            "memory_bytes": self.memory_mb * 1024 * 1024,
+            "output_bytes": self.output_kb * 1024,
+        }
+
+
+@dataclass(eq=False)
+class CodeRun:
+    """One submission against a batch of inputs, and its event stream."""
+
+    owner: Hashable
+    code: str
+    inputs: list[str]
+    limits: RunLimits
+    submitted_at: float = field(default_factory=time.monotonic)
+    events: asyncio.Queue = field(default_factory=asyncio.Queue)
+    worker: "SandboxWorker | None" = None
+    cancelled: bool = False
+    finished: bool = False
+
+
+class FairQueue:
+    """Bounded queue that serves owners round-robin, FIFO within an owner.
+
+    A user submitting a burst waits behind their own runs instead of in
+    front of everyone else's.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._queues: OrderedDict[Hashable, deque] = OrderedDict()
+        self._size = 0
+        self._getters: deque[asyncio.Future] = deque()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def put_nowait(self, owner: Hashable, item) -> None:
+        if self._size >= self.max_size:
+            raise CodeRunnerBusy("Code runner queue is full")
+        self._queues.setdefault(owner, deque()).append(item)
+        self._size += 1
+        self._wake_getter()
+
+    def remove(self, owner: Hashable, item) -> bool:
+        queue = self._queues.get(owner)
+        if queue is None or item not in queue:
+            return False
+        queue.remove(item)
+        if not queue:
+            del self._queues[owner]
+        self._size -= 1
+        return True
+
+    async def get(self):
+        while not self._size:
+            getter = asyncio.get_running_loop().create_future()
+            self._getters.append(getter)
+            try:
+                await getter
+            except asyncio.CancelledError:
+                if getter in self._getters:
+                    self._getters.remove(getter)
+                elif self._size:
+                    # We were woken but won't take the item; pass it on
+                    self._wake_getter()
+                raise
+        owner, queue = self._queues.popitem(last=False)
+        item = queue.popleft()
+        if queue:
+            # Back of the line for this owner's next run
+            self._queues[owner] = queue
+        self._size -= 1
+        return item
+
+    def _wake_getter(self) -> None:
+        while self._getters:
+            getter = self._getters.popleft()
+            if not getter.done():
+                getter.set_result(None)
+                return
+
+
+def hidden_paths() -> list[str]:
+    """What runs must not see: the app's tree and the settings' env files."""
+    env_files = settings.model_config.get("env_file") or ()
+    if isinstance(env_files, (str, os.PathLike)):
+        env_files = (env_files,)
+    paths = {APP_ROOT, *(Path(env_file).resolve() for env_file in env_files)}
+    return sorted(str(path) for path in paths)
+
+
+class SandboxWorker:
+    """A warm interpreter (``sandbox.py``) that forks one child per test case."""
+
+    def __init__(self, index: int, uids: range):
+        self.index = index
+        self.uids = uids
+        self.process: asyncio.subprocess.Process | None = None
+        self.uid: int | None = None
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    async def start(self) -> None:
+        self.process = await asyncio.create_subprocess_exec(
+            sys.executable,
+            "-I",
+            str(SANDBOX_SCRIPT),
+            str(self.uids.start),
+            str(len(self.uids)),
+            *hidden_paths(),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            # A clean environment: none of the app's settings or secrets
+            env={"PATH": os.defpath, "LANG": "C.UTF-8"},
+            start_new_session=True,
+            limit=_READ_LIMIT,
+        )
+        try:
+            ready = await asyncio.wait_for(self._read(), _START_TIMEOUT_SECONDS)
+            if "error" in ready:
+                # It exits on its own after reporting
+                await self.process.wait()
+                raise CodeRunnerError(
+                    f"Sandbox worker {self.index} cannot isolate runs: {ready['error']}"
+                )
+        except BaseException:
+            self.kill()
+            raise
+        self.uid = ready["uid"]
+
+    async def _read(self) -> dict:
+        line = await self.process.stdout.readline()
+        if not line:
+            raise CodeRunnerError(f"Sandbox worker {self.index} exited")
+        return json.loads(line)
+
+    async def run(self, run: CodeRun) -> None:
+        """Run every input of ``run``, publishing each result as it arrives."""
+        job = {"code": run.code, "inputs": run.inputs, "limits": run.limits.to_job()}
+        self.process.stdin.write(json.dumps(job).encode() + b"\n")
+        await self.process.stdin.drain()
+        timeout = run.limits.wall_seconds + _HANG_GRACE_SECONDS
+        while True:
+            try:
+                message = await asyncio.wait_for(self._read(), timeout)
+            except TimeoutError:
+                raise CodeRunnerError(f"Sandbox worker {self.index} hung") from None
+            if message.get("done"):
+                return
+            if "compile_error" in message:
+                event = {"type": "compile_error", "detail": message["compile_error"]}
+            else:
+                metrics.CODE_RUN_CASE_SECONDS.observe(
+                    message["wall_ms"] / 1000, status=message["status"]
+                )
+                event = {"type": "case", **message}
+            run.events.put_nowait(event)
+
+    def kill(self) -> None:
+        if self.alive:
+            self.process.kill()
+
+    async def stop(self) -> None:
+        if self.process is None:
+            return
+        if self.alive:
+            self.process.stdin.close()
+            try:
+                await asyncio.wait_for(self.process.wait(), 2)
+            except TimeoutError:
+                self.process.kill()
+        await self.process.wait()
+
+
+def outputs_match(actual: str, expected: str) -> bool:
+    """Judge-style comparison that ignores trailing whitespace and blank lines."""
+    return [line.rstrip() for line in actual.rstrip().splitlines()] == [
+        line.rstrip() for line in expected.rstrip().splitlines()
+    ]
+
+
+class CodeRunner:
+    """Pre-warmed sandbox workers behind a bounded, per-user fair queue.
+
+    Each worker is a long-lived interpreter with the usual modules already
+    imported, so a test case costs a ``fork()`` (a few ms) rather than a
+    fresh interpreter start-up per run. A worker takes one submission at a
+    time and runs its test cases back to back; results are streamed as each
+    case finishes. Submissions are rejected with TooManyCodeRuns past
+    ``max_runs_per_user`` in flight, and with CodeRunnerBusy once
+    ``max_queue`` are waiting. Workers that crash, hang or are interrupted
+    by a cancelled run are replaced.
+
+    Every worker runs its cases as its own uid out of ``uids``, so the range
+    needs a uid per worker across all app processes on the host. ``start``
+    raises CodeRunnerError, and so no code is run, when workers cannot drop
+    to those uids and namespace their runs (see ``sandbox.py``).
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        max_queue: int,
+        max_runs_per_user: int,
+        limits: RunLimits,
+        uids: range,
+    ):
+        self.workers = workers
+        self.uids = uids
+        self.max_runs_per_user = max_runs_per_user
+        self.limits = limits
+        self._queue = FairQueue(max_queue)
+        self._active: dict[Hashable, int] = {}
+        self._pool: list[SandboxWorker] = []
+        self._tasks: list[asyncio.Task] = []
+        self._start_lock = asyncio.Lock()
+        self.busy = 0
+        self.runs = 0
+        self.cases = 0
+        self.rejected = 0
+        self.restarts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.run_seconds_total = 0.0
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
+
+    async def start(self) -> int:
+        """Start and warm the workers; returns how many are running."""
+        async with self._start_lock:
+            if not self._tasks:
+                pool = [SandboxWorker(index, self.uids) for index in range(self.workers)]
+                try:
+                    await asyncio.gather(*(worker.start() for worker in pool))
+                except BaseException:
+                    for worker in pool:
+                        worker.kill()
+                    raise
+                self._pool = pool
+                self._tasks = [
+                    asyncio.create_task(self._serve(worker)) for worker in pool
+                ]
+        return len(self._pool)
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await asyncio.gather(
+            *(worker.stop() for worker in self._pool), return_exceptions=True
+        )
+        self._tasks = []
+        self._pool = []
+
+    def retry_after(self) -> int:
+        """Seconds until the current backlog should have drained."""
+        if not self.runs:
+            return 1
+        per_run = self.run_seconds_total / self.runs
+        return max(1, math.ceil(per_run * (self.queued + 1) / self.workers))
+
+    async def submit(self, owner: Hashable, code: str, inputs: list[str]) -> CodeRun:
+        """Queue ``code`` to run once per input, or fail fast if over a limit."""
+        await self.start()
+        if self._active.get(owner, 0) >= self.max_runs_per_user:
+            self.rejected += 1
+            metrics.CODE_RUN_REJECTED.inc(reason="per_user")
+            raise TooManyCodeRuns("Too many code runs in progress")
+        run = CodeRun(owner=owner, code=code, inputs=inputs, limits=self.limits)
+        try:
+            self._queue.put_nowait(owner, run)
+        except CodeRunnerBusy:
+            self.rejected += 1
+            metrics.CODE_RUN_REJECTED.inc(reason="queue_full")
+            raise
+        self._active[owner] = self._active.get(owner, 0) + 1
+        return run
+
+    async def events(self, run: CodeRun) -> AsyncIterator[dict]:
+        """Events of ``run`` as they happen; closing early cancels the run."""
+        try:
+            while (event := await run.events.get()) is not None:
+                yield event
+        finally:
+            if not run.finished:
+                self.cancel(run)
+
+    async def judge(self, run: CodeRun, expected: list[str]) -> AsyncIterator[dict]:
+        """Events of ``run`` with each case graded against ``expected``.
+
+        Cases the program completed get ``passed`` or ``wrong_answer``; the
+        others keep the sandbox status (``time_limit``, ``runtime_error``...).
+        Ends with a ``done`` event counting the passed cases.
+        """
+        passed = 0
+        async with aclosing(self.events(run)) as events:
+            async for event in events:
+                if event["type"] == "case" and event["status"] == "ok":
+                    ok = outputs_match(event["stdout"], expected[event["index"]])
+                    event["status"] = "passed" if ok else "wrong_answer"
+                    passed += ok
+                yield event
+        yield {"type": "done", "passed": passed, "total": len(expected)}
+
+    def cancel(self, run: CodeRun) -> None:
+        run.cancelled = True
+        if self._queue.remove(run.owner, run):
+            self._finish(run)
+        elif run.worker is not None:
+            # Interrupting a worker mid-job is a kill; _serve replaces it
+            run.worker.kill()
+
+    def _finish(self, run: CodeRun) -> None:
+        run.finished = True
+        remaining = self._active.pop(run.owner, 1) - 1
+        if remaining:
+            self._active[run.owner] = remaining
+        run.events.put_nowait(None)
+
+    async def _restart(self, worker: SandboxWorker) -> None:
+        worker.kill()
+        if worker.process is not None:
+            await worker.process.wait()
+        self.restarts += 1
+        await worker.start()
+
+    async def _serve(self, worker: SandboxWorker) -> None:
+        while True:
+            if not worker.alive:
+                try:
+                    await self._restart(worker)
+                except (CodeRunnerError, OSError, TimeoutError):
+                    logger.exception("Could not restart sandbox worker %s", worker.index)
+                    await asyncio.sleep(1)
+                    continue
+
+            run = await self._queue.get()
+            waited = time.monotonic() - run.submitted_at
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+            metrics.CODE_RUN_QUEUE_WAIT.observe(waited)
+            run.events.put_nowait({"type": "start", "queued_ms": round(waited * 1000, 2)})
+
+            run.worker = worker
+            self.busy += 1
+            started = time.monotonic()
+            try:
+                await worker.run(run)
+            except (CodeRunnerError, OSError, ValueError):
+                if not run.cancelled:
+                    logger.warning("Sandbox worker %s failed", worker.index, exc_info=True)
+                    run.events.put_nowait(
+                        {"type": "error", "detail": "Code execution failed, please try again"}
+                    )
+                worker.kill()
+            finally:
+                self.busy -= 1
+                run.worker = None
+                self.runs += 1
+                self.cases += len(run.inputs)
+                self.run_seconds_total += time.monotonic() - started
+                self._finish(run)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "alive": sum(worker.alive for worker in self._pool),
+            "busy": self.busy,
+            "queued": self.queued,
+            "max_queue": self._queue.max_size,
+            "max_runs_per_user": self.max_runs_per_user,
+            "uids": [worker.uid for worker in self._pool],
+            "limits": asdict(self.limits),
+            "runs": self.runs,
+            "cases": self.cases,
+            "rejected": self.rejected,
+            "restarts": self.restarts,
+            "wait_seconds_avg": self.wait_seconds_total / self.runs if self.runs else 0.0,
+            "wait_seconds_max": self.wait_seconds_max,
+        }
+
+
+code_runner = CodeRunner(
+    workers=settings.CODE_RUNNER_WORKERS or os.cpu_count() or 1,
+    max_queue=settings.CODE_RUNNER_MAX_QUEUE,
+    max_runs_per_user=settings.CODE_RUNNER_MAX_RUNS_PER_USER,
+    limits=RunLimits(
+        cpu_seconds=settings.CODE_RUNNER_CPU_SECONDS,
+        wall_seconds=settings.CODE_RUNNER_WALL_SECONDS,
+        memory_mb=settings.CODE_RUNNER_MEMORY_MB,
+        output_kb=settings.CODE_RUNNER_OUTPUT_KB,
+    ),
+    uids=range(
+        settings.CODE_RUNNER_UID_BASE,
+        settings.CODE_RUNNER_UID_BASE + settings.CODE_RUNNER_UID_COUNT,
+    ),
+)
+
+
+def _collect_code_runner_metrics() -> None:
+    metrics.CODE_RUN_QUEUED.set(code_runner.queued)
+    metrics.CODE_RUNNER_BUSY.set(code_runner.busy)
+
+
+metrics.register_collector(_collect_code_runner_metrics)
@@ -0,0 +1,32 @@
+from typing import AsyncIterator
+
+from app import schemas
+from app.services.llm import llm_gateway
+
+FEEDBACK_SYSTEM_PROMPT = (
+    "You are an experienced technical interviewer. Give concise, specific "
+    "feedback on the candidate's answer: what is correct, what is missing or "
+    "wrong, and one concrete way to improve it."
+)
+
+
+def build_feedback_prompt(request: schemas.FeedbackRequest) -> str:
+    if request.language:
+        answer = f"```{request.language}\n{request.answer}\n```"
+    else:
+        answer = request.answer
+    return f"Interview question:\n{request.question}\n\nCandidate answer:\n{answer}"
+
+
+def stream_feedback(request: schemas.FeedbackRequest) -> AsyncIterator[str]:
+    """Feedback text as the model produces it.
+
+    Only exact repeats are served from cache: a near-identical answer can
+    differ in the one line the feedback should be about.
+    """
+    return llm_gateway.stream(
+        build_feedback_prompt(request),
+        kind="feedback",
+        system=FEEDBACK_SYSTEM_PROMPT,
+        semantic=False,
+    )
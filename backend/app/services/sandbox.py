@@ -0,0 +1,403 @@
+"""Pre-warmed sandbox worker for running candidate code.
+
+Started by ``app.services.code_runner`` as ``python -I sandbox.py``, this
+process imports what submissions commonly use, freezes its heap and then
+serves jobs over stdin/stdout, one JSON document per line. Every test case
+runs in a fresh ``fork()`` of this warm interpreter, so a run costs a fork
+instead of an interpreter start-up, and nothing a submission does survives
+into the next run.
+
+Isolation is all or nothing: at start-up the worker locks a uid of its own
+from the range it is given (no other worker on the host, in any app
+process, holds it at the same time), kills anything left running under that
+uid, and moves into new mount and network namespaces. There every mount is
+read-only, /tmp is a small private tmpfs and there are no network
+interfaces, and the app's source tree and env file (paths given by the app)
+are covered by empty mounts. If any of that fails, which it does unless the
+app runs as root with CAP_SYS_ADMIN, it reports the error and exits instead
+of becoming ready.
+
+Each forked run then gets its own directory on that tmpfs as cwd (the only
+place it can write), stdin/stdout/stderr redirected to files in it, rlimits
+on CPU time, address space, file size, open files and processes, the
+worker's uid with no supplementary groups, and an audit hook refusing
+sockets, subprocesses, signals and native code. A run can still read
+whatever else the filesystem lets any user read, so keep secrets out of
+world-readable files outside the app's tree.
+
+Standard library only: the app and its settings (and secrets) must never be
+imported here.
+"""
+
+import builtins
+import fcntl
+import gc
+import json
+import os
+import re
+import resource
+import select
+import shutil
+import signal
+import sys
+import tempfile
+import time
+import traceback
+
+STDERR_TAIL_BYTES = 8192
+# Exit status of a run whose sandbox could not be set up
+SETUP_FAILED = 125
+# On the host's /tmp, before ours is mounted over it
+UID_LOCK_DIR = "/tmp/code-runner-uids"
+# Workers' private /tmp: the working directories of their runs
+SCRATCH_DIR = "/tmp"
+SCRATCH_OPTIONS = b"mode=0711,size=64m,nr_inodes=4096"
+
+# mount(2) flags, not exposed by the os module
+MS_RDONLY = 0x1
+MS_NOSUID = 0x2
+MS_NODEV = 0x4
+MS_NOEXEC = 0x8
+MS_REMOUNT = 0x20
+MS_BIND = 0x1000
+MS_REC = 0x4000
+MS_PRIVATE = 0x40000
+
+# Modules interview solutions typically import, loaded once before forking.
+# ctypes stays out: a run using it must go through the audit hook.
+WARM_MODULES = (
+    "bisect",
+    "collections",
+    "dataclasses",
+    "decimal",
+    "fractions",
+    "functools",
+    "heapq",
+    "itertools",
+    "json",
+    "math",
+    "operator",
+    "random",
+    "re",
+    "statistics",
+    "string",
+    "typing",
+)
+
+DENIED_EVENTS = (
+    "ctypes.",
+    "os.exec",
+    "os.fork",
+    "os.kill",
+    "os.killpg",
+    "os.posix_spawn",
+    "os.spawn",
+    "os.system",
+    "pty.",
+    "signal.pthread_kill",
+    "socket.",
+    "subprocess.",
+)
+
+
+def _deny(event: str, args: tuple) -> None:
+    if event.startswith(DENIED_EVENTS):
+        raise PermissionError(f"{event} is not allowed in the sandbox")
+
+
+def _send(message: dict) -> None:
+    sys.stdout.buffer.write(json.dumps(message).encode() + b"\n")
+    sys.stdout.buffer.flush()
+
+
+def claim_uid(base: int, count: int) -> int:
+    """Lock the first free uid of ``base`` .. ``base + count - 1``.
+
+    The lock lives as long as this process keeps the file open; forked runs
+    close their copy, so it is released when the worker dies.
+    """
+    if base < 1:
+        raise ValueError("Sandbox uids must not include root")
+    os.makedirs(UID_LOCK_DIR, mode=0o700, exist_ok=True)
+    for uid in range(base, base + count):
+        path = os.path.join(UID_LOCK_DIR, str(uid))
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            continue
+        return uid
+    raise RuntimeError(f"All {count} sandbox uids from {base} are in use")
+
+
+def kill_strays(uid: int) -> None:
+    """SIGKILL runs left behind under ``uid`` by a worker that died mid-run."""
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/status") as f:
+                uids = next(line for line in f if line.startswith("Uid:")).split()
+            if int(uids[1]) == uid:
+                os.kill(int(entry), signal.SIGKILL)
+        except (OSError, StopIteration):
+            continue
+
+
+def _drop_privileges(uid: int) -> None:
+    os.setgroups([])
+    os.setgid(uid)
+    os.setuid(uid)
+
+
+def probe_privilege_drop(uid: int) -> None:
+    """Raise unless a forked run can switch to ``uid``."""
+    pid = os.fork()
+    if pid == 0:
+        try:
+            _drop_privileges(uid)
+        except BaseException:
+            os._exit(1)
+        os._exit(0)
+    _, status = os.waitpid(pid, 0)
+    if os.waitstatus_to_exitcode(status) != 0:
+        raise PermissionError(f"Cannot switch to uid {uid}; the app must run as root")
+
+
+def _unescape(path: str) -> str:
+    # mountinfo escapes space, tab, newline and backslash as octal
+    return re.sub(r"\\([0-7]{3})", lambda m: chr(int(m[1], 8)), path)
+
+
+def isolate(hidden: list[str]) -> None:
+    """Move this process, and so every run it forks, into new namespaces.
+
+    No network interfaces, every mount read-only, the ``hidden`` directories
+    and files (the app's tree and env file) masked by empty ones, and a
+    fresh, size-capped tmpfs on /tmp as the one writable place.
+    """
+    stdlib = os.path.dirname(os.__file__)
+    for path in hidden:
+        if os.path.commonpath([path, stdlib]) == path:
+            raise RuntimeError(f"Cannot hide {path}: the standard library is in it")
+
+    import ctypes
+
+    libc = ctypes.CDLL(None, use_errno=True)
+    libc.mount.argtypes = (
+        ctypes.c_char_p,
+        ctypes.c_char_p,
+        ctypes.c_char_p,
+        ctypes.c_ulong,
+        ctypes.c_char_p,
+    )
+
+    def mount(source, target: str, fstype, flags: int, data=None) -> None:
+        if libc.mount(source, target.encode(), fstype, flags, data) != 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"mount {target}: {os.strerror(errno)}")
+
+    os.unshare(os.CLONE_NEWNS | os.CLONE_NEWNET)
+    # Keep what follows from propagating back to the host's mounts
+    mount(None, "/", None, MS_REC | MS_PRIVATE)
+    with open("/proc/self/mountinfo") as f:
+        targets = [_unescape(line.split()[4]) for line in f]
+    for target in targets:
+        kept = os.statvfs(target).f_flag & (MS_NOSUID | MS_NODEV | MS_NOEXEC)
+        mount(None, target, None, MS_REMOUNT | MS_BIND | MS_RDONLY | kept)
+    masked = MS_RDONLY | MS_NOSUID | MS_NODEV | MS_NOEXEC
+    for path in sorted(hidden):
+        if not os.path.lexists(path):
+            # Already under a masked directory, or never there
+            continue
+        if os.path.isdir(path):
+            mount(b"tmpfs", path, b"tmpfs", masked, b"mode=0755,size=4k")
+        else:
+            mount(b"/dev/null", path, None, MS_BIND)
+            mount(None, path, None, MS_REMOUNT | MS_BIND | masked)
+    mount(b"tmpfs", SCRATCH_DIR, b"tmpfs", MS_NOSUID | MS_NODEV, SCRATCH_OPTIONS)
+
+
+def _apply_limits(limits: dict) -> None:
+    cpu = limits["cpu_seconds"]
+    # SIGXCPU at the soft limit, SIGKILL a second later if it is ignored
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu + 1))
+    resource.setrlimit(resource.RLIMIT_AS, (limits["memory_bytes"],) * 2)
+    resource.setrlimit(resource.RLIMIT_FSIZE, (limits["output_bytes"] + 1,) * 2)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (32, 32))
+    resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+
+
+def _run_child(code, workdir: str, limits: dict, uid: int) -> None:
+    """Body of a forked run; never returns."""
+    try:
+        os.setsid()
+        os.chdir(workdir)
+        for fd, name, flags in (
+            (0, "stdin", os.O_RDONLY),
+            (1, "stdout", os.O_WRONLY | os.O_CREAT | os.O_TRUNC),
+            (2, "stderr", os.O_WRONLY | os.O_CREAT | os.O_TRUNC),
+        ):
+            opened = os.open(name, flags, 0o600)
+            os.dup2(opened, fd)
+            os.close(opened)
+        # Drops the pipes to the app and anything else inherited
+        os.closerange(3, resource.getrlimit(resource.RLIMIT_NOFILE)[0])
+        _apply_limits(limits)
+        _drop_privileges(uid)
+        os.umask(0o077)
+        os.environ.clear()
+        os.environ.update({"HOME": workdir, "TMPDIR": workdir, "LANG": "C.UTF-8"})
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        sys.stdin = open(0, encoding="utf-8", errors="replace", closefd=False)
+        sys.stdout = open(1, "w", encoding="utf-8", closefd=False)
+        sys.stderr = open(2, "w", encoding="utf-8", closefd=False)
+        sys.argv = ["main.py"]
+        sys.addaudithook(_deny)
+    except BaseException:
+        os._exit(SETUP_FAILED)
+
+    status = 0
+    try:
+        exec(code, {"__name__": "__main__", "__builtins__": builtins})
+    except SystemExit as exc:
+        if exc.code is None:
+            status = 0
+        elif isinstance(exc.code, int):
+            status = exc.code & 0xFF
+        else:
+            print(exc.code, file=sys.stderr)
+            status = 1
+    except BaseException as exc:
+        # Start the traceback at the submission, not at this function
+        traceback.print_exception(exc.with_traceback(exc.__traceback__.tb_next))
+        status = 1
+    for stream in (sys.stdout, sys.stderr):
+        try:
+            stream.flush()
+        except BaseException:
+            status = status or 1
+    os._exit(status)
+
+
+def _wait(pid: int, timeout: float) -> tuple[int, resource.struct_rusage, bool]:
+    """Reap ``pid``, killing it after ``timeout`` seconds of wall time."""
+    pidfd = os.pidfd_open(pid)
+    try:
+        ready, _, _ = select.select([pidfd], [], [], timeout)
+    finally:
+        os.close(pidfd)
+    timed_out = not ready
+    if timed_out:
+        os.kill(pid, signal.SIGKILL)
+    _, status, usage = os.wait4(pid, 0)
+    return status, usage, timed_out
+
+
+def _read_head(path: str, limit: int) -> tuple[str, bool]:
+    with open(path, "rb") as f:
+        data = f.read(limit + 1)
+    return data[:limit].decode("utf-8", "replace"), len(data) > limit
+
+
+def _read_tail(path: str, limit: int) -> str:
+    with open(path, "rb") as f:
+        f.seek(max(0, os.fstat(f.fileno()).st_size - limit))
+        return f.read().decode("utf-8", "replace")
+
+
+def _classify(
+    status: int, timed_out: bool, cpu: float, stderr: str, truncated: bool, limits: dict
+) -> str:
+    if timed_out:
+        return "time_limit"
+    if os.WIFSIGNALED(status):
+        signum = os.WTERMSIG(status)
+        if signum == signal.SIGXCPU or (
+            signum == signal.SIGKILL and cpu >= limits["cpu_seconds"]
+        ):
+            return "time_limit"
+        return "runtime_error"
+    exit_code = os.WEXITSTATUS(status)
+    if exit_code == SETUP_FAILED:
+        return "internal_error"
+    if truncated:
+        return "output_limit"
+    if exit_code == 0:
+        return "ok"
+    if "MemoryError" in stderr:
+        return "memory_limit"
+    return "runtime_error"
+
+
+def run_case(code, stdin: str, limits: dict, uid: int) -> dict:
+    workdir = tempfile.mkdtemp(prefix="run-", dir=SCRATCH_DIR)
+    try:
+        with open(os.path.join(workdir, "stdin"), "w", encoding="utf-8") as f:
+            f.write(stdin)
+        os.chown(workdir, uid, uid)
+
+        started = time.monotonic()
+        pid = os.fork()
+        if pid == 0:
+            _run_child(code, workdir, limits, uid)
+        status, usage, timed_out = _wait(pid, limits["wall_seconds"])
+        wall = time.monotonic() - started
+
+        cpu = usage.ru_utime + usage.ru_stime
+        stdout, truncated = _read_head(
+            os.path.join(workdir, "stdout"), limits["output_bytes"]
+        )
+        stderr = _read_tail(os.path.join(workdir, "stderr"), STDERR_TAIL_BYTES)
+        return {
+            "status": _classify(status, timed_out, cpu, stderr, truncated, limits),
+            "exit_code": os.waitstatus_to_exitcode(status),
+            "stdout": stdout,
+            "stderr": stderr,
+            "truncated": truncated,
+            "wall_ms": round(wall * 1000, 2),
+            "cpu_ms": round(cpu * 1000, 2),
+            "memory_kb": usage.ru_maxrss,
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def run_job(job: dict, uid: int) -> None:
+    try:
+        code = compile(job["code"], "main.py", "exec")
+    except (SyntaxError, ValueError) as exc:
+        detail = "".join(traceback.format_exception_only(exc))
+        _send({"compile_error": detail})
+    else:
+        for index, stdin in enumerate(job["inputs"]):
+            _send({"index": index, **run_case(code, stdin, job["limits"], uid)})
+    _send({"done": True})
+
+
+def main() -> None:
+    # The app owns our lifetime: it closes stdin or kills us, never Ctrl-C
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        uid = claim_uid(int(sys.argv[1]), int(sys.argv[2]))
+        kill_strays(uid)
+        probe_privilege_drop(uid)
+        isolate(sys.argv[3:])
+    except Exception as exc:
+        # Better no code runs at all than runs that aren't isolated
+        _send({"error": f"{type(exc).__name__}: {exc}"})
+        return
+    for name in WARM_MODULES:
+        __import__(name)
+    # Keep the warm heap out of collections so forks don't copy it on write
+    gc.collect()
+    gc.freeze()
+    _send({"ready": True, "pid": os.getpid(), "uid": uid})
+    for line in sys.stdin.buffer:
+        run_job(json.loads(line), uid)
+
+
+if __name__ == "__main__":
+    main()
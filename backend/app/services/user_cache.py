@@ -0,0 +1,106 @@
+import json
+import logging
+from typing import Any
+
+from redis.exceptions import RedisError
+
+from app.core import metrics
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.redis import get_redis
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+# Never copy password hashes into the cache tiers
+_CACHED_COLUMNS = [
+    column.key for column in User.__table__.columns if column.key != "hashed_password"
+]
+
+
+class UserCache:
+    """Two-tier cache of user records keyed by id.
+
+    The first tier is a per-process TTL+LRU cache; the optional second tier is
+    Redis, shared by every worker. Entries are rebuilt as detached ``User``
+    instances, so callers must not use them for writes. Anything that changes a
+    user row has to call ``invalidate`` after committing. Other workers' local
+    tiers may serve a stale row for up to USER_CACHE_TTL_SECONDS.
+    """
+
+    def __init__(self, max_size: int, ttl: int, redis_ttl: int):
+        self.local = TTLCache(max_size=max_size, ttl=ttl)
+        self.redis_ttl = redis_ttl
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(user_id: int) -> str:
+        return f"user:{user_id}"
+
+    async def get(self, user_id: int) -> User | None:
+        data = self.local.get(user_id)
+        if data is not None:
+            self.local_hits += 1
+            metrics.USER_CACHE_LOOKUPS.inc(result="local_hit")
+            return User(**data)
+
+        redis = get_redis()
+        if redis is not None:
+            try:
+                raw = await redis.get(self._key(user_id))
+            except RedisError:
+                logger.warning("User cache: Redis read failed", exc_info=True)
+                raw = None
+            if raw is not None:
+                self.redis_hits += 1
+                metrics.USER_CACHE_LOOKUPS.inc(result="redis_hit")
+                data = json.loads(raw)
+                self.local.set(user_id, data)
+                return User(**data)
+
+        self.misses += 1
+        metrics.USER_CACHE_LOOKUPS.inc(result="miss")
+        return None
+
+    async def set(self, user: User) -> None:
+        data: dict[str, Any] = {key: getattr(user, key) for key in _CACHED_COLUMNS}
+        self.local.set(user.id, data)
+
+        redis = get_redis()
+        if redis is not None:
+            try:
+                await redis.set(self._key(user.id), json.dumps(data), ex=self.redis_ttl)
+            except RedisError:
+                logger.warning("User cache: Redis write failed", exc_info=True)
+
+    async def invalidate(self, user_id: int) -> None:
+        self.local.delete(user_id)
+
+        redis = get_redis()
+        if redis is not None:
+            try:
+                await redis.delete(self._key(user_id))
+            except RedisError:
+                logger.warning("User cache: Redis invalidation failed", exc_info=True)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self.local),
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+        }
+
+
+def _collect_user_cache_metrics() -> None:
+    metrics.USER_CACHE_ENTRIES.set(len(user_cache.local))
+
+
+user_cache = UserCache(
+    max_size=settings.USER_CACHE_MAX_SIZE,
+    ttl=settings.USER_CACHE_TTL_SECONDS,
+    redis_ttl=settings.USER_CACHE_REDIS_TTL_SECONDS,
+)
+metrics.register_collector(_collect_user_cache_metrics)
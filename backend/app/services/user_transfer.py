@@ -0,0 +1,385 @@
+import asyncio
+import csv
+import json
+import logging
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import AsyncIterable, AsyncIterator, Literal, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.sql.expression import ColumnElement
+
+from app.core.config import settings
+from app.core.security import get_hash_policy, get_password_hash
+from app.db.session import async_engine, read_session
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+TransferFormat = Literal["csv", "ndjson"]
+
+# Columns accepted on import and written on export (besides the id)
+COLUMNS = [
+    "email",
+    "full_name",
+    "hashed_password",
+    "is_active",
+    "is_superuser",
+    "provider",
+    "provider_id",
+]
+EXPORT_COLUMNS = ["id"] + [c for c in COLUMNS if c != "hashed_password"]
+
+_PASSWORD_HASH = re.compile(
+    r"^(\$2[aby]\$\d{2}\$[./A-Za-z0-9]{53}|\$argon2id\$v=\d+\$m=\d+,t=\d+,p=\d+\$\S+)$"
+)
+_TRUE = {"1", "true", "t", "yes", "y"}
+
+_STAGING_TABLE = """
+CREATE TEMP TABLE user_import (
+    email varchar NOT NULL,
+    full_name varchar,
+    hashed_password varchar,
+    is_active boolean,
+    is_superuser boolean,
+    provider varchar,
+    provider_id varchar
+) ON COMMIT DROP
+"""
+_MERGE_STAGING = f"""
+INSERT INTO "user" ({", ".join(COLUMNS)})
+SELECT {", ".join(COLUMNS)} FROM user_import
+ON CONFLICT DO NOTHING
+"""
+
+
+class UserTransferError(Exception):
+    """Raised when a bulk import/export can't run on the configured database."""
+
+
+class InvalidEncodingError(ValueError):
+    """Raised when an import body isn't UTF-8; names the offending line."""
+
+
+@dataclass
+class TransferReport:
+    rows: int = 0
+    inserted: int = 0
+    skipped: int = 0
+    invalid: int = 0
+    seconds: float = 0.0
+    errors: list[str] = field(default_factory=list)
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def to_dict(self) -> dict:
+        return asdict(self) | {"rows_per_sec": round(self.rows_per_sec, 1)}
+
+
+_hash_pool: ProcessPoolExecutor | None = None
+
+
+def _get_hash_pool() -> ProcessPoolExecutor:
+    # Separate from the request-path hashing pool so imports can't starve logins
+    global _hash_pool
+    if _hash_pool is None:
+        _hash_pool = ProcessPoolExecutor(
+            max_workers=settings.USER_IMPORT_HASH_WORKERS or os.cpu_count()
+        )
+    return _hash_pool
+
+
+def shutdown_hash_pool() -> None:
+    global _hash_pool
+    if _hash_pool is not None:
+        _hash_pool.shutdown(wait=False, cancel_futures=True)
+        _hash_pool = None
+
+
+def require_postgres() -> None:
+    if async_engine.dialect.name != "postgresql":
+        raise UserTransferError("Bulk user import/export requires PostgreSQL (COPY)")
+
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    """Split a byte stream into decoded lines without buffering the whole body.
+
+    Raises ``InvalidEncodingError`` at the first line that isn't UTF-8.
+    """
+    buffer = b""
+    number = 0
+
+    def decode(line: bytes) -> str:
+        try:
+            return line.decode("utf-8").rstrip("\r")
+        except UnicodeDecodeError as exc:
+            raise InvalidEncodingError(
+                f"line {number}: not valid UTF-8 ({exc.reason} at byte {exc.start})"
+            ) from None
+
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            number += 1
+            yield decode(line)
+    if buffer:
+        number += 1
+        yield decode(buffer)
+
+
+class _LineFeed:
+    """Lines for one long-lived ``csv.reader``, topped up between records."""
+
+    def __init__(self):
+        self.lines: deque[str] = deque()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        if not self.lines:
+            raise StopIteration
+        return self.lines.popleft()
+
+
+async def _iter_ndjson(lines: AsyncIterable[str]) -> AsyncIterator[dict | ValueError]:
+    async for line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as exc:
+            yield ValueError(f"invalid JSON: {exc}")
+
+
+async def _iter_csv(lines: AsyncIterable[str]) -> AsyncIterator[dict | ValueError]:
+    # One reader over the whole stream. A record is handed to it only once
+    # its quotes balance, so quoted fields may span lines.
+    feed = _LineFeed()
+    reader = csv.reader(feed)
+    header: list[str] | None = None
+    quotes = 0
+    async for line in lines:
+        if not feed.lines and not line.strip():
+            continue
+        feed.lines.append(line + "\n")
+        quotes += line.count('"')
+        if quotes % 2:
+            continue
+        quotes = 0
+        try:
+            row = next(reader)
+        except csv.Error as exc:
+            feed.lines.clear()
+            yield ValueError(f"invalid CSV: {exc}")
+            continue
+        if header is None:
+            header = row
+        else:
+            yield dict(zip(header, row))
+    if feed.lines:
+        yield ValueError("invalid CSV: unterminated quoted field")
+
+
+def _iter_records(
+    lines: AsyncIterable[str], fmt: TransferFormat
+) -> AsyncIterator[dict | ValueError]:
+    """Parsed input records; a row that doesn't parse comes out as a ValueError.
+
+    The importer counts those as invalid rows, like rows failing validation,
+    instead of aborting an import whose earlier batches already committed.
+    """
+    return _iter_ndjson(lines) if fmt == "ndjson" else _iter_csv(lines)
+
+
+def _flag(value, default: bool) -> bool:
+    if value is None or value == "":
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in _TRUE
+
+
+def _to_row(record: dict) -> tuple[list, str | None]:
+    """Map an input record to staging columns plus a password still to hash."""
+    email = (record.get("email") or "").strip()
+    if not email or "@" not in email:
+        raise ValueError("missing or invalid email")
+
+    hashed = record.get("hashed_password") or None
+    password = record.get("password") or None
+    if hashed is not None and not _PASSWORD_HASH.match(hashed):
+        raise ValueError("hashed_password is not a bcrypt or argon2id hash")
+
+    row = [
+        email,
+        record.get("full_name") or None,
+        hashed,
+        _flag(record.get("is_active"), True),
+        _flag(record.get("is_superuser"), False),
+        record.get("provider") or "email",
+        record.get("provider_id") or None,
+    ]
+    return row, None if hashed else password
+
+
+async def _hash_missing(batch: list[tuple[list, str | None]]) -> list[tuple]:
+    loop = asyncio.get_running_loop()
+    pool = _get_hash_pool()
+    policy = get_hash_policy()
+    pending = [(row, password) for row, password in batch if password]
+    hashes = await asyncio.gather(
+        *(loop.run_in_executor(pool, get_password_hash, p, policy) for _, p in pending)
+    )
+    for (row, _), hashed in zip(pending, hashes):
+        row[2] = hashed
+    return [tuple(row) for row, _ in batch]
+
+
+async def import_users(
+    lines: AsyncIterable[str],
+    fmt: TransferFormat = "csv",
+    batch_size: int | None = None,
+) -> TransferReport:
+    """Stream users into the ``user`` table with COPY in bounded batches.
+
+    Each batch is COPY'd into a transaction-scoped staging table and merged
+    with ``ON CONFLICT DO NOTHING``, so existing emails/identities are counted
+    as skipped rather than failing the batch. Plain ``password`` values are
+    hashed under the current policy across a process pool; ``hashed_password``
+    values that are already bcrypt/argon2id hashes are stored as-is.
+    """
+    require_postgres()
+    batch_size = batch_size or settings.USER_IMPORT_BATCH_SIZE
+    report = TransferReport()
+    started = time.perf_counter()
+
+    async with async_engine.connect() as conn:
+        raw = (await conn.get_raw_connection()).driver_connection
+
+        async def flush(batch: list[tuple[list, str | None]]) -> None:
+            records = await _hash_missing(batch)
+            async with raw.transaction():
+                await raw.execute(_STAGING_TABLE)
+                await raw.copy_records_to_table(
+                    "user_import", records=records, columns=COLUMNS
+                )
+                status = await raw.execute(_MERGE_STAGING)
+            inserted = int(status.rsplit(" ", 1)[-1])
+            report.inserted += inserted
+            report.skipped += len(records) - inserted
+
+        batch: list[tuple[list, str | None]] = []
+        async for record in _iter_records(lines, fmt):
+            report.rows += 1
+            try:
+                if isinstance(record, ValueError):
+                    raise record
+                batch.append(_to_row(record))
+            except (ValueError, AttributeError) as exc:
+                report.invalid += 1
+                if len(report.errors) < 20:
+                    report.errors.append(f"row {report.rows}: {exc}")
+                continue
+            if len(batch) >= batch_size:
+                await flush(batch)
+                batch = []
+        if batch:
+            await flush(batch)
+
+    report.seconds = time.perf_counter() - started
+    logger.info(
+        "Imported %d/%d users in %.2fs (%.0f rows/s)",
+        report.inserted,
+        report.rows,
+        report.seconds,
+        report.rows_per_sec,
+    )
+    return report
+
+
+async def _export_csv(report: TransferReport) -> AsyncIterator[bytes]:
+    # COPY output is pushed to us; a bounded queue applies backpressure to it
+    queue: asyncio.Queue[bytes | None] = asyncio.Queue(maxsize=16)
+    query = f'SELECT {", ".join(EXPORT_COLUMNS)} FROM "user" ORDER BY id'
+
+    async def copy_out() -> str:
+        async with async_engine.connect() as conn:
+            raw = (await conn.get_raw_connection()).driver_connection
+            try:
+                return await raw.copy_from_query(
+                    query, output=queue.put, format="csv", header=True
+                )
+            finally:
+                await queue.put(None)
+
+    task = asyncio.create_task(copy_out())
+    try:
+        while (chunk := await queue.get()) is not None:
+            yield chunk
+        status = await task
+    finally:
+        task.cancel()
+    # "COPY <rows>": counting newlines would include those inside quoted fields
+    report.rows = int(status.rsplit(" ", 1)[-1])
+
+
+async def _export_ndjson(
+    report: TransferReport, criteria: Sequence[ColumnElement[bool]]
+) -> AsyncIterator[bytes]:
+    columns = [getattr(User, name) for name in EXPORT_COLUMNS]
+    stmt = (
+        select(*columns)
+        .where(*criteria)
+        .order_by(User.id)
+        .execution_options(yield_per=1000)
+    )
+    async with read_session() as db:
+        # Server-side cursor: rows arrive in yield_per sized chunks
+        result = await db.stream(stmt)
+        async for partition in result.partitions():
+            report.rows += len(partition)
+            yield b"".join(
+                json.dumps(row._asdict()).encode("utf-8") + b"\n" for row in partition
+            )
+
+
+async def export_users(
+    fmt: TransferFormat = "csv",
+    report: TransferReport | None = None,
+    criteria: Sequence[ColumnElement[bool]] = (),
+) -> AsyncIterator[bytes]:
+    """Stream users (without password hashes) as CSV or NDJSON.
+
+    CSV uses ``COPY ... TO STDOUT``; NDJSON reads through a server-side cursor,
+    on a read replica when configured, and can be narrowed with ``criteria``
+    (see ``crud.user_filters``). Neither holds more than one chunk of rows in
+    memory. Pass ``report`` to read the row count and throughput once the
+    stream is exhausted.
+    """
+    if fmt == "csv":
+        if criteria:
+            raise UserTransferError("Filtered exports are only available as NDJSON")
+        require_postgres()
+    if report is None:
+        report = TransferReport()
+    started = time.perf_counter()
+    stream = (
+        _export_csv(report) if fmt == "csv" else _export_ndjson(report, criteria)
+    )
+    async for chunk in stream:
+        yield chunk
+    report.seconds = time.perf_counter() - started
+    logger.info(
+        "Exported %d users in %.2fs (%.0f rows/s)",
+        report.rows,
+        report.seconds,
+        report.rows_per_sec,
+    )
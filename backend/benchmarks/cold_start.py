@@ -0,0 +1,97 @@
+"""First-request latency of a fresh worker, with and without startup warm-up.
+
+Each mode runs in a new interpreter: import the app, run its lifespan, then
+time the very first ``GET /auth/me`` against the steady-state median of the
+requests that follow. The app's own cold-start report (import and warm-up
+phase timings) is printed alongside.
+
+    python -m benchmarks.cold_start --requests 200
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.common import configure_env, percentile
+
+
+def child(total: int) -> None:
+    import asyncio
+
+    import httpx
+
+    from app.core import security
+    from app.core.config import settings
+    from app.db.base import Base
+    from app.db.session import SessionLocal, engine
+    from app.main import app
+    from app.models.user import User
+    from app.services.user_cache import user_cache
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        user = db.query(User).filter(User.email == "cold@example.com").first()
+        if user is None:
+            user = User(email="cold@example.com", full_name="Cold", hashed_password="")
+            db.add(user)
+            db.commit()
+        user_id = user.id
+    # Seeding used the sync engine only; the async pool is still cold here
+
+    async def run() -> dict:
+        async with app.router.lifespan_context(app):
+            token = security.create_access_token(subject=user_id)
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app),
+                base_url="http://bench",
+                cookies={"access_token": token},
+            ) as client:
+                latencies = []
+                for _ in range(total + 1):
+                    started = time.perf_counter()
+                    response = await client.get(f"{settings.API_V1_STR}/auth/me")
+                    response.raise_for_status()
+                    latencies.append(time.perf_counter() - started)
+                    # Measure the DB path every time, not the user cache
+                    await user_cache.invalidate(user_id)
+        return {
+            "first_ms": round(latencies[0] * 1000, 3),
+            "steady_p50_ms": round(percentile(latencies[1:], 50) * 1000, 3),
+            "report": app.state.startup_report,
+        }
+
+    print(json.dumps(asyncio.run(run())))
+
+
+def main(total: int) -> None:
+    configure_env()
+    for warmup in (False, True):
+        env = {**os.environ, "STARTUP_WARMUP": str(warmup).lower()}
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.cold_start", "--child", str(total)],
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        label = "with warm-up" if warmup else "without warm-up"
+        print(
+            f"{label:<18} first request {result['first_ms']:>8.2f} ms   "
+            f"steady p50 {result['steady_p50_ms']:>6.2f} ms"
+        )
+        print(f"{'':<18} {json.dumps(result['report'])}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child is not None:
+        child(args.child)
+    else:
+        main(args.requests)
@@ -0,0 +1,177 @@
+"""Shared helpers for the backend benchmarks.
+
+Benchmarks are plain scripts run from the ``backend`` directory, e.g.
+``python -m benchmarks.db_modes``. They default to a throwaway SQLite database
+so they work without Postgres; point ``DATABASE_URL`` at a real database for
+numbers that reflect production.
+"""
+
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+
+def configure_env() -> None:
+    """Fill in the settings the app needs so benchmarks run with no .env file."""
+    os.environ.setdefault("POSTGRES_USER", "bench")
+    os.environ.setdefault("POSTGRES_PASSWORD", "bench")
+    os.environ.setdefault("POSTGRES_DB", "bench")
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+    if "DATABASE_URL" not in os.environ:
+        path = os.path.join(tempfile.mkdtemp(prefix="bench-"), "bench.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of ``values`` (``pct`` in 0-100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+@dataclass
+class BenchResult:
+    name: str
+    elapsed: float = 0.0
+    errors: int = 0
+    latencies: list[float] = field(default_factory=list)
+
+    @property
+    def requests(self) -> int:
+        return len(self.latencies) + self.errors
+
+    @property
+    def throughput(self) -> float:
+        return self.requests / self.elapsed if self.elapsed else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "requests": self.requests,
+            "errors": self.errors,
+            "throughput": round(self.throughput, 2),
+            "p50_ms": round(percentile(self.latencies, 50) * 1000, 3),
+            "p95_ms": round(percentile(self.latencies, 95) * 1000, 3),
+            "p99_ms": round(percentile(self.latencies, 99) * 1000, 3),
+        }
+
+
+async def run_load(
+    name: str,
+    send: Callable[[], Awaitable[bool]],
+    total: int,
+    concurrency: int,
+) -> BenchResult:
+    """Call ``send`` ``total`` times from ``concurrency`` concurrent workers.
+
+    ``send`` returns whether the call succeeded; failures and exceptions count
+    as errors and are excluded from the latency distribution.
+    """
+    result = BenchResult(name=name)
+    remaining = iter(range(total))
+
+    async def worker() -> None:
+        for _ in remaining:
+            started = time.perf_counter()
+            try:
+                ok = await send()
+            except Exception:
+                ok = False
+            if ok:
+                result.latencies.append(time.perf_counter() - started)
+            else:
+                result.errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def print_results(results: list[BenchResult]) -> None:
+    header = f"{'scenario':<32}{'req':>8}{'err':>6}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        row = result.to_dict()
+        print(
+            f"{row['name']:<32}{row['requests']:>8}{row['errors']:>6}"
+            f"{row['throughput']:>10.1f}{row['p50_ms']:>10.2f}"
+            f"{row['p95_ms']:>10.2f}{row['p99_ms']:>10.2f}"
+        )
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(path: str, results: list[BenchResult], **meta) -> dict:
+    """Write results plus run metadata to ``path`` as JSON and return the document."""
+    document = {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            **meta,
+        },
+        "results": [result.to_dict() for result in results],
+    }
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2)
+    return document
+
+
+def compare_to_baseline(
+    current: dict,
+    baseline: dict,
+    max_throughput_drop: float,
+    max_latency_increase: float,
+) -> list[str]:
+    """Return a description of every scenario that regressed past the thresholds.
+
+    Thresholds are percentages: a scenario regresses when its throughput drops
+    by more than ``max_throughput_drop`` or its p95/p99 grows by more than
+    ``max_latency_increase`` relative to the baseline run.
+    """
+    previous = {row["name"]: row for row in baseline["results"]}
+    regressions = []
+    for row in current["results"]:
+        base = previous.get(row["name"])
+        if base is None:
+            continue
+        if base["throughput"] and row["throughput"] < base["throughput"] * (
+            1 - max_throughput_drop / 100
+        ):
+            regressions.append(
+                f"{row['name']}: throughput {base['throughput']:.1f} -> "
+                f"{row['throughput']:.1f} req/s"
+            )
+        for key in ("p95_ms", "p99_ms"):
+            if base[key] and row[key] > base[key] * (1 + max_latency_increase / 100):
+                regressions.append(
+                    f"{row['name']}: {key} {base[key]:.2f} -> {row[key]:.2f}"
+                )
+        if row["errors"] > base["errors"]:
+            regressions.append(
+                f"{row['name']}: errors {base['errors']} -> {row['errors']}"
+            )
+    return regressions
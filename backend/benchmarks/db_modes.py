@@ -0,0 +1,99 @@
+"""Compare sync and async DB modes under concurrent ``GET /auth/me`` load.
+
+The sync scenario mounts the previous implementation (blocking ``Session`` in
+a ``def`` dependency, served from Starlette's threadpool); the async scenario
+drives the real application.
+
+    python -m benchmarks.db_modes --requests 2000 --concurrency 100
+"""
+
+import argparse
+import asyncio
+
+from benchmarks.common import configure_env, print_results, run_load
+
+configure_env()
+
+import httpx  # noqa: E402
+from fastapi import Cookie, Depends, FastAPI, HTTPException  # noqa: E402
+from jose import jwt  # noqa: E402
+
+from app import schemas  # noqa: E402
+from app.core import security  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.db.base import Base  # noqa: E402
+from app.db.session import SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.user import User  # noqa: E402
+
+ME_URL = f"{settings.API_V1_STR}/auth/me"
+
+
+def build_sync_app() -> FastAPI:
+    sync_app = FastAPI()
+
+    def get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def get_current_user(db=Depends(get_db), access_token: str = Cookie(None)):
+        payload = jwt.decode(
+            access_token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+        )
+        user = db.query(User).filter(User.id == int(payload["sub"])).first()
+        if user is None:
+            raise HTTPException(status_code=401)
+        return user
+
+    @sync_app.get(ME_URL, response_model=schemas.User)
+    def read_users_me(current_user=Depends(get_current_user)):
+        return current_user
+
+    return sync_app
+
+
+def seed_user() -> int:
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        user = db.query(User).filter(User.email == "bench@example.com").first()
+        if user is None:
+            user = User(email="bench@example.com", full_name="Bench", hashed_password="")
+            db.add(user)
+            db.commit()
+        return user.id
+
+
+async def bench(target: FastAPI, name: str, token: str, total: int, concurrency: int):
+    transport = httpx.ASGITransport(app=target)
+    async with httpx.AsyncClient(
+        transport=transport,
+        base_url="http://bench",
+        cookies={"access_token": token},
+    ) as client:
+
+        async def send() -> bool:
+            response = await client.get(ME_URL)
+            return response.status_code == 200
+
+        await run_load(f"{name} (warm-up)", send, min(total, 50), concurrency)
+        return await run_load(name, send, total, concurrency)
+
+
+async def main(total: int, concurrency: int) -> None:
+    token = security.create_access_token(subject=seed_user())
+    results = [
+        await bench(build_sync_app(), "sync  GET /auth/me", token, total, concurrency),
+        await bench(app, "async GET /auth/me", token, total, concurrency),
+    ]
+    print_results(results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
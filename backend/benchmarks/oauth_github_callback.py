@@ -0,0 +1,86 @@
+"""GitHub OAuth callback latency against a local stub GitHub API.
+
+"before" replays the previous provider calls: profile, a second identical
+profile "revalidation", then emails, one after another and each on a fresh
+client. "after" is the current pooled, concurrent fetch.
+
+    python -m benchmarks.oauth_github_callback --latency-ms 40
+"""
+
+import argparse
+import asyncio
+import os
+
+from benchmarks.common import configure_env, print_results, run_load
+from benchmarks.stubs import StubServer, build_github_stub
+
+os.environ.setdefault("GITHUB_CLIENT_ID", "bench-client")
+os.environ.setdefault("GITHUB_CLIENT_SECRET", "bench-secret")
+configure_env()
+
+import httpx  # noqa: E402
+
+from app.api.v1.endpoints import oauth as oauth_endpoints  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.core.oauth import get_oauth_client  # noqa: E402
+from app.db.base import Base  # noqa: E402
+from app.db.session import engine  # noqa: E402
+from app.main import app  # noqa: E402
+
+CALLBACK_URL = f"{settings.API_V1_STR}/auth/login/github/callback?code=bench&state=bench"
+
+
+async def legacy_fetch_github_identity(token: dict):
+    headers = {"Authorization": f"Bearer {token['access_token']}"}
+    url = settings.GITHUB_API_URL
+    async with httpx.AsyncClient() as client:
+        resp = await client.get(f"{url}/user", headers=headers)
+    async with httpx.AsyncClient() as client:
+        await client.get(f"{url}/user", headers=headers)
+    async with httpx.AsyncClient() as client:
+        emails_resp = await client.get(f"{url}/user/emails", headers=headers)
+    return resp, emails_resp
+
+
+async def fake_authorize_access_token(request, **kwargs):
+    return {"access_token": "bench-token", "token_type": "bearer"}
+
+
+async def bench(name: str, total: int, concurrency: int):
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://bench"
+    ) as client:
+
+        async def send() -> bool:
+            response = await client.get(CALLBACK_URL)
+            location = response.headers.get("location", "")
+            return response.status_code == 307 and "error=" not in location
+
+        # First sign-in creates the user; run it alone so later ones are updates
+        await send()
+        await run_load(f"{name} (warm-up)", send, min(total, 20), concurrency)
+        return await run_load(name, send, total, concurrency)
+
+
+async def main(total: int, concurrency: int) -> None:
+    Base.metadata.create_all(bind=engine)
+    get_oauth_client("github").authorize_access_token = fake_authorize_access_token
+
+    current = oauth_endpoints.fetch_github_identity
+    oauth_endpoints.fetch_github_identity = legacy_fetch_github_identity
+    before = await bench("before: sequential, unpooled", total, concurrency)
+    oauth_endpoints.fetch_github_identity = current
+    after = await bench("after: concurrent, pooled", total, concurrency)
+    print_results([before, after])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    args = parser.parse_args()
+
+    with StubServer(build_github_stub(args.latency_ms / 1000)) as stub:
+        settings.GITHUB_API_URL = stub.url
+        asyncio.run(main(args.requests, args.concurrency))
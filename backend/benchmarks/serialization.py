@@ -0,0 +1,76 @@
+"""Per-response CPU cost of JSON serialization for the auth payloads.
+
+Each row builds a complete response object (body plus headers) from an
+already validated schema instance: the previous ``JSONResponse`` over
+``model_dump()``, FastAPI's ``jsonable_encoder`` path, and the direct
+bytes path of ``PydanticJSONResponse``. Bodies are checked to be identical
+before timing.
+
+    python -m benchmarks.serialization --iterations 50000
+"""
+
+import argparse
+import time
+
+from benchmarks.common import configure_env
+
+configure_env()
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from app import schemas  # noqa: E402
+from app.core.responses import PydanticJSONResponse  # noqa: E402
+from app.models.user import User  # noqa: E402
+
+
+def usec_per_call(fn, iterations: int) -> float:
+    for _ in range(min(iterations, 1000)):
+        fn()
+    started = time.process_time()
+    for _ in range(iterations):
+        fn()
+    return (time.process_time() - started) / iterations * 1_000_000
+
+
+def main(iterations: int) -> None:
+    user = User(
+        id=42,
+        email="bench@example.com",
+        full_name="Bench Ünïcode User",
+        hashed_password="",
+        is_active=True,
+    )
+    payloads = {
+        "AuthResponse": schemas.AuthResponse(user=user, message="Login successful"),
+        "User": schemas.User.model_validate(user),
+        "LogoutResponse": schemas.LogoutResponse(message="Successfully logged out"),
+    }
+    paths = {
+        "model_dump + JSONResponse": lambda m: JSONResponse(content=m.model_dump()),
+        "jsonable_encoder + JSONResponse": lambda m: JSONResponse(
+            content=jsonable_encoder(m)
+        ),
+        "PydanticJSONResponse": lambda m: PydanticJSONResponse(m),
+    }
+
+    header = f"{'payload':<16}{'path':<34}{'us/resp':>10}{'saved':>9}"
+    print(header)
+    print("-" * len(header))
+    for payload_name, model in payloads.items():
+        bodies = {fn(model).body for fn in paths.values()}
+        assert len(bodies) == 1, f"{payload_name}: serialized bodies differ"
+
+        baseline = None
+        for path_name, fn in paths.items():
+            cost = usec_per_call(lambda: fn(model), iterations)
+            baseline = baseline or cost
+            saved = f"{(1 - cost / baseline) * 100:.0f}%"
+            print(f"{payload_name:<16}{path_name:<34}{cost:>10.2f}{saved:>9}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=50000)
+    args = parser.parse_args()
+    main(args.iterations)
@@ -0,0 +1,124 @@
+"""Per-request cost of the old app-wide SessionMiddleware, and OAuth cookie size.
+
+"before" is today's app with Starlette's signed-cookie ``SessionMiddleware``
+added back, as it used to wrap every route; "after" is the app as shipped.
+``GET /auth/me`` is measured with and without a session cookie present
+(browsers kept one after any OAuth login). The login redirect's Set-Cookie
+bytes compare Authlib's cookie-held state with the opaque state cookie.
+
+    python -m benchmarks.session_overhead --requests 5000
+"""
+
+import argparse
+import asyncio
+import os
+
+from benchmarks.common import configure_env, print_results, run_load
+
+os.environ.setdefault("GITHUB_CLIENT_ID", "bench-client")
+os.environ.setdefault("GITHUB_CLIENT_SECRET", "bench-secret")
+configure_env()
+
+import httpx  # noqa: E402
+from authlib.integrations.starlette_client import OAuth  # noqa: E402
+from starlette.applications import Starlette  # noqa: E402
+from starlette.middleware import Middleware  # noqa: E402
+from starlette.middleware.sessions import SessionMiddleware  # noqa: E402
+from starlette.routing import Route  # noqa: E402
+
+from app.core import security  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.core.oauth import _provider_config  # noqa: E402
+from app.db.base import Base  # noqa: E402
+from app.db.session import SessionLocal, engine  # noqa: E402
+from app.main import create_app  # noqa: E402
+from app.models.user import User  # noqa: E402
+
+ME_URL = f"{settings.API_V1_STR}/auth/me"
+LOGIN_URL = f"{settings.API_V1_STR}/auth/login/github"
+
+
+def seed_user() -> int:
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        user = db.query(User).filter(User.email == "session@example.com").first()
+        if user is None:
+            user = User(email="session@example.com", full_name="S", hashed_password="")
+            db.add(user)
+            db.commit()
+        return user.id
+
+
+def build_legacy_login_app() -> Starlette:
+    # Previous flow: no server-side cache, so Authlib kept state data in the
+    # signed session cookie
+    legacy = OAuth()
+    legacy.register(name="github", **_provider_config("github"))
+
+    async def login(request):
+        return await legacy.github.authorize_redirect(
+            request, f"{settings.BACKEND_URL}{LOGIN_URL}/callback", prompt="consent"
+        )
+
+    return Starlette(
+        routes=[Route(LOGIN_URL, login)],
+        middleware=[Middleware(SessionMiddleware, secret_key=settings.SECRET_KEY)],
+    )
+
+
+async def set_cookie_bytes(app) -> int:
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://bench"
+    ) as client:
+        response = await client.get(LOGIN_URL)
+    return sum(len(value) for value in response.headers.get_list("set-cookie"))
+
+
+async def bench(app, name: str, cookies: dict, total: int, concurrency: int):
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://bench", cookies=cookies
+    ) as client:
+
+        async def send() -> bool:
+            response = await client.get(ME_URL)
+            return response.status_code == 200
+
+        await run_load(f"{name} (warm-up)", send, min(total, 200), concurrency)
+        return await run_load(name, send, total, concurrency)
+
+
+async def main(total: int, concurrency: int) -> None:
+    token = security.create_access_token(subject=seed_user())
+    after = create_app()
+    before = create_app()
+    before.add_middleware(SessionMiddleware, secret_key=settings.SECRET_KEY)
+
+    # A session cookie as left behind by an OAuth login under the old setup
+    legacy_login = build_legacy_login_app()
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=legacy_login), base_url="http://bench"
+    ) as client:
+        session_cookie = (await client.get(LOGIN_URL)).cookies["session"]
+
+    plain = {"access_token": token}
+    with_session = {**plain, "session": session_cookie}
+    results = [
+        await bench(before, "before: /auth/me", plain, total, concurrency),
+        await bench(after, "after:  /auth/me", plain, total, concurrency),
+        await bench(before, "before: /auth/me + session", with_session, total, concurrency),
+        await bench(after, "after:  /auth/me + session", with_session, total, concurrency),
+    ]
+    print_results(results)
+
+    print()
+    print(f"login redirect Set-Cookie bytes, before: {await set_cookie_bytes(legacy_login)}")
+    print(f"login redirect Set-Cookie bytes, after:  {await set_cookie_bytes(after)}")
+    print(f"session cookie sent on every request, before: {len(session_cookie)} bytes")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
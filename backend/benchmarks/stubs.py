@@ -0,0 +1,72 @@
+"""Local stand-ins for OAuth provider APIs, served by uvicorn on a free port."""
+
+import asyncio
+import socket
+import threading
+import time
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+
+def build_github_stub(latency: float) -> Starlette:
+    """GitHub API stub; each call sleeps ``latency`` seconds like a remote hop."""
+
+    async def access_token(request: Request):
+        await asyncio.sleep(latency)
+        return JSONResponse(
+            {"access_token": "bench-token", "token_type": "bearer", "scope": "user:email"}
+        )
+
+    async def user(request: Request):
+        await asyncio.sleep(latency)
+        # No public email, so the callback needs /user/emails as well
+        return JSONResponse({"id": 4242, "login": "bench", "name": "Bench", "email": None})
+
+    async def user_emails(request: Request):
+        await asyncio.sleep(latency)
+        return JSONResponse(
+            [
+                {"email": "other@example.com", "primary": False, "verified": True},
+                {"email": "bench-gh@example.com", "primary": True, "verified": True},
+            ]
+        )
+
+    return Starlette(
+        routes=[
+            Route("/login/oauth/access_token", access_token, methods=["POST"]),
+            Route("/user", user),
+            Route("/user/emails", user_emails),
+        ]
+    )
+
+
+class StubServer:
+    """Run an ASGI app with uvicorn in a background thread."""
+
+    def __init__(self, app):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        config = uvicorn.Config(
+            app, host="127.0.0.1", port=self.port, log_level="warning"
+        )
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self) -> "StubServer":
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.should_exit = True
+        self.thread.join()
@@ -0,0 +1,253 @@
+"""End-to-end benchmark of the auth API: signup, login, me, logout and OAuth.
+
+Drives the real application either in-process (ASGI transport) or over HTTP
+through uvicorn (``--server``). The GitHub OAuth flow runs login redirect,
+token exchange and profile fetch against a local stub provider. Results are
+written as JSON; pass ``--baseline`` to fail when a scenario regresses.
+
+    python -m benchmarks.suite --output benchmarks/results/latest.json
+    python -m benchmarks.suite --baseline benchmarks/results/baseline.json \\
+        --max-throughput-drop 10 --max-latency-increase 20
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import sys
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.common import (
+    compare_to_baseline,
+    configure_env,
+    print_results,
+    run_load,
+    save_results,
+)
+from benchmarks.stubs import StubServer, build_github_stub
+
+# Load generators come from one address; keep the limiter out of the numbers
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("GITHUB_CLIENT_ID", "bench-client")
+os.environ.setdefault("GITHUB_CLIENT_SECRET", "bench-secret")
+configure_env()
+
+import httpx  # noqa: E402
+
+from app.core import security  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.core.oauth import get_oauth_client  # noqa: E402
+from app.core.redis import close_redis  # noqa: E402
+from app.core.refresh_tokens import issue_refresh_token  # noqa: E402
+from app.db.base import Base  # noqa: E402
+from app.db.session import SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.user import User  # noqa: E402
+
+AUTH = f"{settings.API_V1_STR}/auth"
+SCENARIOS = ("signup", "login", "me", "logout", "oauth_github")
+LOGIN_EMAIL = "bench-login@example.com"
+LOGIN_PASSWORD = "bench-password"
+
+
+def seed_login_user() -> int:
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        user = db.query(User).filter(User.email == LOGIN_EMAIL).first()
+        if user is None:
+            user = User(
+                email=LOGIN_EMAIL,
+                full_name="Bench Login",
+                hashed_password=security.get_password_hash(LOGIN_PASSWORD),
+            )
+            db.add(user)
+            db.commit()
+        return user.id
+
+
+async def issue_logout_tokens(user_id: int, count: int) -> list[str]:
+    tokens = [await issue_refresh_token(user_id) for _ in range(count)]
+    # The Redis client is bound to this loop; let the app build its own
+    await close_redis()
+    return tokens
+
+
+def build_client(base_url: str, in_process: bool) -> httpx.AsyncClient:
+    # Scenarios pass cookies explicitly, so concurrent flows never share a jar
+    jar = CookieJar(policy=DefaultCookiePolicy(allowed_domains=[]))
+    transport = httpx.ASGITransport(app=app) if in_process else None
+    return httpx.AsyncClient(
+        transport=transport,
+        base_url=base_url,
+        cookies=jar,
+        timeout=30.0,
+        limits=httpx.Limits(max_connections=None, max_keepalive_connections=None),
+    )
+
+
+def cookie_header(**cookies: str) -> dict[str, str]:
+    return {"Cookie": "; ".join(f"{name}={value}" for name, value in cookies.items())}
+
+
+async def run_scenarios(
+    client: httpx.AsyncClient,
+    selected: list[str],
+    user_id: int,
+    logout_tokens: list[str],
+    total: int,
+    hash_total: int,
+    concurrency: int,
+):
+    access_token = security.create_access_token(subject=user_id)
+    emails = (f"bench-{os.getpid()}-{n}@example.com" for n in itertools.count())
+    refresh = iter(logout_tokens)
+
+    async def signup() -> bool:
+        response = await client.post(
+            f"{AUTH}/signup",
+            json={"email": next(emails), "password": "bench-password", "full_name": "Bench"},
+        )
+        return response.status_code == 200
+
+    async def login() -> bool:
+        response = await client.post(
+            f"{AUTH}/login",
+            data={"username": LOGIN_EMAIL, "password": LOGIN_PASSWORD},
+        )
+        return response.status_code == 200
+
+    async def me() -> bool:
+        response = await client.get(
+            f"{AUTH}/me", headers=cookie_header(access_token=access_token)
+        )
+        return response.status_code == 200
+
+    async def logout() -> bool:
+        response = await client.post(
+            f"{AUTH}/logout",
+            headers=cookie_header(access_token=access_token, refresh_token=next(refresh)),
+        )
+        return response.status_code == 200
+
+    async def oauth_github() -> bool:
+        start = await client.get(f"{AUTH}/login/github")
+        if start.status_code not in (302, 307):
+            return False
+        state = parse_qs(urlparse(start.headers["location"]).query)["state"][0]
+        response = await client.get(
+            f"{AUTH}/login/github/callback",
+            params={"code": "bench", "state": state},
+            headers=cookie_header(oauth_state=start.cookies["oauth_state"]),
+        )
+        location = response.headers.get("location", "")
+        return response.status_code == 307 and "error=" not in location
+
+    plan = {
+        "signup": ("POST /auth/signup", signup, hash_total),
+        "login": ("POST /auth/login", login, hash_total),
+        "me": ("GET /auth/me", me, total),
+        "logout": ("POST /auth/logout", logout, total),
+        "oauth_github": ("GitHub login + callback", oauth_github, total),
+    }
+    results = []
+    for key in selected:
+        name, send, count = plan[key]
+        if key == "oauth_github":
+            # First sign-in creates the user; run it alone so the rest are updates
+            await send()
+        if key != "logout":
+            await run_load(f"{name} (warm-up)", send, min(count, 20), concurrency)
+        results.append(await run_load(name, send, count, concurrency))
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument(
+        "--hash-requests",
+        type=int,
+        default=100,
+        help="requests for password-hashing scenarios (signup, login)",
+    )
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--server", action="store_true", help="serve the app with uvicorn")
+    parser.add_argument("--output", default="benchmarks/results/latest.json")
+    parser.add_argument("--baseline")
+    parser.add_argument("--max-throughput-drop", type=float, default=10.0)
+    parser.add_argument("--max-latency-increase", type=float, default=20.0)
+    args = parser.parse_args()
+
+    selected = [name for name in args.scenarios.split(",") if name]
+    unknown = set(selected) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    user_id = seed_login_user()
+    logout_tokens = []
+    if "logout" in selected:
+        logout_tokens = asyncio.run(issue_logout_tokens(user_id, args.requests))
+
+    with StubServer(build_github_stub(args.latency_ms / 1000)) as github:
+        settings.GITHUB_API_URL = github.url
+        get_oauth_client("github").access_token_url = (
+            f"{github.url}/login/oauth/access_token"
+        )
+
+        async def run(base_url: str, in_process: bool):
+            async with build_client(base_url, in_process) as client:
+                return await run_scenarios(
+                    client,
+                    selected,
+                    user_id,
+                    logout_tokens,
+                    args.requests,
+                    args.hash_requests,
+                    args.concurrency,
+                )
+
+        if args.server:
+            with StubServer(app) as server:
+                results = asyncio.run(run(server.url, in_process=False))
+        else:
+            results = asyncio.run(run("http://bench", in_process=True))
+
+    print_results(results)
+    document = save_results(
+        args.output,
+        results,
+        mode="server" if args.server else "in-process",
+        database=engine.dialect.name,
+        concurrency=args.concurrency,
+        provider_latency_ms=args.latency_ms,
+    )
+    print(f"\nResults written to {args.output}")
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    for key in ("mode", "database", "concurrency"):
+        if baseline["meta"].get(key) != document["meta"][key]:
+            print(
+                f"\nWarning: baseline {key} is {baseline['meta'].get(key)!r}, "
+                f"this run used {document['meta'][key]!r}"
+            )
+    regressions = compare_to_baseline(
+        document, baseline, args.max_throughput_drop, args.max_latency_increase
+    )
+    if regressions:
+        print(f"\nRegressions against {args.baseline}:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"\nNo regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""Access-token encode/decode throughput per codec backend and algorithm.
+
+Every supported backend/algorithm pair is measured with pre-built keys, next
+to the previous call style (``jose.jwt`` with the raw secret on every call)
+for reference. Keys for EdDSA/ES256 are generated fresh for the run.
+
+    python -m benchmarks.token_codec --iterations 20000
+"""
+
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.common import configure_env
+
+configure_env()
+
+from cryptography.hazmat.primitives import serialization  # noqa: E402
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519  # noqa: E402
+from jose import jwt as jose_jwt  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.core.security import TOKEN_BACKENDS  # noqa: E402
+
+
+def private_pem(algorithm: str) -> str:
+    if algorithm == "EdDSA":
+        key = ed25519.Ed25519PrivateKey.generate()
+    else:
+        key = ec.generate_private_key(ec.SECP256R1())
+    return key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+
+
+def ops_per_sec(fn, iterations: int) -> float:
+    for _ in range(min(iterations, 200)):
+        fn()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return iterations / (time.perf_counter() - started)
+
+
+def main(iterations: int) -> None:
+    claims = {
+        "sub": "42",
+        "exp": datetime.now(timezone.utc) + timedelta(minutes=30),
+        "usr": {"id": 42, "em": "bench@example.com", "act": True, "su": False},
+    }
+    rows = []
+
+    legacy_token = jose_jwt.encode(claims, settings.SECRET_KEY, algorithm="HS256")
+    rows.append(
+        (
+            "jose (per-call key)",
+            "HS256",
+            ops_per_sec(
+                lambda: jose_jwt.encode(claims, settings.SECRET_KEY, algorithm="HS256"),
+                iterations,
+            ),
+            ops_per_sec(
+                lambda: jose_jwt.decode(
+                    legacy_token, settings.SECRET_KEY, algorithms=["HS256"]
+                ),
+                iterations,
+            ),
+        )
+    )
+
+    pems = {"ES256": private_pem("ES256"), "EdDSA": private_pem("EdDSA")}
+    for name, backend in TOKEN_BACKENDS.items():
+        for algorithm in ("HS256", "ES256", "EdDSA"):
+            if algorithm not in backend.algorithms:
+                continue
+            key = settings.SECRET_KEY if algorithm == "HS256" else pems[algorithm]
+            codec = backend(algorithm, signing_key=key, kid="bench")
+            token = codec.encode(claims)
+            rows.append(
+                (
+                    name,
+                    algorithm,
+                    ops_per_sec(lambda: codec.encode(claims), iterations),
+                    ops_per_sec(lambda: codec.decode(token), iterations),
+                )
+            )
+
+    header = f"{'backend':<22}{'alg':<8}{'encode/s':>12}{'decode/s':>12}"
+    print(header)
+    print("-" * len(header))
+    for name, algorithm, encode, decode in rows:
+        print(f"{name:<22}{algorithm:<8}{encode:>12.0f}{decode:>12.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+    main(args.iterations)
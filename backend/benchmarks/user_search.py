@@ -0,0 +1,170 @@
+"""Admin user search latency: pg_trgm GIN indexes vs. a sequential scan.
+
+Needs PostgreSQL (``DATABASE_URL=postgresql://...``). Seeds ``--users``
+synthetic users once, server-side with ``generate_series``, then times the
+search query for a set of terms twice: with the planner free to use the
+trigram indexes, and with bitmap/index scans disabled, which forces a
+sequential scan. The plan's scan nodes are printed next to each timing.
+
+    DATABASE_URL=postgresql://... python -m benchmarks.user_search --users 1000000
+"""
+
+import argparse
+import sys
+import time
+
+from benchmarks.common import configure_env, percentile
+
+configure_env()
+
+from sqlalchemy import func, select, text  # noqa: E402
+from sqlalchemy.dialects import postgresql  # noqa: E402
+
+from app.crud.user import search_users_stmt  # noqa: E402
+from app.db.base import Base  # noqa: E402
+from app.db.session import engine  # noqa: E402
+from app.models.user import User  # noqa: E402
+
+DOMAIN = "search-bench.example"
+FIRST_NAMES = [
+    "Ana", "Ben", "Carla", "Dmitri", "Elena", "Farid", "Grace", "Hiro", "Ines",
+    "Jonas", "Kira", "Liam", "Maya", "Nikolai", "Olga", "Pedro", "Quinn", "Rosa",
+    "Sven", "Tariq", "Uma", "Victor", "Wen", "Ximena", "Yusuf", "Zoe",
+]
+LAST_NAMES = [
+    "Anderson", "Brown", "Chen", "Dubois", "Eriksson", "Fischer", "Garcia",
+    "Hansen", "Ivanova", "Jensen", "Kowalski", "Lopez", "Moreau", "Nakamura",
+    "Okafor", "Petrov", "Quispe", "Rossi", "Schmidt", "Tanaka", "Uchenna",
+    "Virtanen", "Wagner", "Xu", "Yamamoto", "Zimmermann",
+]
+# A handful of rows with a rare surname, the typical support-desk lookup
+RARE_NAME = "Brzeczyszczykiewicz"
+
+# (label, term): common substring, rare substring, typos, email fragment
+TERMS = [
+    ("common surname", "Kowalski"),
+    ("common surname typo", "Kowalsky"),
+    ("rare surname", RARE_NAME),
+    ("rare surname typo", "Brzeczyszczykewicz"),
+    ("email fragment", "elena.hansen.4242"),
+]
+
+_SEED = f"""
+INSERT INTO "user" (email, full_name, hashed_password, is_active, is_superuser,
+                    provider, version)
+SELECT lower(f.name) || '.' || lower(l.name) || '.' || g || '@{DOMAIN}',
+       f.name || ' ' || l.name, '', true, false, 'email', 1
+FROM generate_series(:start, :stop) AS g
+CROSS JOIN LATERAL (
+    SELECT (CAST(:firsts AS text[]))[1 + g % {len(FIRST_NAMES)}] AS name
+) AS f
+CROSS JOIN LATERAL (
+    SELECT (CAST(:lasts AS text[]))[1 + (g / {len(FIRST_NAMES)}) % {len(LAST_NAMES)}] AS name
+) AS l
+"""
+
+
+def seed(total: int, batch: int) -> None:
+    Base.metadata.create_all(bind=engine)
+    with engine.connect() as conn:
+        # Generated rows only, so an interrupted seed resumes at the right g
+        existing = conn.scalar(
+            select(func.count()).where(
+                User.email.like(f"%.%@{DOMAIN}"), ~User.email.like("rare%")
+            )
+        )
+    if existing >= total:
+        print(f"Using {existing} existing seeded users")
+        return
+
+    started = time.perf_counter()
+    for start in range(existing + 1, total + 1, batch):
+        stop = min(start + batch - 1, total)
+        with engine.begin() as conn:
+            conn.execute(
+                text(_SEED),
+                {
+                    "start": start,
+                    "stop": stop,
+                    "firsts": FIRST_NAMES,
+                    "lasts": LAST_NAMES,
+                },
+            )
+            if start == 1:
+                conn.execute(
+                    User.__table__.insert(),
+                    [
+                        {
+                            "email": f"rare{n}@{DOMAIN}",
+                            "full_name": f"{FIRST_NAMES[n]} {RARE_NAME}",
+                            "hashed_password": "",
+                        }
+                        for n in range(5)
+                    ],
+                )
+        print(f"  seeded {stop}/{total}", end="\r", flush=True)
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text('VACUUM ANALYZE "user"'))
+    print(f"Seeded {total - existing} users in {time.perf_counter() - started:.1f}s")
+
+
+def scan_nodes(plan: dict) -> list[str]:
+    nodes = []
+    if "Scan" in plan["Node Type"]:
+        nodes.append(f"{plan['Node Type']} {plan.get('Index Name', '')}".strip())
+    for child in plan.get("Plans", []):
+        nodes.extend(scan_nodes(child))
+    return nodes
+
+
+def measure(term: str, limit: int, repeat: int, force_seq_scan: bool):
+    compiled = search_users_stmt("postgresql", term, limit).compile(
+        dialect=postgresql.dialect()
+    )
+    sql, params = str(compiled), compiled.params
+    timings = []
+    with engine.connect() as conn:
+        with conn.begin():
+            if force_seq_scan:
+                conn.exec_driver_sql("SET LOCAL enable_bitmapscan = off")
+                conn.exec_driver_sql("SET LOCAL enable_indexscan = off")
+            plan = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + sql, params).scalar()
+            conn.exec_driver_sql(sql, params).fetchall()  # warm the cache
+            for _ in range(repeat):
+                started = time.perf_counter()
+                rows = conn.exec_driver_sql(sql, params).fetchall()
+                timings.append(time.perf_counter() - started)
+    return timings, len(rows), scan_nodes(plan[0]["Plan"])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--seed-batch", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    if engine.dialect.name != "postgresql":
+        print("This benchmark needs PostgreSQL with pg_trgm; set DATABASE_URL.")
+        return 1
+
+    seed(args.users, args.seed_batch)
+    header = f"{'term':<22}{'plan':<8}{'rows':>6}{'p50 ms':>10}{'p95 ms':>10}  scans"
+    print(header)
+    print("-" * len(header))
+    for label, term in TERMS:
+        for name, force_seq_scan in (("index", False), ("seqscan", True)):
+            timings, rows, nodes = measure(
+                term, args.limit, args.repeat, force_seq_scan
+            )
+            print(
+                f"{label:<22}{name:<8}{rows:>6}"
+                f"{percentile(timings, 50) * 1000:>10.2f}"
+                f"{percentile(timings, 95) * 1000:>10.2f}  {', '.join(nodes)}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
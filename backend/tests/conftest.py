@@ -0,0 +1,65 @@
+import os
+import tempfile
+
+# Settings are read when app modules are imported: point them at a throwaway
+# database and no Redis before any test module imports the app. SQLite by
+# default; set TEST_DATABASE_URL to a scratch PostgreSQL database to also run
+# the PostgreSQL-only tests (bulk import/export).
+os.environ.setdefault("POSTGRES_USER", "test")
+os.environ.setdefault("POSTGRES_PASSWORD", "test")
+os.environ.setdefault("POSTGRES_DB", "test")
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ["DATABASE_URL"] = os.environ.get("TEST_DATABASE_URL") or (
+    "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="tests-"), "test.db")
+)
+os.environ.pop("REDIS_URL", None)
+
+import pytest  # noqa: E402
+from fakeredis import FakeAsyncRedis  # noqa: E402
+
+from app.core import redis as redis_module  # noqa: E402
+from app.db.base import Base  # noqa: E402
+from app.db.session import AsyncSessionLocal, async_engine  # noqa: E402
+from app.services.user_cache import user_cache  # noqa: E402
+
+requires_postgres = pytest.mark.skipif(
+    async_engine.dialect.name != "postgresql",
+    reason="needs PostgreSQL; set TEST_DATABASE_URL",
+)
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """Serve get_redis() from an in-process Redis (Lua scripts included)."""
+    client = FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr(redis_module, "_client", client)
+    return client
+
+
+@pytest.fixture
+def broken_redis(monkeypatch):
+    """A configured Redis that refuses every connection."""
+    client = redis_module.Redis.from_url(
+        "redis://127.0.0.1:1", decode_responses=True, socket_connect_timeout=0.1
+    )
+    monkeypatch.setattr(redis_module, "_client", client)
+    return client
+
+
+@pytest.fixture
+async def db():
+    """A session on a freshly created schema, dropped again afterwards."""
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    user_cache.local.clear()
+    async with AsyncSessionLocal() as session:
+        yield session
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    # Pooled connections are bound to this test's event loop
+    await async_engine.dispose()
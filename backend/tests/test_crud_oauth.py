@@ -0,0 +1,163 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import update
+
+from app import crud
+from app.api.v1.endpoints import oauth as oauth_endpoints
+from app.core.cookies import REFRESH_COOKIE_NAME
+from app.crud.user import OAuthIdentityConflict
+from app.models.user import User
+
+pytestmark = pytest.mark.anyio
+
+
+async def resolve(
+    db, provider="google", provider_id="g-1", email="ada@example.com", full_name="Ada"
+):
+    return await crud.user.resolve_oauth_user(
+        db,
+        provider=provider,
+        provider_id=provider_id,
+        email=email,
+        full_name=full_name,
+    )
+
+
+async def test_new_identity_creates_an_active_user(db):
+    user = await resolve(db)
+
+    assert user.id is not None
+    assert (user.email, user.full_name) == ("ada@example.com", "Ada")
+    assert (user.provider, user.provider_id) == ("google", "g-1")
+    assert user.is_active and not user.is_superuser
+    assert user.hashed_password == ""
+
+
+async def test_missing_name_falls_back_to_the_email_local_part(db):
+    user = await resolve(db, full_name=None)
+
+    assert user.full_name == "ada"
+
+
+async def test_returning_identity_updates_the_same_user(db):
+    first = await resolve(db)
+    user_id, version = first.id, first.version
+    again = await resolve(db, email="ada@new.example.com", full_name=None)
+
+    assert again.id == user_id
+    assert again.email == "ada@new.example.com"
+    # A missing name keeps the stored one
+    assert again.full_name == "Ada"
+    assert again.version == version + 1
+
+
+class StubOAuthClient:
+    def __init__(self, userinfo: dict):
+        self.userinfo = userinfo
+
+    async def authorize_access_token(self, request):
+        return {"userinfo": self.userinfo}
+
+
+async def google_login(db, monkeypatch, email="ada@example.com"):
+    userinfo = {
+        "iss": "https://accounts.google.com",
+        "sub": "g-1",
+        "email": email,
+        "name": "Ada",
+    }
+    monkeypatch.setattr(
+        oauth_endpoints, "get_oauth_client", lambda provider: StubOAuthClient(userinfo)
+    )
+    return await oauth_endpoints._complete_oauth_login(None, "google", db)
+
+
+async def test_oauth_login_sets_the_auth_cookies(db, monkeypatch):
+    response = await google_login(db, monkeypatch)
+
+    assert response.status_code == 307
+    cookies = response.headers.getlist("set-cookie")
+    assert any(cookie.startswith(f"{REFRESH_COOKIE_NAME}=") for cookie in cookies)
+
+
+async def test_oauth_login_rejects_a_deactivated_user(db, monkeypatch):
+    user = await resolve(db)
+    await db.execute(update(User).where(User.id == user.id).values(is_active=False))
+    await db.commit()
+
+    with pytest.raises(HTTPException) as exc_info:
+        await google_login(db, monkeypatch, email="ada@new.example.com")
+
+    # Same answer as a password login
+    assert (exc_info.value.status_code, exc_info.value.detail) == (400, "Inactive user")
+    # The returning identity was still resolved, without reactivating it
+    await db.refresh(user)
+    assert user.email == "ada@new.example.com"
+    assert not user.is_active
+
+
+async def test_email_of_a_provider_less_account_links_the_identity(db):
+    # Accounts from before providers were recorded
+    existing = User(email="ada@example.com", full_name="Ada", hashed_password="x")
+    db.add(existing)
+    await db.commit()
+    user_id = existing.id
+    await db.execute(update(User).where(User.id == user_id).values(provider=None))
+    await db.commit()
+
+    user = await resolve(db)
+
+    assert user.id == user_id
+    assert (user.provider, user.provider_id) == ("google", "g-1")
+    assert user.hashed_password == "x"
+
+
+async def test_email_of_a_password_account_conflicts(db):
+    db.add(User(email="ada@example.com", full_name="Ada", hashed_password="x"))
+    await db.commit()
+
+    with pytest.raises(OAuthIdentityConflict) as exc_info:
+        await resolve(db)
+    assert (exc_info.value.reason, exc_info.value.provider) == (
+        "account_already_exists",
+        "email",
+    )
+
+
+async def test_email_owned_by_another_provider_conflicts(db):
+    await resolve(db, provider="github", provider_id="gh-1")
+
+    with pytest.raises(OAuthIdentityConflict) as exc_info:
+        await resolve(db)
+    assert (exc_info.value.reason, exc_info.value.provider) == (
+        "account_already_exists",
+        "github",
+    )
+
+
+async def test_email_owned_by_another_identity_of_the_provider_conflicts(db):
+    await resolve(db, provider_id="g-1")
+
+    with pytest.raises(OAuthIdentityConflict) as exc_info:
+        await resolve(db, provider_id="g-2")
+    assert (exc_info.value.reason, exc_info.value.provider) == (
+        "provider_id_mismatch",
+        "google",
+    )
+
+
+async def test_identity_linked_elsewhere_conflicts_instead_of_failing(db):
+    # The identity belongs to one account and its new email to another,
+    # provider-less one: linking that account would duplicate the identity
+    await resolve(db, email="ada@old.example.com")
+    legacy = User(email="ada@example.com", full_name="Ada", hashed_password="x")
+    db.add(legacy)
+    await db.commit()
+    legacy_id = legacy.id
+    await db.execute(update(User).where(User.id == legacy_id).values(provider=None))
+    await db.commit()
+
+    with pytest.raises(OAuthIdentityConflict) as exc_info:
+        await resolve(db)
+    assert exc_info.value.reason == "account_already_exists"
+    assert (await db.get(User, legacy_id)).provider is None
@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+from starlette.requests import ClientDisconnect
+
+from app import schemas
+from app.api.v1.endpoints.feedback import LeasedStreamingResponse, feedback_events
+from app.core.config import settings
+from app.core.rate_limit import stream_limiter
+from app.services.llm import StubLLMProvider, llm_gateway
+
+pytestmark = pytest.mark.anyio
+
+REQUEST = schemas.FeedbackRequest(
+    question="What is a race condition?", answer="Two threads racing."
+)
+SCOPE = {"type": "http", "asgi": {"version": "3.0", "spec_version": "2.4"}}
+
+
+class StallingProvider(StubLLMProvider):
+    """Sends one token, then never another."""
+
+    def __init__(self):
+        super().__init__(dimensions=256)
+        self.closed = False
+
+    async def stream(self, prompt, **kwargs):
+        try:
+            yield "Good"
+            await asyncio.Event().wait()
+        finally:
+            self.closed = True
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    provider = StallingProvider()
+    monkeypatch.setattr(llm_gateway, "provider", provider)
+    llm_gateway.exact.clear()
+    return provider
+
+
+async def test_stalled_provider_is_cut_off_at_the_deadline(provider, monkeypatch):
+    monkeypatch.setattr(settings, "FEEDBACK_STREAM_MAX_SECONDS", 0.2)
+
+    events = [event async for event in feedback_events(REQUEST)]
+
+    assert events == [
+        {"type": "start"},
+        {"type": "token", "data": "Good"},
+        {"type": "error", "detail": "Feedback took too long"},
+    ]
+    assert provider.closed
+
+
+async def test_time_spent_by_the_caller_counts_against_the_deadline(
+    provider, monkeypatch
+):
+    monkeypatch.setattr(settings, "FEEDBACK_STREAM_MAX_SECONDS", 0.2)
+
+    events = []
+    async for event in feedback_events(REQUEST):
+        events.append(event)
+        await asyncio.sleep(0.3)
+
+    assert events[-1] == {"type": "error", "detail": "Feedback took too long"}
+    assert provider.closed
+
+
+async def body():
+    yield "event: start\n\n"
+    yield "event: done\n\n"
+
+
+async def never_receives():
+    await asyncio.Event().wait()
+
+
+async def leased_response(ends_in: float) -> LeasedStreamingResponse:
+    lease = await stream_limiter.acquire("feedback:test", 1, 60)
+    assert lease is not None
+    ends_at = asyncio.get_running_loop().time() + ends_in
+    return LeasedStreamingResponse(
+        body(), key="feedback:test", lease=lease, ends_at=ends_at
+    )
+
+
+async def slot_is_free() -> bool:
+    lease = await stream_limiter.acquire("feedback:test", 1, 60)
+    if lease is None:
+        return False
+    await stream_limiter.release("feedback:test", lease)
+    return True
+
+
+async def test_the_slot_is_released_when_the_client_is_gone_before_the_body():
+    response = await leased_response(ends_in=60)
+
+    async def send(message):
+        raise OSError("client went away")
+
+    with pytest.raises(ClientDisconnect):
+        await response(SCOPE, never_receives, send)
+
+    assert await slot_is_free()
+
+
+async def test_a_client_that_stops_reading_is_cut_off_when_the_lease_ends():
+    response = await leased_response(ends_in=0.2)
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+        if message.get("body"):
+            # The client's receive window is full
+            await asyncio.Event().wait()
+
+    await asyncio.wait_for(response(SCOPE, never_receives, send), 2)
+
+    assert sent[0]["type"] == "http.response.start"
+    assert await slot_is_free()
@@ -0,0 +1,43 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.core.hashing import HashingQueueFull, PasswordHasher
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher(workers=1, max_queue=0)
+    yield hasher
+    hasher.shutdown()
+
+
+async def test_a_cancelled_caller_holds_its_slot_until_the_job_ends(hasher):
+    started, release = threading.Event(), threading.Event()
+
+    def slow_hash():
+        started.set()
+        release.wait(5)
+        return "hash"
+
+    caller = asyncio.ensure_future(hasher.run(slow_hash))
+    await asyncio.to_thread(started.wait, 5)
+    caller.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await caller
+
+    # The worker is still busy hashing, so new work is shed
+    assert hasher.stats()["in_flight"] == 1
+    with pytest.raises(HashingQueueFull):
+        await hasher.run(str)
+
+    release.set()
+    for _ in range(100):
+        if not hasher.saturated:
+            break
+        await asyncio.sleep(0.01)
+    assert hasher.stats()["in_flight"] == 0
+    assert await hasher.run(str.upper, "ok") == "OK"
@@ -0,0 +1,60 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.core.jwks import JWKSCache
+
+pytestmark = pytest.mark.anyio
+
+DISCOVERY_URL = "https://issuer.example.com/.well-known/openid-configuration"
+JWKS_URL = "https://issuer.example.com/jwks"
+
+
+class StubJWKSCache(JWKSCache):
+    def __init__(self, kids: list[str]):
+        super().__init__(DISCOVERY_URL, "google", unknown_kid_cooldown=30)
+        self.served_kids = kids
+        self.fetches = 0
+
+    async def _get(self, url):
+        if url == DISCOVERY_URL:
+            body = {"issuer": "https://issuer.example.com", "jwks_uri": JWKS_URL}
+        else:
+            self.fetches += 1
+            # Slow enough for every concurrent caller to queue on the lock
+            await asyncio.sleep(0.05)
+            body = {"keys": [{"kid": kid} for kid in self.served_kids]}
+        return httpx.Response(200, json=body, request=httpx.Request("GET", url))
+
+
+async def stale_cache(kids: list[str]) -> StubJWKSCache:
+    cache = StubJWKSCache(kids)
+    await cache.refresh()
+    # Past the unknown-kid cooldown
+    cache._last_fetch -= 60
+    cache.fetches = 0
+    return cache
+
+
+@pytest.mark.parametrize("rotated", [True, False])
+async def test_a_burst_of_tokens_with_a_new_kid_fetches_once(rotated):
+    cache = await stale_cache(["old"])
+    if rotated:
+        cache.served_kids = ["old", "new"]
+
+    await asyncio.gather(*(cache._ensure_kid("new") for _ in range(20)))
+
+    assert cache.fetches == 1
+    assert ("new" in cache.kids) is rotated
+
+
+async def test_known_kids_and_the_cooldown_skip_the_fetch():
+    cache = StubJWKSCache(["old"])
+    await cache.refresh()
+    cache.fetches = 0
+
+    await cache._ensure_kid("old")
+    await cache._ensure_kid("unknown")
+
+    assert cache.fetches == 0
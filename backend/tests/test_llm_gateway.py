@@ -0,0 +1,218 @@
+import asyncio
+
+import pytest
+
+from app.services.llm import LLMError, LLMGateway, StubLLMProvider
+
+pytestmark = pytest.mark.anyio
+
+QUESTION = "Explain how a hash map handles collisions, with an example in Python."
+PARAPHRASE = "Explain how a hash map handles collisions, with one example in Python."
+
+
+class CountingProvider(StubLLMProvider):
+    def __init__(self, latency: float = 0.0, failures: int = 0):
+        super().__init__(dimensions=256, latency=latency)
+        self.completions = 0
+        self.failures = failures
+
+    async def complete(self, prompt, **kwargs):
+        self.completions += 1
+        if self.failures:
+            self.failures -= 1
+            await asyncio.sleep(self.latency)
+            raise LLMError("provider down")
+        return await super().complete(prompt, **kwargs)
+
+
+def gateway(provider, threshold: float = 0.9) -> LLMGateway:
+    return LLMGateway(
+        provider,
+        max_entries=100,
+        semantic_max_entries=100,
+        ttl=60,
+        semantic_threshold=threshold,
+    )
+
+
+async def test_repeated_prompt_is_an_exact_hit():
+    provider = CountingProvider()
+    llm = gateway(provider)
+
+    first = await llm.generate(QUESTION)
+    # Trailing whitespace and line endings are normalized away
+    again = await llm.generate(QUESTION + "  \r\n")
+
+    assert (first.cache, again.cache) == ("miss", "exact_hit")
+    assert again.text == first.text
+    assert provider.completions == 1
+
+
+async def test_paraphrase_is_a_semantic_hit_then_an_exact_one():
+    provider = CountingProvider()
+    llm = gateway(provider)
+    first = await llm.generate(QUESTION)
+
+    near = await llm.generate(PARAPHRASE)
+    again = await llm.generate(PARAPHRASE)
+
+    assert near.cache == "semantic_hit"
+    assert near.text == first.text
+    assert near.similarity >= 0.9
+    assert again.cache == "exact_hit"
+    assert provider.completions == 1
+
+
+async def test_semantic_matching_can_be_turned_off():
+    provider = CountingProvider()
+    llm = gateway(provider)
+    await llm.generate(QUESTION, semantic=False)
+
+    near = await llm.generate(PARAPHRASE, semantic=False)
+
+    assert near.cache == "miss"
+    assert provider.completions == 2
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"kind": "feedback"},
+        {"system": "Be terse."},
+        {"temperature": 0.9},
+        {"max_tokens": 64},
+    ],
+)
+async def test_cache_is_scoped_by_everything_that_changes_the_answer(params):
+    provider = CountingProvider()
+    llm = gateway(provider)
+    await llm.generate(QUESTION)
+
+    other = await llm.generate(QUESTION, **params)
+
+    assert other.cache == "miss"
+    assert provider.completions == 2
+
+
+async def test_concurrent_identical_prompts_share_one_provider_call():
+    provider = CountingProvider(latency=0.05)
+    llm = gateway(provider)
+
+    responses = await asyncio.gather(*(llm.generate(QUESTION) for _ in range(20)))
+
+    assert provider.completions == 1
+    assert [r.cache for r in responses].count("miss") == 1
+    assert [r.cache for r in responses].count("coalesced") == 19
+    assert len({r.text for r in responses}) == 1
+    assert llm.stats()["inflight"] == 0
+
+
+async def test_a_cancelled_caller_does_not_cancel_the_shared_call():
+    provider = CountingProvider(latency=0.05)
+    llm = gateway(provider)
+    leader = asyncio.create_task(llm.generate(QUESTION))
+    follower = asyncio.create_task(llm.generate(QUESTION))
+    await asyncio.sleep(0.01)
+
+    leader.cancel()
+    response = await follower
+
+    assert response.cache == "coalesced"
+    assert provider.completions == 1
+    assert (await llm.generate(QUESTION)).cache == "exact_hit"
+
+
+async def test_failures_reach_every_waiter_and_are_not_cached():
+    provider = CountingProvider(latency=0.05, failures=1)
+    llm = gateway(provider)
+
+    results = await asyncio.gather(
+        *(llm.generate(QUESTION) for _ in range(5)), return_exceptions=True
+    )
+
+    assert all(isinstance(result, LLMError) for result in results)
+    assert provider.completions == 1
+    assert (await llm.generate(QUESTION)).cache == "miss"
+    assert provider.completions == 2
+
+
+class TrackingProvider(StubLLMProvider):
+    def __init__(self):
+        super().__init__(dimensions=256)
+        self.streams = 0
+        self.closed = 0
+
+    async def stream(self, prompt, **kwargs):
+        self.streams += 1
+        try:
+            async for chunk in super().stream(prompt, **kwargs):
+                yield chunk
+        finally:
+            self.closed += 1
+
+
+async def test_stream_is_cached_once_complete():
+    provider = TrackingProvider()
+    llm = gateway(provider)
+
+    chunks = [chunk async for chunk in llm.stream(QUESTION, semantic=False)]
+    again = [chunk async for chunk in llm.stream(QUESTION, semantic=False)]
+
+    assert len(chunks) > 1
+    assert again == ["".join(chunks)]
+    assert (provider.streams, provider.closed) == (1, 1)
+
+
+async def test_closing_a_stream_early_closes_upstream_and_caches_nothing():
+    provider = TrackingProvider()
+    llm = gateway(provider)
+
+    stream = llm.stream(QUESTION, semantic=False)
+    await anext(stream)
+    await stream.aclose()
+
+    assert provider.closed == 1
+    [chunk async for chunk in llm.stream(QUESTION, semantic=False)]
+    assert provider.streams == 2
+
+
+class RecordingProvider(StubLLMProvider):
+    def __init__(self):
+        super().__init__(dimensions=256)
+        self.prompts = []
+
+    async def complete(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        return await super().complete(prompt, **kwargs)
+
+    async def stream(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        async for chunk in super().stream(prompt, **kwargs):
+            yield chunk
+
+
+async def test_the_provider_gets_the_prompt_as_written():
+    provider = RecordingProvider()
+    llm = gateway(provider)
+    prompt = "def f():\r\n    return 1   \r\n"
+
+    await llm.generate(prompt)
+    [chunk async for chunk in llm.stream(prompt, kind="other")]
+
+    assert provider.prompts == [prompt, prompt]
+
+
+async def test_a_finished_call_leaves_a_newer_one_in_flight():
+    provider = CountingProvider(latency=0.05)
+    llm = gateway(provider)
+    first = asyncio.ensure_future(llm.generate(QUESTION))
+    await asyncio.sleep(0)
+    [key] = llm._inflight
+    newer = asyncio.get_running_loop().create_future()
+    llm._inflight[key] = newer
+
+    await first
+    await asyncio.sleep(0)
+
+    assert llm._inflight[key] is newer
+    newer.cancel()
@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import rate_limit
+from app.core.config import settings
+from app.core.rate_limit import ConcurrencyLimiter, SlidingWindowLimiter
+from app.main import create_app
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(params=["local", "redis", "redis_down"])
+def backend(request):
+    if request.param == "redis":
+        return request.getfixturevalue("fake_redis")
+    if request.param == "redis_down":
+        request.getfixturevalue("broken_redis")
+    return None
+
+
+async def test_sliding_window_allows_up_to_the_limit(backend):
+    limiter = SlidingWindowLimiter()
+
+    assert await limiter.hit("ip:1", 2, 60) == 0
+    assert await limiter.hit("ip:1", 2, 60) == 0
+    retry_after = await limiter.hit("ip:1", 2, 60)
+
+    assert 0 < retry_after <= 60
+    # Other keys have their own window
+    assert await limiter.hit("ip:2", 2, 60) == 0
+
+
+async def test_sliding_window_frees_slots_as_hits_age_out(backend):
+    limiter = SlidingWindowLimiter()
+
+    assert await limiter.hit("ip:1", 1, 0.05) == 0
+    assert await limiter.hit("ip:1", 1, 0.05) > 0
+    await asyncio.sleep(0.06)
+    assert await limiter.hit("ip:1", 1, 0.05) == 0
+
+
+async def test_sliding_window_is_shared_through_redis(fake_redis):
+    first, second = SlidingWindowLimiter(), SlidingWindowLimiter()
+
+    assert await first.hit("ip:1", 1, 60) == 0
+    # Another process with its own limiter sees the same window
+    assert await second.hit("ip:1", 1, 60) > 0
+    assert await fake_redis.zcard("rl:ip:1") == 1
+
+
+async def test_concurrency_limiter_caps_holders_until_release(backend):
+    limiter = ConcurrencyLimiter()
+
+    first = await limiter.acquire("feedback:1", 2, 60)
+    second = await limiter.acquire("feedback:1", 2, 60)
+    assert first and second and first != second
+    assert await limiter.acquire("feedback:1", 2, 60) is None
+
+    await limiter.release("feedback:1", first)
+    assert await limiter.acquire("feedback:1", 2, 60) is not None
+
+
+async def test_concurrency_leases_expire(backend):
+    limiter = ConcurrencyLimiter()
+
+    assert await limiter.acquire("feedback:1", 1, 0.05) is not None
+    assert await limiter.acquire("feedback:1", 1, 0.05) is None
+    await asyncio.sleep(0.06)
+    assert await limiter.acquire("feedback:1", 1, 0.05) is not None
+
+
+@pytest.fixture
+def login_client(monkeypatch):
+    monkeypatch.setattr(rate_limit, "limiter", SlidingWindowLimiter())
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(settings, "RATE_LIMIT_CREDENTIALS_PER_IP", 1)
+
+    def client(forwarded_allow_ips: str | None) -> TestClient:
+        monkeypatch.setattr(settings, "FORWARDED_ALLOW_IPS", forwarded_allow_ips)
+        return TestClient(create_app())
+
+    return client
+
+
+def login(client: TestClient, forwarded_for: str) -> int:
+    # No body: the limiter runs first, then validation answers 422
+    return client.post(
+        "/api/v1/auth/login", headers={"X-Forwarded-For": forwarded_for}
+    ).status_code
+
+
+def test_per_ip_limit_uses_forwarded_for_from_trusted_proxies(login_client):
+    client = login_client("*")
+
+    assert login(client, "203.0.113.1") == 422
+    assert login(client, "203.0.113.1") == 429
+    assert login(client, "203.0.113.2") == 422
+
+
+def test_forwarded_for_is_ignored_without_trusted_proxies(login_client):
+    client = login_client(None)
+
+    assert login(client, "203.0.113.1") == 422
+    # Same peer address, whatever the header claims
+    assert login(client, "203.0.113.2") == 429
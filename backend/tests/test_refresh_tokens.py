@@ -0,0 +1,128 @@
+import asyncio
+
+import pytest
+
+from app.core import refresh_tokens
+from app.core.config import settings
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(params=["memory", "redis"])
+def store(request, monkeypatch):
+    if request.param == "redis":
+        request.getfixturevalue("fake_redis")
+    else:
+        monkeypatch.setattr(
+            refresh_tokens, "_memory_store", refresh_tokens.InMemoryRefreshTokenStore()
+        )
+    return request.param
+
+
+async def test_rotation_returns_a_new_token_for_the_same_user(store):
+    token = await refresh_tokens.issue_refresh_token(7)
+
+    user_id, rotated = await refresh_tokens.rotate_refresh_token(token)
+    assert user_id == 7
+    assert rotated != token
+    assert rotated.split(".")[0] == token.split(".")[0]
+
+    user_id, again = await refresh_tokens.rotate_refresh_token(rotated)
+    assert user_id == 7
+    assert again not in (token, rotated)
+
+
+async def test_concurrent_refresh_within_grace_gets_the_same_successor(store):
+    token = await refresh_tokens.issue_refresh_token(7)
+
+    _, first = await refresh_tokens.rotate_refresh_token(token)
+    _, second = await refresh_tokens.rotate_refresh_token(token)
+
+    assert first == second
+    # Nothing was revoked: the successor keeps working
+    await refresh_tokens.rotate_refresh_token(first)
+
+
+async def test_reuse_after_grace_revokes_every_family_of_the_user(store, monkeypatch):
+    monkeypatch.setattr(settings, "REFRESH_TOKEN_REUSE_GRACE_SECONDS", -1)
+    token = await refresh_tokens.issue_refresh_token(7)
+    other_device = await refresh_tokens.issue_refresh_token(7)
+    unrelated_user = await refresh_tokens.issue_refresh_token(8)
+    _, rotated = await refresh_tokens.rotate_refresh_token(token)
+
+    with pytest.raises(refresh_tokens.RefreshTokenReused):
+        await refresh_tokens.rotate_refresh_token(token)
+
+    for revoked in (rotated, other_device):
+        with pytest.raises(refresh_tokens.RefreshTokenError):
+            await refresh_tokens.rotate_refresh_token(revoked)
+    assert (await refresh_tokens.rotate_refresh_token(unrelated_user))[0] == 8
+
+
+async def test_a_token_two_rotations_old_is_reuse_even_within_grace(store):
+    token = await refresh_tokens.issue_refresh_token(7)
+    _, rotated = await refresh_tokens.rotate_refresh_token(token)
+    await refresh_tokens.rotate_refresh_token(rotated)
+
+    with pytest.raises(refresh_tokens.RefreshTokenReused):
+        await refresh_tokens.rotate_refresh_token(token)
+
+
+async def test_logout_revokes_the_family(store):
+    token = await refresh_tokens.issue_refresh_token(7)
+    await refresh_tokens.revoke_refresh_token(token)
+
+    with pytest.raises(refresh_tokens.RefreshTokenError):
+        await refresh_tokens.rotate_refresh_token(token)
+
+
+@pytest.mark.parametrize("token", ["", "no-separator", ".secret", "family."])
+async def test_malformed_tokens_are_rejected(store, token):
+    with pytest.raises(refresh_tokens.RefreshTokenError):
+        await refresh_tokens.rotate_refresh_token(token)
+
+
+async def test_redis_outage_degrades_instead_of_failing(broken_redis):
+    # Logins go ahead without a refresh token
+    assert await refresh_tokens.issue_refresh_token(7) is None
+    # Refresh reports the outage rather than an invalid token
+    with pytest.raises(refresh_tokens.RefreshTokenStoreUnavailable):
+        await refresh_tokens.rotate_refresh_token("family.secret")
+    # Logout still clears the session
+    await refresh_tokens.revoke_refresh_token("family.secret")
+
+
+async def test_revoke_user_reaches_families_kept_alive_past_their_first_ttl(
+    store, monkeypatch
+):
+    ttl = 1
+    monkeypatch.setattr(refresh_tokens, "_ttl", lambda: ttl)
+    token = await refresh_tokens.issue_refresh_token(7)
+    await asyncio.sleep(0.6)
+    ttl = 5
+    _, rotated = await refresh_tokens.rotate_refresh_token(token)
+    # Past the TTL the family got at login
+    await asyncio.sleep(0.6)
+
+    await refresh_tokens.revoke_user_refresh_tokens(7)
+
+    with pytest.raises(refresh_tokens.RefreshTokenError):
+        await refresh_tokens.rotate_refresh_token(rotated)
+
+
+async def test_expired_families_are_pruned_from_the_user_index(fake_redis, monkeypatch):
+    monkeypatch.setattr(refresh_tokens, "_ttl", lambda: 1)
+    expired = await refresh_tokens.issue_refresh_token(7)
+    await asyncio.sleep(1.1)
+
+    live = await refresh_tokens.issue_refresh_token(7)
+
+    assert await fake_redis.smembers("rt:user:7") == {live.split(".")[0]}
+    assert expired.split(".")[0] != live.split(".")[0]
+
+
+async def test_the_redis_store_is_built_once_per_client(fake_redis):
+    store = refresh_tokens.get_refresh_token_store()
+
+    assert refresh_tokens.get_refresh_token_store() is store
+    assert store.redis is fake_redis
@@ -0,0 +1,244 @@
+import asyncio
+import os
+import shutil
+import signal
+import sys
+import tempfile
+
+import pytest
+
+from app.core.config import settings
+from app.services import sandbox
+from app.services.code_runner import (
+    APP_ROOT,
+    CodeRunner,
+    CodeRunnerError,
+    RunLimits,
+    hidden_paths,
+)
+
+pytestmark = pytest.mark.anyio
+
+LIMITS = RunLimits(cpu_seconds=1, wall_seconds=2.0, memory_mb=128, output_kb=16)
+UIDS = range(41000, 41008)
+
+requires_root = pytest.mark.skipif(
+    sys.platform != "linux" or os.geteuid() != 0,
+    reason="sandboxed runs need Linux and root",
+)
+
+
+def runner_with(workers: int, uids: range = UIDS) -> CodeRunner:
+    return CodeRunner(
+        workers=workers, max_queue=16, max_runs_per_user=16, limits=LIMITS, uids=uids
+    )
+
+
+def exited(code: int) -> int:
+    return code << 8
+
+
+@pytest.mark.parametrize(
+    ("status", "timed_out", "cpu", "stderr", "truncated", "expected"),
+    [
+        (exited(0), False, 0.1, "", False, "ok"),
+        (exited(0), True, 0.1, "", False, "time_limit"),
+        (signal.SIGXCPU, False, 1.0, "", False, "time_limit"),
+        # The hard limit's SIGKILL, a second after an ignored SIGXCPU
+        (signal.SIGKILL, False, 2.0, "", False, "time_limit"),
+        (signal.SIGKILL, False, 0.1, "", False, "runtime_error"),
+        (signal.SIGSEGV, False, 0.1, "", False, "runtime_error"),
+        (exited(sandbox.SETUP_FAILED), False, 0.0, "", False, "internal_error"),
+        (exited(1), False, 0.1, "OSError: File too large", True, "output_limit"),
+        (exited(0), False, 0.1, "", True, "output_limit"),
+        (exited(1), False, 0.1, "MemoryError", False, "memory_limit"),
+        (exited(1), False, 0.1, "ValueError: bad", False, "runtime_error"),
+    ],
+)
+def test_classify(status, timed_out, cpu, stderr, truncated, expected):
+    limits = LIMITS.to_job()
+
+    result = sandbox._classify(status, timed_out, cpu, stderr, truncated, limits)
+
+    assert result == expected
+
+
+async def test_refuses_to_start_without_an_unprivileged_uid():
+    runner = runner_with(workers=1, uids=range(0, 1))
+
+    with pytest.raises(CodeRunnerError, match="must not include root"):
+        await runner.start()
+
+
+@pytest.mark.skipif(
+    sys.platform == "linux" and os.geteuid() == 0, reason="needs a non-root user"
+)
+async def test_refuses_to_start_when_it_cannot_switch_uid():
+    runner = runner_with(workers=1)
+
+    with pytest.raises(CodeRunnerError, match="cannot isolate runs"):
+        await runner.start()
+
+
+def test_hidden_paths_cover_the_app_tree_and_env_files(monkeypatch):
+    monkeypatch.setitem(settings.model_config, "env_file", ("/etc/app.env", ".env"))
+
+    paths = hidden_paths()
+
+    assert str(APP_ROOT) in paths
+    assert "/etc/app.env" in paths
+    assert os.path.abspath(".env") in paths
+
+
+@pytest.fixture
+def env_file(monkeypatch):
+    """A world-readable env file outside both the app tree and /tmp."""
+    directory = tempfile.mkdtemp(prefix="sandbox-test-", dir="/var/tmp")
+    os.chmod(directory, 0o755)
+    path = os.path.join(directory, ".env")
+    with open(path, "w") as f:
+        f.write("SECRET_KEY=leaked\n")
+    os.chmod(path, 0o644)
+    monkeypatch.setitem(settings.model_config, "env_file", path)
+    yield path
+    shutil.rmtree(directory)
+
+
+@pytest.fixture
+async def runner():
+    runner = runner_with(workers=2)
+    await runner.start()
+    yield runner
+    await runner.stop()
+
+
+async def run_case(runner: CodeRunner, code: str, stdin: str = "") -> dict:
+    run = await runner.submit("tests", code, [stdin])
+    events = [event async for event in runner.events(run)]
+    assert events[0]["type"] == "start"
+    return events[1]
+
+
+def processes_of(uid: int) -> list[int]:
+    pids = []
+    for entry in filter(str.isdigit, os.listdir("/proc")):
+        try:
+            with open(f"/proc/{entry}/status") as f:
+                uids = next(line for line in f if line.startswith("Uid:")).split()
+        except OSError:
+            continue
+        if int(uids[1]) == uid:
+            pids.append(int(entry))
+    return pids
+
+
+@requires_root
+@pytest.mark.parametrize(
+    ("code", "status"),
+    [
+        ("print(input()[::-1])", "ok"),
+        ("raise SystemExit(3)", "runtime_error"),
+        ("while True:\n    pass", "time_limit"),
+        ("import time\ntime.sleep(30)", "time_limit"),
+        ("data = bytearray(512 * 1024 * 1024)", "memory_limit"),
+        ("print('x' * 100_000)", "output_limit"),
+        ("import os\nos.system('id')", "runtime_error"),
+    ],
+)
+async def test_run_status(runner, code, status):
+    result = await run_case(runner, code, "abc\n")
+
+    assert result["status"] == status
+    if status == "ok":
+        assert result["stdout"] == "cba\n"
+
+
+@requires_root
+async def test_compile_errors_are_reported_once(runner):
+    run = await runner.submit("tests", "def broken(:", ["1", "2"])
+    events = [event async for event in runner.events(run)]
+
+    assert [event["type"] for event in events] == ["start", "compile_error"]
+    assert "SyntaxError" in events[1]["detail"]
+
+
+@requires_root
+async def test_runs_are_unprivileged_and_apart(runner):
+    first, second = [worker.uid for worker in runner._pool]
+    code = "import os\nprint(os.getuid(), os.getgid(), os.getgroups())"
+
+    result = await run_case(runner, code)
+    uid, gid, groups = result["stdout"].split(maxsplit=2)
+
+    assert first != second and first in UIDS and second in UIDS
+    assert int(uid) == int(gid) in (first, second)
+    assert groups.strip() == "[]"
+
+
+@requires_root
+@pytest.mark.parametrize(
+    "path", ["/tmp/pwned", "/var/tmp/pwned", "/dev/shm/pwned", sandbox.__file__]
+)
+async def test_only_the_working_directory_is_writable(runner, path):
+    escape = await run_case(runner, f"open({path!r}, 'a').write('x')")
+    local = await run_case(
+        runner, "open('notes', 'w').write('x')\nprint(open('notes').read())"
+    )
+
+    assert escape["status"] == "runtime_error"
+    assert "Error" in escape["stderr"]
+    assert local["status"] == "ok" and local["stdout"] == "x\n"
+    assert not os.path.exists("/tmp/pwned")
+
+
+@requires_root
+async def test_app_tree_and_env_file_are_hidden(env_file, runner):
+    config = APP_ROOT / "app" / "core" / "config.py"
+    code = (
+        "import os\n"
+        f"print(os.path.exists({str(config)!r}))\n"
+        f"print(open({env_file!r}).read())"
+    )
+
+    result = await run_case(runner, code)
+
+    assert result["stdout"].startswith("False\n")
+    assert "leaked" not in result["stdout"] + result["stderr"]
+
+
+@requires_root
+async def test_no_network(runner):
+    code = "import socket\nsocket.create_connection(('1.1.1.1', 80), timeout=1)"
+
+    result = await run_case(runner, code)
+
+    assert result["status"] == "runtime_error"
+
+
+@requires_root
+async def test_runs_orphaned_by_a_dead_worker_are_killed_on_restart():
+    runner = runner_with(workers=1)
+    await runner.start()
+    try:
+        worker = runner._pool[0]
+        uid = worker.uid
+        run = await runner.submit("tests", "import time\ntime.sleep(30)", [""])
+        events = runner.events(run)
+        assert (await anext(events))["type"] == "start"
+        # The SIGKILL only reaches the worker, not the run it forked
+        worker.kill()
+        assert (await anext(events))["type"] == "error"
+        await events.aclose()
+
+        result = await run_case(runner, "print('ok')")
+
+        assert result["status"] == "ok"
+        assert worker.uid == uid
+        # SIGKILLed on restart; give init a moment to reap it
+        for _ in range(50):
+            if not processes_of(uid):
+                break
+            await asyncio.sleep(0.1)
+        assert processes_of(uid) == []
+    finally:
+        await runner.stop()
@@ -0,0 +1,102 @@
+import json
+
+import pytest
+
+from app import crud, schemas
+from app.core.security import HashPolicy, get_password_hash
+from app.models.user import User
+from app.services.user_cache import UserCache, user_cache
+
+pytestmark = pytest.mark.anyio
+
+
+def new_cache() -> UserCache:
+    return UserCache(max_size=16, ttl=60, redis_ttl=60)
+
+
+def a_user(**overrides) -> User:
+    values = dict(
+        id=7,
+        email="ada@example.com",
+        full_name="Ada",
+        hashed_password="secret-hash",
+        is_active=True,
+        is_superuser=False,
+        provider=None,
+        provider_id=None,
+        version=1,
+    )
+    return User(**values | overrides)
+
+
+async def test_local_hit():
+    cache = new_cache()
+    await cache.set(a_user())
+
+    user = await cache.get(7)
+
+    assert user.email == "ada@example.com"
+    assert cache.stats() == {"size": 1, "local_hits": 1, "redis_hits": 0, "misses": 0}
+
+
+async def test_redis_hit_refills_the_local_tier(fake_redis):
+    cache = new_cache()
+    await cache.set(a_user())
+    cache.local.clear()
+
+    user = await cache.get(7)
+
+    assert user.email == "ada@example.com"
+    assert cache.stats() == {"size": 1, "local_hits": 0, "redis_hits": 1, "misses": 0}
+    assert "hashed_password" not in json.loads(await fake_redis.get("user:7"))
+
+
+async def test_invalidate_drops_both_tiers(fake_redis):
+    cache = new_cache()
+    await cache.set(a_user())
+
+    await cache.invalidate(7)
+
+    assert await cache.get(7) is None
+    assert cache.misses == 1
+    assert await fake_redis.get("user:7") is None
+
+
+async def test_create_user_seeds_the_cache(db, fake_redis):
+    user = await crud.user.create_user(
+        db, schemas.UserCreate(email="ada@example.com", password="hunter22")
+    )
+
+    cached = await user_cache.get(user.id)
+
+    assert cached.email == "ada@example.com"
+    assert await fake_redis.get(f"user:{user.id}") is not None
+
+
+async def test_resolve_oauth_user_refreshes_the_cached_row(db, fake_redis):
+    first = await crud.user.resolve_oauth_user(
+        db, provider="google", provider_id="g-1", email="ada@example.com", full_name=None
+    )
+    again = await crud.user.resolve_oauth_user(
+        db, provider="google", provider_id="g-1", email="ada@new.io", full_name="Ada L"
+    )
+    user_cache.local.clear()
+
+    cached = await user_cache.get(first.id)
+
+    assert again.id == first.id
+    assert (cached.email, cached.full_name) == ("ada@new.io", "Ada L")
+
+
+async def test_a_rehash_invalidates_the_cached_row(db, fake_redis):
+    user = await crud.user.create_user(
+        db, schemas.UserCreate(email="ada@example.com", password="hunter22")
+    )
+    new_hash = get_password_hash("hunter22", HashPolicy(scheme="bcrypt", cost=4))
+
+    assert await crud.user.update_password_hash(
+        db, user.id, user.hashed_password, new_hash
+    )
+
+    assert await user_cache.get(user.id) is None
+    assert await fake_redis.get(f"user:{user.id}") is None
@@ -0,0 +1,146 @@
+import csv
+import io
+import json
+
+import pytest
+
+from app.core.security import HashPolicy, get_password_hash
+from app.services import user_transfer
+from app.services.user_transfer import _iter_records, export_users, import_users
+from tests.conftest import requires_postgres
+
+pytestmark = pytest.mark.anyio
+
+
+async def lines_of(*lines):
+    for line in lines:
+        yield line
+
+
+async def records(fmt, *lines):
+    return [record async for record in _iter_records(lines_of(*lines), fmt)]
+
+
+async def test_csv_quoted_fields_may_span_lines():
+    parsed = await records(
+        "csv",
+        "email,full_name",
+        'ada@example.com,"Ada',
+        'Lovelace, ""Countess"""',
+        "bob@example.com,Bob",
+    )
+
+    assert parsed == [
+        {"email": "ada@example.com", "full_name": 'Ada\nLovelace, "Countess"'},
+        {"email": "bob@example.com", "full_name": "Bob"},
+    ]
+
+
+async def test_csv_blank_lines_are_skipped_outside_quotes_only():
+    parsed = await records(
+        "csv", "", "email,full_name", "", 'ada@example.com,"Ada', "", 'Lovelace"', ""
+    )
+
+    assert parsed == [{"email": "ada@example.com", "full_name": "Ada\n\nLovelace"}]
+
+
+async def test_csv_unterminated_quote_is_an_invalid_row():
+    parsed = await records(
+        "csv", "email,full_name", "bob@example.com,Bob", 'ada@example.com,"Ada'
+    )
+
+    assert parsed[0] == {"email": "bob@example.com", "full_name": "Bob"}
+    assert isinstance(parsed[1], ValueError)
+
+
+async def test_ndjson_malformed_line_is_an_invalid_row():
+    parsed = await records(
+        "ndjson", '{"email": "ada@example.com"}', "{not json", "", '{"email": "b@x.io"}'
+    )
+
+    assert parsed[0] == {"email": "ada@example.com"}
+    assert isinstance(parsed[1], ValueError)
+    assert parsed[2] == {"email": "b@x.io"}
+
+
+async def test_lines_that_are_not_utf8_are_reported_by_number():
+    async def body():
+        yield b"email,full_name\r\nada@example.com,Ada\n"
+        yield b"bob@example.com,B\xe9b\nzed@example.com,Zed\n"
+
+    lines = []
+    with pytest.raises(user_transfer.InvalidEncodingError, match="line 3"):
+        async for line in user_transfer.iter_lines(body()):
+            lines.append(line)
+
+    assert lines == ["email,full_name", "ada@example.com,Ada"]
+
+
+async def test_import_requires_postgres_elsewhere():
+    if user_transfer.async_engine.dialect.name == "postgresql":
+        pytest.skip("running on PostgreSQL")
+    with pytest.raises(user_transfer.UserTransferError):
+        await import_users(lines_of("email"), "csv")
+
+
+@pytest.fixture
+def fast_hashes(monkeypatch):
+    # Minimum bcrypt cost keeps hashing in the import's process pool quick
+    monkeypatch.setattr(
+        user_transfer, "get_hash_policy", lambda: HashPolicy(scheme="bcrypt", cost=4)
+    )
+    yield
+    user_transfer.shutdown_hash_pool()
+
+
+@requires_postgres
+async def test_import_counts_bad_rows_and_keeps_going(db, fast_hashes):
+    report = await import_users(
+        lines_of(
+            '{"email": "ada@example.com", "password": "s3cret"}',
+            "{not json",
+            '{"email": "no-at-sign"}',
+            '{"email": "ada@example.com"}',
+            '{"email": "bob@example.com", "full_name": "Bob"}',
+        ),
+        "ndjson",
+        batch_size=1,
+    )
+
+    assert (report.rows, report.inserted, report.skipped, report.invalid) == (5, 2, 1, 2)
+    assert report.errors[0].startswith("row 2: invalid JSON")
+
+
+@requires_postgres
+@pytest.mark.parametrize("export_format", ["csv", "ndjson"])
+async def test_import_export_round_trip(db, fast_hashes, export_format):
+    hashed = get_password_hash("hunter2", HashPolicy(scheme="bcrypt", cost=4))
+    source = io.StringIO()
+    writer = csv.writer(source, lineterminator="\n")
+    writer.writerow(["email", "full_name", "hashed_password", "is_active", "provider"])
+    writer.writerow(["ada@example.com", 'Ada\n"Countess" Lovelace', hashed, "true", ""])
+    writer.writerow(["bob@example.com", "Bob", hashed, "no", "github"])
+
+    report = await import_users(lines_of(*source.getvalue().splitlines()), "csv")
+    assert (report.rows, report.inserted, report.invalid) == (2, 2, 0)
+
+    exported_report = user_transfer.TransferReport()
+    body = b"".join(
+        [chunk async for chunk in export_users(export_format, exported_report)]
+    ).decode()
+    assert exported_report.rows == 2
+    if export_format == "ndjson":
+        exported = [json.loads(line) for line in body.splitlines()]
+    else:
+        exported = await records("csv", *body.splitlines())
+    got = [
+        (row["email"], row["full_name"], str(row["is_active"]).lower(), row["provider"])
+        for row in exported
+    ]
+    active = "true" if export_format == "ndjson" else "t"
+    inactive = "false" if export_format == "ndjson" else "f"
+    assert got == [
+        ("ada@example.com", 'Ada\n"Countess" Lovelace', active, "email"),
+        ("bob@example.com", "Bob", inactive, "github"),
+    ]
+    assert all("hashed_password" not in row for row in exported)